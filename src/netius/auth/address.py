@@ -42,8 +42,10 @@ from . import base
 class AddressAuth(base.Auth):
 
     def __init__(self, allowed = [], *args, **kwargs):
+        import netius.common
         base.Auth.__init__(self, *args, **kwargs)
         self.allowed = allowed
+        self.allowed_m = netius.common.AddressMatcher(allowed)
 
     @classmethod
     def auth(cls, allowed = [], *args, **kwargs):
@@ -64,7 +66,7 @@ class AddressAuth(base.Auth):
 
     def auth_i(self, *args, **kwargs):
         return self.__class__.auth(
-            allowed = self.allowed,
+            allowed = self.allowed_m,
             *args,
             **kwargs
         )
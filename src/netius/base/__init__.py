@@ -45,7 +45,10 @@ from . import legacy
 from . import log
 from . import observer
 from . import poll
+from . import profiler
 from . import request
+from . import scheduler
+from . import stats
 from . import server
 from . import stream
 from . import tls
@@ -63,7 +66,10 @@ from .errors import NetiusError, PauseError, DataError, ParserError,\
 from .log import SILENT, rotating_handler, smtp_handler
 from .observer import Observable
 from .poll import Poll, EpollPoll, KqueuePoll, PollPoll, SelectPoll
+from .profiler import SAMPLE_RATE, SAMPLE_DURATION, Sampler
 from .request import Request, Response
+from .scheduler import COMPACT_MIN, Handle, Scheduler, HeapScheduler, WheelScheduler
+from .stats import SLOW_CALLBACK, Histogram, LoopStats, qualname
 from .server import Server, DatagramServer, StreamServer
 from .stream import Stream
 from .tls import match_hostname
@@ -130,6 +130,12 @@ class Client(Base):
         if env: self.diag = self.get_env("CLIENT_DIAG", self.diag, cast = bool)
         if env: self.logging = self.get_env("LOGGING", self.logging)
         if env: self.poll_name = self.get_env("POLL", self.poll_name)
+        if env: self.scheduler_name = self.get_env("SCHEDULER", self.scheduler_name)
+        if env: self.idle_timeout = self.get_env(
+            "IDLE_TIMEOUT",
+            self.idle_timeout,
+            cast = float
+        )
         if env: self.poll_timeout = self.get_env(
             "POLL_TIMEOUT",
             self.poll_timeout,
@@ -151,6 +157,9 @@ class Client(Base):
         # so that the current thread blocks until the other ends execution
         self._thread.join(timeout = timeout)
 
+    def _handlers(self, _socket):
+        return (self.on_read, self.on_write, self.on_error)
+
 class DatagramClient(Client):
 
     def __init__(self, *args, **kwargs):
@@ -679,6 +688,10 @@ class StreamClient(Client):
             # state returns immediately (waits for next loop)
             if self._pending(_socket): return
 
+            # refreshes the idle timeout of the connection as there's
+            # new (read) activity in it, avoiding its closing
+            self._idle(connection)
+
             # iterates continuously trying to read as much data as possible
             # when there's a failure to read more data it should raise an
             # exception that should be handled properly
@@ -721,6 +734,7 @@ class StreamClient(Client):
         if connection.connecting: self._connectf(connection)
 
         try:
+            self._idle(connection)
             connection._send()
         except ssl.SSLError as error:
             error_v = error.args[0] if error.args else None
@@ -755,6 +769,10 @@ class StreamClient(Client):
         self.debug(exception)
         connection.close()
 
+    def on_connection_c(self, connection):
+        Client.on_connection_c(self, connection)
+        self._idle(connection)
+
     def on_connect(self, connection):
         connection.set_connected()
         if hasattr(connection, "tuple"):
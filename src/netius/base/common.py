@@ -40,12 +40,13 @@ __license__ = "Apache License, Version 2.0"
 import os
 import copy
 import json
-import heapq
+import uuid
 import signal
 import logging
 import hashlib
 import tempfile
 import traceback
+import collections
 
 import netius.pool
 import netius.adapters
@@ -56,6 +57,9 @@ from . import errors
 from .conn import * #@UnusedWildImport
 from .poll import * #@UnusedWildImport
 from .async import * #@UnusedWildImport
+from .scheduler import * #@UnusedWildImport
+from .stats import * #@UnusedWildImport
+from .profiler import * #@UnusedWildImport
 
 NAME = "netius"
 """ The global infra-structure name to be used in the
@@ -129,7 +133,18 @@ POLL_ORDER = (
 """ The order from which the poll methods are going to be
 selected from the fastest to the slowest, in case no explicit
 poll method is defined for a base service they are selected
-based on this list testing them for acceptance first """
+based on this list testing them for acceptance first, note
+that the event based ones (epoll based) are only selected
+when explicitly requested as they're currently slower """
+
+SCHEDULER_ORDER = (
+    HeapScheduler,
+    WheelScheduler
+)
+""" The order from which the scheduler implementations are going
+to be selected for the delayed execution of callables, the timing
+wheel one must be explicitly selected as it's currently slower
+than the binary heap (as measured by the scheduler benchmark) """
 
 SILENT_ERRORS = (
     errno.ECONNABORTED,
@@ -257,6 +272,28 @@ KEEPALIVE_COUNT = 3
 """ The amount of times the "ping" packet is re-sent until the
 connection is considered to be offline and is dropped """
 
+IDLE_TIMEOUT = None
+""" The amount of time in seconds that a (stream) connection may
+remain without any read or write activity before it's closed, an
+unset value disables the idle timeout for the connections """
+
+RESPAWN_DELAY = 0.5
+""" The initial amount of time in seconds to wait before the
+respawn of a dead child process, this value is doubled for each
+consecutive early death of the child (exponential backoff) """
+
+RESPAWN_MAX = 30.0
+""" The maximum amount of time in seconds to wait before the
+respawn of a dead child process, upper limit for the backoff """
+
+RESPAWN_STABLE = 10.0
+""" The amount of time in seconds that a child process has to be
+running to be considered stable, resetting the respawn backoff """
+
+REPORT_INTERVAL = 5.0
+""" The interval in seconds between each of the reports of the
+statistics sent from a child process to the master process """
+
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
 """ The format that is going to be used by the logger of the
 netius infra-structure for debugging purposes it should allow
@@ -290,12 +327,15 @@ class AbstractBase(observer.Observable):
     def __init__(self, name = None, handlers = None, *args, **kwargs):
         observer.Observable.__init__(self, *args, **kwargs)
         poll = AbstractBase.test_poll()
+        scheduler = AbstractBase.test_scheduler()
         self.name = name or self.__class__.__name__
         self.handler_stream = logging.StreamHandler()
         self.handlers = handlers or (self.handler_stream,)
         self.level = kwargs.get("level", logging.INFO)
         self.diag = kwargs.get("diag", False)
         self.children = kwargs.get("children", 0)
+        self.respawn = kwargs.get("respawn", True)
+        self.reuse_port = kwargs.get("reuse_port", False)
         self.tid = None
         self.tname = None
         self.logger = None
@@ -306,16 +346,22 @@ class AbstractBase(observer.Observable):
         self.poll = self.poll_c()
         self.poll_name = self.poll.name()
         self.poll_timeout = kwargs.get("poll_timeout", POLL_TIMEOUT)
+        self.scheduler_c = kwargs.get("scheduler", scheduler)
+        self.scheduler = self.scheduler_c()
+        self.scheduler_name = self.scheduler.name()
         self.keepalive_timeout = kwargs.get("keepalive_timeout", KEEPALIVE_TIMEOUT)
         self.keepalive_interval = kwargs.get("keepalive_interval", KEEPALIVE_INTERVAL)
         self.keepalive_count = kwargs.get("keepalive_count", KEEPALIVE_COUNT)
+        self.idle_timeout = kwargs.get("idle_timeout", IDLE_TIMEOUT)
+        self.instrument = kwargs.get("instrument", False)
+        self.slow_callback = kwargs.get("slow_callback", SLOW_CALLBACK)
+        self.stats = None
         self.poll_owner = True
         self.diag_app = None
         self.connections = []
         self.connections_m = {}
         self._uuid = uuid.uuid4()
         self._lid = 0
-        self._did = 0
         self._main = False
         self._running = False
         self._pausing = False
@@ -323,10 +369,17 @@ class AbstractBase(observer.Observable):
         self._forked = False
         self._child = False
         self._childs = []
-        self._delayed = []
-        self._delayed_o = []
+        self._child_index = None
+        self._workers = dict()
+        self._signals = []
+        self._replacing = []
+        self._draining = []
+        self._report_fd = None
         self._delayed_n = []
         self._delayed_l = threading.RLock()
+        self._profile_lock = threading.Lock()
+        self._handoff = collections.deque()
+        self._handoff_d = False
         self._extra_handlers = []
         self._ssl_init()
         self.set_state(STATE_STOP)
@@ -361,34 +414,43 @@ class AbstractBase(observer.Observable):
         # as expected by the current method
         return selected
 
+    @classmethod
+    def test_scheduler(cls, preferred = None):
+        # iterates over all the scheduler classes ordered by preference
+        # (best first) and tries to find the one that matches the preferred
+        # name, defaulting to the first acceptable one otherwise
+        selected = None
+        for scheduler in SCHEDULER_ORDER:
+            if not scheduler.test(): continue
+            if not selected: selected = scheduler
+            if not preferred: break
+            name = scheduler.name()
+            if not name == preferred: continue
+            selected = scheduler
+            break
+
+        # in case no scheduler was selected must raise an exception
+        # indicating that no valid scheduler is available
+        if not selected: raise errors.NetiusError(
+            "No valid scheduler available"
+        )
+
+        # returns the selected scheduler class to the caller method
+        return selected
+
     def delay(self, callable, timeout = None, immediately = False, verify = False):
         # creates the original target value with a zero value (forced
         # execution in next tick) in case the timeout value is set the
-        # value is incremented to the current time, then created the
-        # callable original tuple with the target (time) and the callable
+        # value is incremented to the current time
         target = -1 if immediately else 0
         if timeout: target = time.time() + timeout
-        callable_o = (target, callable)
-        callable_o = legacy.orderable(callable_o)
-
-        # in case the verify flag is set, must verify id the callable
-        # is already inserted in the list of delayed operations in
-        # case it does returns immediately to avoid duplicated values
-        is_duplicate = verify and callable_o in self._delayed_o
-        if is_duplicate: return
-
-        # creates the "final" callable tuple with the target time, the
-        # callable and the loop id (lid) then inserts both the delayed
-        # (original) callable tuple and the callable tuple in the lists
-        callable_t = (target, self._did, callable, self._lid)
-        callable_t = legacy.orderable(callable_t)
-        heapq.heappush(self._delayed, callable_t)
-        heapq.heappush(self._delayed_o, callable_o)
-
-        # increments the "delay" identifier by one, this identifier is
-        # used to correctly identify a delayed object so that for the
-        # same target value a sorting is performed (fifo like)
-        self._did += 1
+
+        # adds the callable to the scheduler with the target time and the
+        # loop id (lid), note that in case the verify flag is set and the
+        # callable is already scheduled for the same target the scheduler
+        # avoids the duplicated insertion (constant time verification)
+        # the returned handle may be used to cancel or re-schedule it
+        return self.scheduler.add(callable, target, self._lid, verify = verify)
 
     def delay_s(self, callable):
         """
@@ -412,6 +474,47 @@ class AbstractBase(observer.Observable):
         try: self._delayed_n.append(callable)
         finally: self._delayed_l.release()
 
+    def handoff(self, connection, data, data_l):
+        """
+        Hands off the provided data to be sent through the connection
+        from a thread different from the event loop one, the data is
+        added to the (loop wide) hand off queue that is flushed into
+        the pending queues of the connections in the event loop thread.
+
+        Having a single (loop wide) queue avoids the allocation of one
+        queue per connection for an operation that is rarely used.
+
+        :type connection: Connection
+        :param connection: The connection through which the data is
+        going to be sent (from the event loop thread).
+        :type data: String
+        :param data: The data (or data and callback tuple) to be sent.
+        :type data_l: int
+        :param data_l: The size of the data in bytes.
+        :rtype: int
+        :return: The number of bytes submitted to be sent.
+        """
+
+        # adds the data to the hand off queue, this is a thread safe
+        # operation as a single (atomic) append operation is performed
+        # and the event loop thread is the only consumer of the queue
+        self._handoff.append((connection, data, data_l))
+
+        # in case the flushing of the hand off queue is already scheduled
+        # there's nothing remaining to be done (data is going to be sent)
+        if self._handoff_d: return data_l
+
+        # schedules the flushing of the hand off queue for the next tick
+        # of the event loop (using the thread safe version of the delay
+        # operation) and notifies the task pool (unblocking the loop)
+        self._handoff_d = True
+        self.delay_s(self._handoff_h)
+        if self.tpool: self.tpool.notify()
+
+        # returns the final number of bytes (length of data)
+        # that has been submitted to be sent (as soon as possible)
+        return data_l
+
     def delay_m(self):
         """
         Runs the merge operation so that the delay next list (used by the delay
@@ -796,6 +899,19 @@ class AbstractBase(observer.Observable):
         # mechanism in the middle of the loading process
         self.poll = self.build_poll()
 
+        # re-builds the scheduler structure, so that a possible change
+        # in the name of the scheduler (eg: environment) is respected
+        self.scheduler = self.build_scheduler()
+
+        # creates the loop statistics structure in case the instrumentation
+        # of the loop (or the diagnostics) is enabled, setting it in the
+        # scheduler so that the delayed callables are measured as well
+        if self.instrument or self.diag: self.stats = self.stats or LoopStats(
+            owner = self,
+            threshold = self.slow_callback
+        )
+        if self.stats: self.scheduler.instrument(self.stats)
+
         # retrieves the name of the polling mechanism that is
         # going to be used in the main loop of the current
         # base service, this is going to be used for diagnostics
@@ -938,9 +1054,10 @@ class AbstractBase(observer.Observable):
         # destroys the current information on the delays that are is longer
         # going to be executed as the poll/system is closing, this is required
         # in order to avoid any possible memory leak with clojures/cycles
-        del self._delayed[:]
-        del self._delayed_o[:]
+        self.scheduler.clear()
         del self._delayed_n[:]
+        self._handoff.clear()
+        self._handoff_d = False
 
         # runs the destroy operation on the ssl component of the base
         # element so that no more ssl is available/used (avoids leaks)
@@ -986,6 +1103,11 @@ class AbstractBase(observer.Observable):
         del self._extra_handlers[:]
 
     def loop(self):
+        # in case the loop is meant to be instrumented runs the (slower)
+        # instrumented version of the loop instead, so that there's no
+        # overhead in the default loop when the instrumentation is disabled
+        if self.stats: return self._loop_stats()
+
         # iterates continuously while the running flag is set, once
         # it becomes unset the loop breaks at the next execution cycle
         while self._running:
@@ -1033,50 +1155,41 @@ class AbstractBase(observer.Observable):
         # operation is soon going to be performed
         self.on_fork()
 
-        # sets the initial pid value to the value of the current
-        # master process as this is going to be used for child
-        # detection (critical for the correct logic execution)
-        pid = os.getpid()
-
-        # iterates of the requested (number of children) to run
-        # the concrete fork operation and fork the logic
-        for _index in range(self.children):
-            pid = os.fork() #@UndefinedVariable
-            self._child = pid == 0
-            if self._child: self.on_child()
-            if self._child: break
-            self._childs.append(pid)
-
         # sets the forked flag, meaning that the current process
         # has been already forked (avoid duplicated operations)
         self._forked = True
 
-        # in case the current process is a child one an immediate
-        # valid value should be returned (force logic continuation)
-        if self._child: return True
-
-        # registers for some of the common signals to be able to avoid
-        # any possible interaction with the joining process
-        def handler(signum = None, frame = None): raise RuntimeError("signal")
+        # iterates of the requested (number of children) to run
+        # the concrete fork operation and fork the logic, in case
+        # the current process is a child one an immediate valid
+        # value should be returned (force logic continuation)
+        for index in range(self.children):
+            self._spawn(index)
+            if self._child: return True
+
+        # registers for some of the common signals so that they are
+        # only recorded, to be latter handled by the supervision loop
+        # avoiding any possible interaction with the joining process
+        def handler(signum = None, frame = None): self._signals.append(signum)
         self.bind_signals(handler = handler)
 
-        # sleeps forever, waiting for an interruption of the current
-        # process that triggers the children to quit, so that it's
-        # able to "join" all of them into the current process
-        try: self._wait_forever()
-        except: pass
+        # runs the supervision loop that respawns the dead children and
+        # handles the signals, until the master is requested to stop, in
+        # case the result is valid the current process is a new child
+        result = self._supervise()
+        if result: return True
 
         # prints a debug information about the processes to be joined
         # this indicated the start of the joining process
-        self.debug("Joining '%d' children processes ..." % self.children)
+        self.debug("Joining '%d' children processes ..." % len(self._childs))
 
         # iterates over the complete set of children to send the proper
         # terminate signal to each of them for proper termination
-        for pid in self._childs: os.kill(pid, signal.SIGTERM)
+        for pid in self._childs: self._kill(pid)
 
         # iterates over the complete set of child processed to join
         # them (master responsibility)
-        for pid in self._childs: os.waitpid(pid, 0)
+        for pid in list(self._childs): self._join(pid, kill = False)
 
         # prints a message about the end of the child process joining
         # this is relevant to make sure everything is ok before exit
@@ -1160,13 +1273,13 @@ class AbstractBase(observer.Observable):
         # unsubscription has been created for the event fd of the pool
         self.debug("Unsubscribed for read operations on event fd")
 
-    def tensure(self):
+    def tensure(self, count = 10):
         if self.tpool: return
-        self.tstart()
+        self.tstart(count = count)
 
-    def tstart(self):
+    def tstart(self, count = 10):
         if self.tpool: return
-        self.tpool = netius.pool.TaskPool()
+        self.tpool = netius.pool.TaskPool(count = count)
         self.tpool.start()
         self.pregister(self.tpool)
 
@@ -1245,6 +1358,13 @@ class AbstractBase(observer.Observable):
             (len(connection.owner.connections), connection.owner.name)
         )
 
+    def on_idle(self, connection):
+        self.debug(
+            "Connection '%s' from '%s' idle timeout" %
+            (connection.id, connection.owner.name)
+        )
+        connection.close()
+
     def on_stream_c(self, stream):
         connection = stream.connection
         self.debug(
@@ -1263,6 +1383,11 @@ class AbstractBase(observer.Observable):
         self.trigger("fork", self)
 
     def on_child(self):
+        # schedules the first report of the child statistics to the master
+        # process, this report is going to be re-scheduled periodically
+        if not self._report_fd == None:
+            self.delay(self._report, timeout = REPORT_INTERVAL)
+
         # triggers the child event indicating that a new child has been
         # created and than any callback operation may now be performed
         self.trigger("child", self)
@@ -1281,10 +1406,22 @@ class AbstractBase(observer.Observable):
             state = self.get_state_s(),
             poll = self.get_poll_name()
         )
+        if self._workers: info.update(
+            connections = sum(
+                (worker["stats"] or {}).get("connections", 0) for worker in\
+                    self._workers.values()
+            ),
+            children = len(self._workers),
+            workers = self.workers_dict()
+        )
         if full: info.update(
             name = self.name,
+            scheduler = self.scheduler.info_dict(full = full),
             _lid = self._lid
         )
+        if self.stats: info.update(
+            loop = self.stats.info_dict(full = full)
+        )
         return info
 
     def info_string(self, full = False, safe = True):
@@ -1299,6 +1436,20 @@ class AbstractBase(observer.Observable):
         )
         return info_s
 
+    def workers_dict(self):
+        workers = []
+        current = time.time()
+        for pid, worker in self._workers.items():
+            info = dict(
+                pid = pid,
+                index = worker["index"],
+                uptime = current - worker["started"],
+                stats = worker["stats"]
+            )
+            workers.append(info)
+        workers.sort(key = lambda info: info["index"])
+        return workers
+
     def connections_dict(self, full = False):
         connections = []
         for connection in self.connections:
@@ -1315,6 +1466,38 @@ class AbstractBase(observer.Observable):
         if not connection: return None
         return connection.info_dict(full = full)
 
+    def loop_dict(self, full = False):
+        if not self.stats: return dict()
+        return self.stats.info_dict(full = full)
+
+    def loop_reset(self):
+        if not self.stats: return
+        self.stats.reset()
+
+    def profile(self, duration = SAMPLE_DURATION, rate = SAMPLE_RATE):
+        """
+        Runs the sampling profiler over the event loop thread for the
+        provided amount of time, blocking the calling thread (that must
+        not be the event loop thread) until the sampling is finished.
+
+        Only one profile is run at a time, the concurrent calls wait
+        for the running one to finish (avoiding the extra overhead).
+
+        :type duration: float
+        :param duration: The amount of time (in seconds) during which
+        the event loop thread is going to be sampled.
+        :type rate: int
+        :param rate: The number of samples to be taken per second.
+        :rtype: Sampler
+        :return: The sampler that contains the aggregated stacks, that
+        may be retrieved in the collapsed (flamegraph) format.
+        """
+
+        if not self.tid: raise errors.NetiusError("Event loop not running")
+        sampler = Sampler(self.tid, rate = rate)
+        with self._profile_lock: sampler.run(duration = duration)
+        return sampler
+
     def new_connection(self, socket, address, ssl = False):
         """
         Creates a new connection for the provided socket
@@ -1460,6 +1643,25 @@ class AbstractBase(observer.Observable):
         self.poll = self.poll_c()
         return self.poll
 
+    def build_scheduler(self):
+        # runs the testing of the scheduler again and verifies if the
+        # scheduler class has changed in case it did not returns the
+        # current scheduler instance as expected by the infra-structure
+        scheduler_c = AbstractBase.test_scheduler(preferred = self.scheduler_name)
+        if scheduler_c == self.scheduler_c: return self.scheduler
+
+        # creates the new scheduler instance moving the complete set of
+        # pending handles from the current one into it (no delays lost)
+        scheduler = scheduler_c()
+        for handle in self.scheduler.handles(): scheduler.push(handle)
+        self.scheduler.clear()
+
+        # updates the scheduler class with the new value and returns the
+        # new scheduler instance to the caller method
+        self.scheduler_c = scheduler_c
+        self.scheduler = scheduler
+        return self.scheduler
+
     def get_id(self, unique = True):
         base = NAME + "-" + self.name
         if not unique: return base
@@ -1663,6 +1865,88 @@ class AbstractBase(observer.Observable):
         is_pending = not _socket._pending == None
         return is_pending
 
+    def _loop_stats(self):
+        """
+        Instrumented version of the event loop, that measures the time
+        spent in each of the phases of the loop (ticks, poll and the
+        handling of the events) and the time spent handling each event,
+        registering the slow ones (above the threshold).
+
+        The events are handled one at a time calling the handler of each
+        of them directly (so that the handler is measured and reported)
+        and the loop is otherwise equivalent to the default one.
+        """
+
+        stats = self.stats
+        threshold = stats.threshold
+
+        while self._running:
+            # runs the tick operation measuring the time spent in it, note
+            # that the delayed callables are measured by the scheduler
+            start = time.time()
+            self.ticks()
+            end = time.time()
+            stats.phase("ticks", end - start)
+
+            # updates the current state to poll to indicate
+            # that the base service is selecting the connections
+            self.set_state(STATE_POLL)
+
+            # runs the poll operation measuring both the wait time
+            # and the total number of events for the three lists
+            start = time.time()
+            reads, writes, errors = self.poll.poll()
+            end = time.time()
+            stats.tick(end - start, len(reads) + len(writes) + len(errors))
+
+            # handles each of the selected sockets (one at a time) for
+            # each of the three operations calling the handler of the
+            # socket directly and measuring the time spent in it, note
+            # that the operation method is called with no sockets so
+            # that the state (and any extra accounting) is updated
+            for phase, method, index, sockets in (
+                ("reads", self.reads, 0, reads),
+                ("writes", self.writes, 1, writes),
+                ("errors", self.errors, 2, errors)
+            ):
+                method(())
+                for _socket in sockets:
+                    handler = self._handlers(_socket)[index]
+                    if not handler: continue
+                    start = time.time()
+                    handler(_socket)
+                    duration = time.time() - start
+                    stats.phase(phase, duration)
+                    if duration > threshold: stats.slow_callback(
+                        handler,
+                        duration,
+                        extra = self._stats_extra(_socket)
+                    )
+
+    def _handlers(self, _socket):
+        """
+        Retrieves the handlers (bound methods) for the read, write and
+        error operations of the provided socket, these are the same
+        handlers that are called by the reads, writes and errors methods
+        and are used by the instrumented loop to call (and measure) them.
+
+        The default implementation has no handlers as the abstract base
+        does not handle any operation for its sockets.
+
+        :type _socket: Socket
+        :param _socket: The socket to retrieve the handlers for.
+        :rtype: Tuple
+        :return: The tuple with the read, write and error handlers of
+        the socket, an unset value means that there's no handler.
+        """
+
+        return (None, None, None)
+
+    def _stats_extra(self, _socket):
+        connection = self.connections_m.get(_socket, None)
+        if not connection: return None
+        return "connection %d" % connection.id
+
     def _delays(self):
         """
         Calls the complete set of elements that are considered to
@@ -1682,70 +1966,82 @@ class AbstractBase(observer.Observable):
         self.delay_m()
 
         # in case there's no delayed items to be called returns immediately
-        # otherwise creates a copy of the delayed list and removes all
-        # of the elements from the current list in instance
-        if not self._delayed: return
+        # as there's nothing pending to be done in the scheduler
+        if self.scheduler.is_empty(): return
 
         # retrieves the value for the current timestamp, to be used in
         # comparisons against the target timestamps of the callables
         current = time.time()
 
-        # creates the lists that will hold all the values that are not
-        # yet ready to be called in this iteration, the value in this
-        # list will be added back to the heap at the end of the iteration
-        pendings = []
-        pendings_o = []
-
-        # iterates over all the delayed callable tuples to try to find
-        # (and call) the ones that are meant to be executed in the past
-        # (have a target timestamp with a value less than the current)
-        while self._delayed:
-            # "pops" the current item from the delayed list to be used
-            # in the execution of the current iteration cycle
-            callable_t = heapq.heappop(self._delayed)
-            callable_o = heapq.heappop(self._delayed_o)
-
-            # unpacks the current callable tuple in iteration into a
-            # target (timestamp value) and a method to be called in
-            # case the target timestamp is valid (in the past)
-            target, _did, method, lid = callable_t
-
-            # tests if the current target is valid (less than or
-            # equals to the current time value) and in case it's
-            # not restores the value to the heap and breaks the loop
-            is_valid = target <= current
-            if not is_valid:
-                pendings.append(callable_t)
-                pendings_o.append(callable_o)
-                break
-
-            # in case the loop id present in the delayed call tuple is
-            # the same as the current iteration identifier then the
-            # call must be done in the next iteration cycle, this
-            # verification avoids loops in calls, note that this verification
-            # is only required for target zero calls referring the delayed
-            # calls to be executed immediately (on next loop)
-            if target == 0 and self._lid == lid:
-                pendings.append(callable_t)
-                pendings_o.append(callable_o)
-                continue
-
-            # calls the callback method as the delayed operation is
-            # now meant to be run, this is an operation that may change
-            # the current list of delayed object (causing cycles) and so
-            # must be implemented with the proper precautions
-            method()
-
-        # iterates over all the pending callable tuple values and adds
-        # them back to the delayed heap list so that they are called
-        # latter on (not ready to be called now)
-        for pending, pending_o in zip(pendings, pendings_o):
-            heapq.heappush(self._delayed, pending)
-            heapq.heappush(self._delayed_o, pending_o)
-
-        # in case the delayed list is empty resets the delay id so that
-        # it never gets into a very large number, would break performance
-        if not self._delayed: self._did = 0
+        # runs the scheduler for the current timestamp and loop id, this
+        # should call all the callables that are ready to be called, note
+        # that the loop id is used to avoid loops in next tick calls
+        self.scheduler.run(current, self._lid)
+
+    def _handoff_h(self):
+        if self.tpool: self.tpool.denotify()
+        self._flush_handoff()
+
+    def _flush_handoff(self):
+        """
+        Flushes the (loop wide) hand off queue moving the data in it
+        into the pending queues of the associated connections and then
+        flushing these connections, must be called from the event loop
+        thread (the only consumer of the hand off queue).
+        """
+
+        # unsets the hand off delayed flag so that new data handed off
+        # from now on triggers a new flush (avoiding data left behind)
+        self._handoff_d = False
+
+        # moves the complete set of data in the hand off queue into the
+        # pending queues of the connections (from the event loop thread)
+        # updating the size of the data pending to be sent accordingly,
+        # note that the data of the already closed connections is ignored
+        connections = []
+        while self._handoff:
+            connection, data, data_l = self._handoff.popleft()
+            if connection.status == CLOSED: continue
+            if connection.pending == None: connection.pending = collections.deque()
+            connection.pending.append(data)
+            connection.pending_s += data_l
+            if not connection in connections: connections.append(connection)
+
+        # flushes the pending data of each of the connections in case they
+        # are ready for writing, otherwise ensures that the write stream
+        # is ready (for a latter flush operation)
+        for connection in connections:
+            if connection.status == CLOSED: continue
+            if connection.wready: connection._flush_write()
+            else: connection.ensure_write()
+
+    def _idle(self, connection):
+        """
+        Sets (or refreshes) the idle timeout for the provided connection
+        according to the currently configured idle timeout value.
+
+        The same handle is re-used for the complete lifetime of the
+        connection (re-scheduled on activity) so that no new callables
+        are created for every read or write operation.
+
+        :type connection: Connection
+        :param connection: The connection for which the idle timeout
+        is going to be set or refreshed.
+        """
+
+        # in case there's no idle timeout defined for the current
+        # instance returns immediately as there's nothing to be done
+        if not self.idle_timeout: return
+
+        # tries to re-schedule the current idle handle of the connection
+        # and if that's not possible (no handle or already executed)
+        # creates a new one, that closes the connection once executed
+        handle = connection.idle_handle
+        if handle and handle.reschedule(self.idle_timeout): return
+        connection.idle_handle = self.delay(
+            lambda: self.on_idle(connection),
+            timeout = self.idle_timeout
+        )
 
     def _generate(self, hashed = True):
         """
@@ -2066,6 +2362,222 @@ class AbstractBase(observer.Observable):
     def _wait_forever(self):
         while True: time.sleep(60)
 
+    def _spawn(self, index):
+        # creates the pipe that is going to be used by the child process
+        # to report its statistics to the master process (supervisor)
+        rfd, wfd = os.pipe()
+
+        # runs the concrete fork operation and determines if the current
+        # process is the child one, if that's the case closes the master
+        # side of the communication (inherited), restores the default signal
+        # handlers (the master ones only record signals) and runs the child logic
+        pid = os.fork() #@UndefinedVariable
+        self._child = pid == 0
+        if self._child:
+            os.close(rfd)
+            for worker in self._workers.values(): os.close(worker["fd"])
+            self._childs = []
+            self._workers = dict()
+            self._replacing = []
+            self._draining = []
+            self._child_index = index
+            self._report_fd = wfd
+            self.bind_signals()
+            self.on_child()
+            return pid
+
+        # closes the child side of the pipe and registers the newly created
+        # child process in the master structures for supervision
+        os.close(wfd)
+        self._register(pid, index, rfd)
+        return pid
+
+    def _register(self, pid, index, fd):
+        self._childs.append(pid)
+        self._workers[pid] = dict(
+            index = index,
+            started = time.time(),
+            fd = fd,
+            buffer = b"",
+            stats = None
+        )
+
+    def _supervise(self):
+        # creates the maps that associate the index of a child process with
+        # the number of consecutive early deaths of it and with the target
+        # timestamp for its respawn (backoff based respawn operation)
+        failures = dict()
+        pending = dict()
+
+        while True:
+            # waits for the reports from the child processes, this is the
+            # operation that "sleeps" the master between supervision steps
+            # (note that the wait is interrupted by the arrival of signals)
+            fds = [worker["fd"] for worker in self._workers.values()]
+            try: reads, _writes, _errors = select.select(fds, [], [], RESPAWN_DELAY)
+            except (select.error, OSError): reads = []
+            for fd in reads: self._receive(fd)
+
+            # handles the complete set of signals received meanwhile, the
+            # hangup one triggers a rolling restart of the children and any
+            # other signal implies the stop of the supervision (and master)
+            signals, self._signals = self._signals, []
+            for signum in signals:
+                is_restart = hasattr(signal, "SIGHUP") and\
+                    signum == signal.SIGHUP #@UndefinedVariable
+                if not is_restart: return False
+                if self._restart(): return True
+
+            # reaps the complete set of children that have died meanwhile
+            # and schedules their respawn, with an exponential backoff for
+            # the ones that died before being considered stable
+            while True:
+                try: pid, _status = os.waitpid(-1, os.WNOHANG) #@UndefinedVariable
+                except OSError: break
+                if pid == 0: break
+                worker = self._reap(pid)
+                if not worker: continue
+                if pid in self._draining: self._draining.remove(pid); continue
+                index = worker["index"]
+                if not self.respawn: self._release(index); continue
+                uptime = time.time() - worker["started"]
+                count = failures.get(index, 0)
+                count = count + 1 if uptime < RESPAWN_STABLE else 0
+                delay = min(RESPAWN_DELAY * 2 ** (count - 1), RESPAWN_MAX) if count else 0.0
+                if delay: self._release(index)
+                failures[index] = count
+                pending[index] = time.time() + delay
+                self.warning(
+                    "Child process %d (index %d) died, respawning in %.2fs ..." %\
+                    (pid, index, delay)
+                )
+
+            # continues the (possible) rolling restart replacing the next
+            # child, in case the current process is a new child returns
+            if self._replace(): return True
+
+            # respawns the children whose backoff delay has expired, note that
+            # the new process is a child one an immediate valid value is returned
+            current = time.time()
+            for index, target in list(pending.items()):
+                if target > current: continue
+                del pending[index]
+                self._acquire(index)
+                self._spawn(index)
+                if self._child: return True
+
+            # in case there are no more children running and none is pending
+            # for respawn, there's nothing remaining to be supervised
+            if not self._childs and not pending: return False
+
+    def _release(self, index):
+        """
+        Releases the resources held by the master process on behalf
+        of the child with the provided index, called when such child
+        is not going to be respawned (at least not immediately).
+
+        The default implementation does nothing as the base structure
+        holds no resources for a specific child.
+
+        :type index: int
+        :param index: The index of the child process whose resources
+        are going to be released.
+        """
+
+        pass
+
+    def _acquire(self, index):
+        """
+        Acquires (re-creates) the resources required by the child with
+        the provided index, that may have been previously released, this
+        is called immediately before the (re-)spawn of the child.
+
+        :type index: int
+        :param index: The index of the child process whose resources
+        are going to be acquired.
+        """
+
+        pass
+
+    def _restart(self):
+        # prints an info message about the rolling restart and then
+        # schedules the replacement of the current children (the ones
+        # not being replaced already) starting the first replacement
+        self.info("Rolling restart of '%d' children processes ..." % len(self._childs))
+        self._replacing = [pid for pid in self._childs if not pid in self._draining]
+        return self._replace()
+
+    def _replace(self):
+        # in case there's a child still draining (stopping) the next one
+        # is only replaced after it's reaped by the supervision loop, so
+        # that only one child is being replaced at a certain time
+        if self._draining: return False
+
+        # iterates over the children scheduled for replacement, starting the
+        # new process before terminating the one it replaces, note that the
+        # termination is not waited here (non blocking) as the old child
+        # may take a while to drain its connections, it's reaped latter
+        while self._replacing:
+            pid = self._replacing.pop(0)
+            worker = self._workers.get(pid, None)
+            if not worker: continue
+            self._spawn(worker["index"])
+            if self._child: return True
+            self._kill(pid)
+            self._draining.append(pid)
+            break
+
+        return False
+
+    def _kill(self, pid, signum = signal.SIGTERM):
+        try: os.kill(pid, signum)
+        except OSError: pass
+
+    def _join(self, pid, kill = True):
+        if kill: self._kill(pid)
+        try: os.waitpid(pid, 0)
+        except OSError: pass
+        return self._reap(pid)
+
+    def _reap(self, pid):
+        worker = self._workers.pop(pid, None)
+        if pid in self._childs: self._childs.remove(pid)
+        if worker: os.close(worker["fd"])
+        return worker
+
+    def _receive(self, fd):
+        # tries to find the worker associated with the provided file
+        # descriptor and in case there's none returns immediately
+        workers = [worker for worker in self._workers.values() if worker["fd"] == fd]
+        if not workers: return
+        worker = workers[0]
+
+        # reads the currently available data from the pipe and splits it
+        # into complete (newline terminated) reports, keeping the remaining
+        # in the buffer, the last complete report is stored as the stats
+        try: data = os.read(fd, 65536)
+        except OSError: return
+        buffer = worker["buffer"] + data
+        lines = buffer.split(b"\n")
+        worker["buffer"] = lines.pop()
+        for line in lines:
+            try: worker["stats"] = json.loads(legacy.str(line))
+            except ValueError: pass
+
+    def _report(self):
+        # tries to write the current statistics of the process to the
+        # pipe associated with the master process, in case there's an
+        # error (eg: master is dead) the report operation is stopped
+        info = self.info_dict()
+        info.update(pid = os.getpid(), index = self._child_index)
+        data = json.dumps(info) + "\n"
+        try: os.write(self._report_fd, legacy.bytes(data))
+        except OSError: return
+
+        # re-schedules the report operation for the next interval, so
+        # that the master process gets up-to-date statistics
+        self.delay(self._report, timeout = REPORT_INTERVAL)
+
 class DiagBase(AbstractBase):
 
     def __init__(self, *args, **kwargs):
@@ -58,7 +58,8 @@ the home directory contents to a different directory """
 CASTS = {
     bool : lambda v: v if type(v) == bool else v == "1",
     list : lambda v: v if type(v) == list else v.split(";"),
-    tuple : lambda v: v if type(v) == tuple else tuple(v.split(";"))
+    tuple : lambda v: v if type(v) == tuple else tuple(v.split(";")),
+    dict : lambda v: v if type(v) == dict else json.loads(v)
 }
 """ The map containing the various cast method
 operation associated with the various data types,
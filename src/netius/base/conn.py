@@ -37,13 +37,15 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
 import ssl
 import time
-import uuid
 import errno
 import socket
 import datetime
+import itertools
 import threading
+import collections
 
 from . import tls
 from . import config
@@ -66,6 +68,43 @@ CHUNK_SIZE = 16384
 """ The size of the chunk to be used while received
 data from the service socket """
 
+SEND_BUFFERS = 64
+""" The maximum number of pending buffers that are going to
+be gathered for a single (vectored) send operation, this is
+the budget on the number of io vectors per system call """
+
+SEND_SIZE = 262144
+""" The maximum number of bytes that are going to be gathered
+for a single (vectored or coalesced) send operation, note that
+the last buffer gathered may overflow this budget """
+
+IDENTIFIERS = itertools.count(1)
+""" The global (and thread safe) sequence of integer identifiers
+that are going to be assigned to the connections, unique for
+the complete lifetime of the current process """
+
+class FileRange(object):
+    """
+    Range of a file that is pending to be sent through a connection
+    using the zero copy (sendfile) approach, meaning that the contents
+    of the file never pass through the user space.
+
+    The range is updated (advanced) as its contents are being sent,
+    so its length is always the number of bytes remaining.
+    """
+
+    def __init__(self, file, offset, count):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def advance(self, count):
+        self.offset += count
+        self.count -= count
+
 class BaseConnection(observer.Observable):
     """
     Abstract connection object that should encapsulate
@@ -76,8 +115,37 @@ class BaseConnection(observer.Observable):
     select associated complexities adding and removing the
     underlying socket from the selecting mechanism for the
     appropriate operations.
+
+    The connection is represented in a compact (slotted) way, with
+    the queue of pending data created only when required, as a large
+    number of (mostly idle) connections may exist at the same time,
+    note that the dictionary is kept for the (lazy) storage of the
+    dynamic attributes set in the connection.
     """
 
+    __slots__ = (
+        "status",
+        "id",
+        "connecting",
+        "upgrading",
+        "owner",
+        "socket",
+        "address",
+        "ssl",
+        "ssl_host",
+        "max_pending",
+        "min_pending",
+        "renable",
+        "wready",
+        "pending_s",
+        "pending",
+        "send_buffers",
+        "send_size",
+        "idle_handle",
+        "__dict__",
+        "__weakref__"
+    )
+
     def __init__(
         self,
         owner = None,
@@ -89,7 +157,7 @@ class BaseConnection(observer.Observable):
     ):
         observer.Observable.__init__(self)
         self.status = PENDING
-        self.id = str(uuid.uuid4())
+        self.id = next(IDENTIFIERS)
         self.connecting = False
         self.upgrading = False
         self.owner = owner
@@ -102,12 +170,14 @@ class BaseConnection(observer.Observable):
         self.renable = True
         self.wready = False
         self.pending_s = 0
-        self.pending = []
-        self.pending_lock = threading.RLock()
+        self.pending = None
+        self.send_buffers = SEND_BUFFERS
+        self.send_size = SEND_SIZE
+        self.idle_handle = None
 
     def destroy(self):
         observer.Observable.destroy(self)
-        del self.pending[:]
+        self.pending = None
 
     def open(self, connect = False):
         # in case the current status of the connection is already open
@@ -183,10 +253,15 @@ class BaseConnection(observer.Observable):
         # should avoid extra erroneous write operations
         self.wready = False
 
-        # resets the size of the data pending to be send and the clears
-        # the list of pending information (invalidation the previous one)
+        # resets the size of the data pending to be send and the releases
+        # the queue of pending information (invalidation the previous one)
         self.pending_s = 0
-        del self.pending[:]
+        self.pending = None
+
+        # cancels the idle timeout handle (if any) so that the scheduler
+        # releases its reference to the callable (and to the connection)
+        if self.idle_handle: self.idle_handle.cancel()
+        self.idle_handle = None
 
         # retrieves the reference to the owner object from the
         # current instance to be used to removed the socket from the
@@ -383,6 +458,10 @@ class BaseConnection(observer.Observable):
         An optional callback attribute may be sent, so that when the
         send is complete it's called with a reference to the data object.
 
+        When called from a thread other than the event loop one the
+        data is handed off to the event loop (through a dedicated queue)
+        and sent on its next tick, otherwise no locking is performed.
+
         Calling this method should be done with care as this can
         create dead lock or socket corruption situations, extreme
         knowledge of the internals of the system is required.
@@ -407,8 +486,10 @@ class BaseConnection(observer.Observable):
         # ensures that the data type of the current data string
         # is the required one for the output operations (binary)
         # in case it's not the required transformation operations
-        # should be performed so that the data format is compatible
-        data = legacy.bytes(data) if data else data
+        # should be performed so that the data format is compatible,
+        # note that file ranges are sent as they are (zero copy)
+        is_file = type(data) == FileRange
+        if not is_file: data = legacy.bytes(data) if data else data
 
         # calculates the size in bytes of the provided data so
         # that it may be used latter for the incrementing of
@@ -429,14 +510,24 @@ class BaseConnection(observer.Observable):
         tid = cthread.ident or 0
         is_safe = tid == self.owner.tid
 
-        # acquires the pending lock and then inserts the data into
-        # the list of pending information to sent to the client end
-        # point, notice that it's inserted at the beginning of the list
-        # as the pop operation is performed at the end of list, meaning
-        # that the fifo strategy is maintained
-        self.pending_lock.acquire()
-        try: self.pending.insert(0, data)
-        finally: self.pending_lock.release()
+        # in case the current thread is not the event loop one the data
+        # is handed off to the loop thread through the hand off queue
+        # of the owner (no locking is required on the loop side)
+        if not is_safe: return self.owner.handoff(self, data, data_l)
+
+        # in case there's data pending in the hand off queue (sent from
+        # a different thread) it must be flushed first, so that the order
+        # of the data sent through the connection is maintained
+        if self.owner._handoff: self.owner._flush_handoff()
+
+        # appends the data to the queue of pending information to sent
+        # to the client end point (creating it if required), notice that
+        # the data is appended to the end of the queue and the sending is
+        # performed from its beginning, meaning that the fifo strategy is
+        # maintained, note that as this is only done from the event loop
+        # thread there's no need to lock the access to the pending queue
+        if self.pending == None: self.pending = collections.deque()
+        self.pending.append(data)
 
         # increments the size of the pending data to be sent by
         # the size of the inner data buffer to be added (as requested)
@@ -445,12 +536,12 @@ class BaseConnection(observer.Observable):
         # verifies if the write ready flag is set, for that
         # case the send flushing operation must be performed
         if self.wready:
-            # checks if the safe flag is set and if it is runs
+            # checks if the delay flag is unset and if it is runs
             # the send operation right way otherwise "waits" until
             # the next tick operation (delayed execution), note that
             # running the flush operation immediately may lead to
             # typical stack overflow errors (due to recursion limit)
-            if is_safe and not delay: self._flush_write()
+            if not delay: self._flush_write()
             else: self.owner.delay(
                 self._flush_write,
                 immediately = True,
@@ -466,6 +557,68 @@ class BaseConnection(observer.Observable):
         # that has been submitted to be sent (as soon as possible)
         return data_l
 
+    def send_file(
+        self,
+        file,
+        offset = None,
+        count = None,
+        delay = True,
+        force = False,
+        callback = None
+    ):
+        """
+        Sends the contents of the provided file (or a range of it)
+        through the connection using the zero copy approach (sendfile)
+        so that the data never passes through the user space.
+
+        The sending is driven by the write readiness of the connection
+        and is ordered with the data sent using the send method.
+
+        This method should only be used for non secure connections (as
+        the data must be encrypted in user space) and in systems where
+        the sendfile system call is available.
+
+        :type file: File
+        :param file: The file object (with a valid file descriptor) from
+        which the contents are going to be sent.
+        :type offset: int
+        :param offset: The offset in the file from which the sending
+        should start, if not provided the current position is used.
+        :type count: int
+        :param count: The number of bytes to be sent from the file, if
+        not provided the remaining of the file is sent.
+        :type delay: bool
+        :param delay: If the send operation should be delayed until
+        the next tick operation or if it should be performed as
+        soon as possible (as defined in specification).
+        :type force: bool
+        :param force: If the sending of the data should be "forced",
+        meaning that even if the connection is not open the data
+        is added to the current pending queue.
+        :type callback: Function
+        :param callback: Function to be called when the file contents
+        are completely sent to the socket.
+        :rtype: int
+        :return: The number of bytes that have been submitted to be
+        sent through the connection.
+        """
+
+        # determines the offset and the count of bytes to be sent from
+        # the file defaulting to the remaining of the file (from the
+        # current position) in case no values are provided
+        if offset == None: offset = file.tell()
+        if count == None: count = os.fstat(file.fileno()).st_size - offset
+
+        # creates the file range structure to be added to the pending
+        # queue and uses the default send operation to schedule it
+        data = FileRange(file, offset, count)
+        return self.send(
+            data,
+            delay = delay,
+            force = force,
+            callback = callback
+        )
+
     def recv(self, size = CHUNK_SIZE):
         return self._recv(size = size)
 
@@ -535,92 +688,171 @@ class BaseConnection(observer.Observable):
         # is still set as it may be used later for flushing operations
         if self.connecting: return
 
-        # acquires the pending lock so that no other access to the
-        # the pending structure is made from a different thread
-        self.pending_lock.acquire()
-
-        try:
-            # iterates continuously so that all the pending data to be
-            # sent is correctly sent to the other peer if that's possible
-            while True:
-                # verifies if there's data pending to be sent in case
-                # there's not returns immediately, because there's
-                # nothing pending to be done for such case
-                if not self.pending: break
-
-                # retrieves the current data chunk to be send from the
-                # list of pending things and then saves the data chunk
-                # in an "original" object an tries to unpack it in case
-                # the type of it is a tuple
-                data = self.pending.pop()
-                data_o = data
-                callback = None
-                is_tuple = type(data) == tuple
-                if is_tuple: data, callback = data
-                is_close = data == None
-                data_l = 0 if is_close else len(data)
-
-                try:
-                    # tries to send the data through the socket and
-                    # retrieves the number of bytes that were correctly
-                    # sent through the socket, this number may not be
-                    # the same as the size of the data in case only
-                    # part of the data has been sent, note that if no
-                    # data is provided the shutdown operation is performed
-                    # instead to close the stream between both sockets
-                    if is_close: self._shutdown(); count = 0
-                    elif data: count = self.socket.send(data)
-                    else: count = 0
-
-                    # verifies if the current situation is that of a non
-                    # closed socket and valid data, and if that's the case
-                    # and no data has been sent the socket is considered to
-                    # be in a would block situation and and such an error
-                    # is raised indicating the issue (is going to be caught
-                    # as a normal would block exception)
-                    if not is_close and data and count == 0:
-                        raise socket.error(errno.EWOULDBLOCK)
-                except:
-                    # sets the current connection write ready flag to false
-                    # so that a new level notification must be received
-                    self.wready = False
-
-                    # ensures that the write event is going to be triggered
-                    # this is required so that the remaining pending data is
-                    # going to be correctly written on a new write event,
-                    # triggered when the connection is ready for more writing
-                    self.ensure_write()
-
-                    # in case there's an exception must add the data
-                    # object to the list of pending data because the data
-                    # has not been correctly sent
-                    self.pending.append(data_o)
-                    raise
-                else:
-                    # decrements the size of the pending buffer by the number
-                    # of bytes that were correctly send through the buffer
-                    self.pending_s -= count
-
-                    # verifies if the data has been correctly sent through
-                    # the socket and for suck situations calls the callback
-                    # object, otherwise creates a new data object with only
-                    # the remaining (partial data) and the callback to be
-                    # sent latter (only then the callback is called)
-                    is_valid = count == data_l
-                    if is_valid:
-                        callback and callback(self)
-                    else:
-                        data_o = (data[count:], callback)
-                        self.pending.append(data_o)
-        finally:
-            # releases the pending access lock so that no leaks
-            # exists and no access to the pending is prevented
-            self.pending_lock.release()
+        # iterates continuously so that all the pending data to be
+        # sent is correctly sent to the other peer if that's possible,
+        # note that no locking is required as the pending queue is only
+        # accessed from the event loop thread (from where this is called)
+        while True:
+            # verifies if there's data pending to be sent in case
+            # there's not the (empty) queue is released and the loop
+            # is broken, because there's nothing pending to be done
+            if not self.pending: self.pending = None; break
+
+            # gathers the batch of (oldest) pending buffers that are going
+            # to be sent in the current iteration, limited by the budget
+            # of buffers and bytes, note that a close operation (no data)
+            # is always handled on its own (as a single element batch)
+            buffers, callbacks, data_l, is_close = self._gather()
+
+            try:
+                # tries to send the data through the socket and
+                # retrieves the number of bytes that were correctly
+                # sent through the socket, this number may not be
+                # the same as the size of the data in case only
+                # part of the data has been sent, note that if no
+                # data is provided the shutdown operation is performed
+                # instead to close the stream between both sockets,
+                # multiple buffers are sent using a single vectored
+                # (scatter/gather) operation or, for sockets that
+                # do not support it (eg: ssl), coalesced into one
+                if is_close: self._shutdown(); count = 0
+                elif not data_l: count = 0
+                elif type(buffers[0]) == FileRange: count = self._send_file(buffers[0])
+                elif len(buffers) == 1: count = self.socket.send(buffers[0])
+                elif self._vectored(): count = self.socket.sendmsg(buffers)
+                else: count = self.socket.send(self._join(buffers))
+
+                # verifies if the current situation is that of a non
+                # closed socket and valid data, and if that's the case
+                # and no data has been sent the socket is considered to
+                # be in a would block situation and and such an error
+                # is raised indicating the issue (is going to be caught
+                # as a normal would block exception)
+                if not is_close and data_l and count == 0:
+                    raise socket.error(errno.EWOULDBLOCK)
+            except:
+                # sets the current connection write ready flag to false
+                # so that a new level notification must be received
+                self.wready = False
+
+                # ensures that the write event is going to be triggered
+                # this is required so that the remaining pending data is
+                # going to be correctly written on a new write event,
+                # triggered when the connection is ready for more writing,
+                # note that the data remains in the queue of pending data
+                # as it has not been removed from it (not sent)
+                self.ensure_write()
+                raise
+            else:
+                # decrements the size of the pending buffer by the number
+                # of bytes that were correctly send through the buffer
+                self.pending_s -= count
+
+                # removes the buffers that have been completely sent from
+                # the pending queue (keeping only the remaining of a partial
+                # one) and calls their callbacks, note that the callbacks
+                # are only called after the update of the pending queue as
+                # they may (re-)enter the send operation
+                self._consume(buffers, callbacks, count, is_close)
 
         # removes the current connection from the set of connections
         # that are monitored for any write event (no longer required)
         self.remove_write()
 
+    def _gather(self):
+        # starts the structures that are going to hold the buffers and
+        # the callbacks of the batch and the total size of it (in bytes)
+        buffers = []
+        callbacks = []
+        data_l = 0
+
+        # iterates over the pending queue starting from the oldest element
+        # (beginning of the queue) gathering buffers until the budget is
+        # reached, note that the close element (no data) and the file range
+        # are never gathered with other elements (handled on their own)
+        for data in self.pending:
+            callback = None
+            is_tuple = type(data) == tuple
+            if is_tuple: data, callback = data
+            is_close = data == None
+            is_file = type(data) == FileRange
+            if (is_close or is_file) and buffers: break
+            if is_close: return buffers, [callback], 0, True
+            if is_file: return [data], [callback], len(data), False
+            buffers.append(data)
+            callbacks.append(callback)
+            data_l += len(data)
+            if len(buffers) >= self.send_buffers: break
+            if data_l >= self.send_size: break
+
+        # returns the gathered batch of buffers, callbacks and size
+        # to the caller method (not a close operation)
+        return buffers, callbacks, data_l, False
+
+    def _consume(self, buffers, callbacks, count, is_close = False):
+        # in case the batch refers a close operation, removes it from
+        # the pending queue and calls its callback (if any)
+        if is_close:
+            self.pending.popleft()
+            callback = callbacks[0]
+            callback and callback(self)
+            return
+
+        # iterates over the buffers of the batch removing the ones that
+        # have been completely sent (consuming the count) and replacing
+        # the partially sent one (if any) with a memory view over its
+        # remaining part, advancing the offset without copying the data
+        # (file ranges are advanced in place, as they're mutable)
+        done = []
+        for data, callback in zip(buffers, callbacks):
+            data_l = len(data)
+            if count < data_l and type(data) == FileRange:
+                data.advance(count)
+                break
+            if count < data_l:
+                is_view = type(data) == memoryview
+                view = data if is_view else memoryview(data)
+                if count: self.pending[0] = (view[count:], callback)
+                break
+            count -= data_l
+            self.pending.popleft()
+            done.append(callback)
+
+        # calls the callbacks of the buffers that have been completely
+        # sent (in order) stopping in case the connection is closed by
+        # one of them (no more callbacks are expected to be called)
+        for callback in done:
+            if not callback: continue
+            callback(self)
+            if self.status == CLOSED: break
+
+    def _join(self, buffers):
+        # joins the provided buffers into a single one, note that under
+        # python 2 the memory view buffers must be converted first as
+        # there's no support for them in the join operation
+        if not legacy.PYTHON_3: buffers = [
+            data.tobytes() if type(data) == memoryview else data for data in buffers
+        ]
+        return b"".join(buffers)
+
+    def _send_file(self, data):
+        # sends the remaining of the file range through the socket using
+        # the sendfile system call (no copy to user space), note that an
+        # empty send (for a non empty range) means that the file has been
+        # truncated meanwhile, a situation that can not be recovered
+        count = os.sendfile(
+            self.socket.fileno(),
+            data.file.fileno(),
+            data.offset,
+            len(data)
+        )
+        if not count: raise IOError("Unexpected end of file")
+        return count
+
+    def _vectored(self):
+        if self.ssl: return False
+        return hasattr(self.socket, "sendmsg")
+
     def _recv(self, size):
         return self.socket.recv(size)
 
@@ -39,6 +39,8 @@ __license__ = "Apache License, Version 2.0"
 
 import logging
 
+from . import profiler
+
 try:
     import appier
     loaded = True
@@ -47,6 +49,14 @@ except:
     appier = netius.mock.appier
     loaded = False
 
+PROFILE_DURATION_MAX = 60.0
+""" The maximum amount of time (in seconds) that a profile
+request may last, avoiding endless sampling operations """
+
+PROFILE_RATE_MAX = 1000
+""" The maximum sampling rate (samples per second) that may
+be requested, to keep the overhead of the sampling bounded """
+
 class DiagApp(appier.APIApp):
 
     def __init__(self, system, *args, **kwargs):
@@ -83,8 +93,31 @@ class DiagApp(appier.APIApp):
         info = self.system.connections_dict(full = full)
         return self.json(info, sort_keys = True)
 
-    @appier.route("/connections/<str:id>", "GET")
+    @appier.route("/connections/<int:id>", "GET")
     def show_connection(self, id):
         full = self.field("full", True, cast = bool)
         info = self.system.connection_dict(id, full = full)
         return self.json(info, sort_keys = True)
+
+    @appier.route("/loop", "GET")
+    def show_loop(self):
+        full = self.field("full", True, cast = bool)
+        info = self.system.loop_dict(full = full)
+        return self.json(info, sort_keys = True)
+
+    @appier.route("/loop/reset", ("GET", "POST"))
+    def reset_loop(self):
+        self.system.loop_reset()
+        return self.show_loop()
+
+    @appier.route("/profile", "GET")
+    def run_profile(self):
+        duration = self.field("duration", profiler.SAMPLE_DURATION, cast = float)
+        rate = self.field("rate", profiler.SAMPLE_RATE, cast = int)
+        format = self.field("format", "collapsed")
+        duration = max(min(duration, PROFILE_DURATION_MAX), 0.0)
+        rate = max(min(rate, PROFILE_RATE_MAX), 1)
+        sampler = self.system.profile(duration = duration, rate = rate)
+        if format == "json": return self.json(sampler.info_dict(full = True), sort_keys = True)
+        self.content_type("text/plain")
+        return sampler.collapsed()
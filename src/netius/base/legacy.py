@@ -220,6 +220,7 @@ def chri(value):
     return value
 
 def bytes(value, encoding = "latin-1", errors = "strict", force = False):
+    if type(value) == memoryview: return value.tobytes()
     if not PYTHON_3 and not force: return value
     if value == None: return value
     if type(value) == _bytes: return value
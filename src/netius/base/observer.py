@@ -45,10 +45,16 @@ class Observable(object):
 
     This class should be friendly to multiple inheritance
     and should avoid variable naming collision.
+
+    The map of events is only created once the first handler
+    is bound, as most of the observable objects never have
+    handlers bound to them (memory saving).
     """
 
+    __slots__ = ("events",)
+
     def __init__(self, *args, **kwargs):
-        self.events = {}
+        self.events = None
 
     def build(self):
         pass
@@ -58,22 +64,25 @@ class Observable(object):
 
     def bind(self, name, method, oneshot = False):
         if oneshot: method.oneshot = oneshot
+        if self.events == None: self.events = {}
         methods = self.events.get(name, [])
         methods.append(method)
         self.events[name] = methods
 
     def unbind(self, name, method = None):
+        if not self.events: return
         methods = self.events.get(name, None)
         if not methods: return
         if method: methods.remove(method)
         else: del methods[:]
 
     def unbind_all(self):
-        if not hasattr(self, "events"): return
+        if not getattr(self, "events", None): return
         for methods in self.events.values(): del methods[:]
         self.events.clear()
 
     def trigger(self, name, *args, **kwargs):
+        if not self.events: return
         methods = self.events.get(name, None)
         if not methods: return
         oneshots = None
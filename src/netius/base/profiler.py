@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+import threading
+import collections
+
+from . import errors
+
+SAMPLE_RATE = 100
+""" The default number of samples per second taken by the
+sampling profiler, a rate above a few hundreds may impact
+the performance of the process that is being profiled """
+
+SAMPLE_DURATION = 5.0
+""" The default amount of time (in seconds) during which
+the stack of the target thread is going to be sampled """
+
+SAMPLE_DEPTH = 128
+""" The maximum number of frames of each sampled stack, the
+outer most frames (near the thread entry) are discarded """
+
+class Sampler(object):
+    """
+    Statistical sampling profiler that periodically captures the
+    stack of a target thread (typically the event loop thread) from
+    a different thread, aggregating the samples per stack.
+
+    The result is provided in the collapsed stack format (one stack
+    per line with the frames separated by semicolons and followed
+    by the number of samples) ready to be used for flamegraphs.
+
+    There's no overhead when the sampler is not running, as no hooks
+    (eg: profile or trace functions) are installed in the target.
+    """
+
+    def __init__(self, tid, rate = SAMPLE_RATE, depth = SAMPLE_DEPTH):
+        self.tid = tid
+        self.rate = rate
+        self.depth = depth
+        self.stacks = collections.defaultdict(int)
+        self.samples = 0
+        self.elapsed = 0.0
+
+    def run(self, duration = SAMPLE_DURATION):
+        """
+        Runs the sampling of the target thread for the requested
+        amount of time, blocking the current thread, note that the
+        sampling stops sooner if the target thread ends.
+
+        :type duration: float
+        :param duration: The amount of time (in seconds) during which
+        the target thread is going to be sampled.
+        :rtype: Sampler
+        :return: The current sampler instance, to be used in chained
+        calls (eg: the retrieval of the collapsed stacks).
+        """
+
+        # in case the target thread is the current one there's nothing
+        # to be sampled (the stack would be the one of the sampler)
+        if self.tid == threading.current_thread().ident:
+            raise errors.NetiusError("Cannot sample the current thread")
+
+        interval = 1.0 / self.rate
+        start = time.time()
+        target = start + duration
+
+        while True:
+            current = time.time()
+            if current >= target: break
+            frame = sys._current_frames().get(self.tid, None)
+            if not frame: break
+            self.sample(frame)
+            del frame
+            sleep = interval - (time.time() - current)
+            if sleep > 0.0: time.sleep(sleep)
+
+        self.elapsed = time.time() - start
+        return self
+
+    def sample(self, frame):
+        names = []
+        while frame and len(names) < self.depth:
+            names.append(self._name(frame))
+            frame = frame.f_back
+        names.reverse()
+        self.stacks[";".join(names)] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        stacks = sorted(self.stacks.items(), key = lambda item: (-item[1], item[0]))
+        return "\n".join("%s %d" % (stack, count) for stack, count in stacks)
+
+    def info_dict(self, full = False):
+        info = dict(
+            tid = self.tid,
+            rate = self.rate,
+            samples = self.samples,
+            stacks = len(self.stacks),
+            elapsed = self.elapsed
+        )
+        if full: info.update(collapsed = self.collapsed())
+        return info
+
+    def _name(self, frame):
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", None) or "?"
+        return "%s:%s:%d" % (module, code.co_name, code.co_firstlineno)
@@ -0,0 +1,674 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import heapq
+import collections
+
+from . import errors
+
+RESOLUTION = 0.01
+""" The default resolution (in seconds) of a tick in the
+timing wheel, timers are always fired at most one of these
+values after their target time (never before) """
+
+WHEEL_BITS = 8
+""" The number of bits used for the indexing of the slots
+of each of the levels of the hierarchical timing wheel """
+
+WHEEL_SIZE = 1 << WHEEL_BITS
+""" The number of slots per each level of the timing wheel
+(as defined by the number of bits of the index) """
+
+WHEEL_MASK = WHEEL_SIZE - 1
+""" The bit mask that is going to be used to compute the
+index of a slot from the (integer) tick value """
+
+COMPACT_MIN = 1024
+""" The minimum number of stale entries (cancelled or re-scheduled
+handles) in the binary heap before a compaction is considered,
+avoiding frequent re-builds of small heaps """
+
+WHEEL_LEVELS = 4
+""" The number of levels (wheels) in the hierarchy, with the
+default resolution this covers around 497 days, beyond that
+the timers are stored in an overflow structure """
+
+class Handle(object):
+    """
+    Lightweight handle that represents a callable that has been
+    scheduled for (delayed) execution in the event loop.
+
+    The handle is unique per scheduling operation and is the
+    unit of insertion and removal of the schedulers, allowing
+    both O(1) cancellation and duplicate detection.
+
+    Once the handle is fired or cancelled the references to both
+    the callable and the scheduler are released, so that a stale
+    handle never pins the objects referenced by the callable.
+    """
+
+    __slots__ = (
+        "target",
+        "did",
+        "lid",
+        "callable",
+        "key",
+        "tick",
+        "slot",
+        "scheduler"
+    )
+
+    def __init__(self, target, did, lid, callable, key = None, scheduler = None):
+        self.target = target
+        self.did = did
+        self.lid = lid
+        self.callable = callable
+        self.key = key
+        self.tick = None
+        self.slot = None
+        self.scheduler = scheduler
+
+    def cancel(self):
+        """
+        Cancels the execution of the callable associated with the
+        handle, this operation is safe to be called multiple times
+        and after the callable has been executed (no operation).
+        """
+
+        if not self.is_pending(): return
+        self.scheduler.cancel(self)
+
+    def reschedule(self, timeout):
+        """
+        Re-schedules the (pending) handle so that it's only executed
+        after the provided timeout (in seconds) from the current time.
+
+        This operation avoids the creation of a new handle (and new
+        callable) and should be used for timeouts that are refreshed
+        on activity (eg: connection idle timeouts).
+
+        :type timeout: float
+        :param timeout: The timeout (in seconds) from the current time
+        after which the callable is going to be executed.
+        :rtype: bool
+        :return: If the handle was re-scheduled, this is not the case
+        if the handle has already been executed or cancelled.
+        """
+
+        if not self.is_pending(): return False
+        self.scheduler.reschedule(self, time.time() + timeout)
+        return True
+
+    def is_pending(self):
+        return not self.callable == None
+
+class Scheduler(object):
+    """
+    The top level abstract implementation of a scheduler that
+    should be used for inheritance and reference on the various
+    methods that are part of the delayed execution api.
+
+    Both the immediate (current tick) and the next tick executions
+    are handled at this level using fifo queues, the concrete
+    implementations are only responsible for the timed ones.
+    """
+
+    def __init__(self):
+        self.immediate = collections.deque()
+        self.next = collections.deque()
+        self.verified = dict()
+        self.pending = 0
+        self.stats = None
+        self._did = 0
+
+    @classmethod
+    def name(cls):
+        name = cls.__name__
+        name = name[:-9]
+        name = name.lower()
+        return name
+
+    @classmethod
+    def test(cls):
+        return True
+
+    def add(self, callable, target, lid, verify = False):
+        """
+        Schedules the provided callable for execution at the provided
+        target, that may either be a timestamp or one of the special
+        values -1 (current tick) and 0 (next tick).
+
+        In case the verify flag is set and the same callable is already
+        scheduled for the same target (by a verified operation) the
+        already existing handle is returned and nothing is scheduled.
+
+        :type callable: Function
+        :param callable: The callable to be scheduled for execution.
+        :type target: float
+        :param target: The target timestamp or the special -1 or 0 values.
+        :type lid: int
+        :param lid: The identifier of the loop (tick) in which the callable
+        is being scheduled, used to avoid loops on next tick calls.
+        :type verify: bool
+        :param verify: If the duplicate detection should be performed.
+        :rtype: Handle
+        :return: The handle that represents the scheduled operation.
+        """
+
+        # in case the verify flag is set tries to find an already scheduled
+        # handle for the same callable and target, returning it immediately
+        # (no new scheduling) in case it's found (duplicate operation)
+        key = (target, callable) if verify else None
+        if key:
+            handle = self.verified.get(key, None)
+            if handle: return handle
+
+        # creates the new handle with the current delay identifier, that
+        # ensures a fifo like order for operations with the same target
+        # and registers it in the verified map in case it's required
+        handle = Handle(
+            target,
+            self._did,
+            lid,
+            callable,
+            key = key,
+            scheduler = self
+        )
+        if key: self.verified[key] = handle
+        self._did += 1
+        self.pending += 1
+
+        # inserts the handle in the proper structure taking into account
+        # the kind of target, note that only the timed operations are
+        # delegated to the concrete scheduler implementation
+        if target == -1: self.immediate.append(handle)
+        elif target == 0: self.next.append(handle)
+        else: self._push_timed(handle)
+
+        # returns the newly created handle to the caller method so that
+        # it may be used for further operations (eg: cancel)
+        return handle
+
+    def push(self, handle):
+        """
+        Re-inserts an already created (pending) handle into the current
+        scheduler, useful for moving handles between schedulers.
+
+        :type handle: Handle
+        :param handle: The pending handle to be inserted in the scheduler.
+        """
+
+        if not handle.is_pending(): return
+        if handle.key: self.verified[handle.key] = handle
+        handle.scheduler = self
+        handle.did = self._did
+        self._did += 1
+        self.pending += 1
+        if handle.target == -1: self.immediate.append(handle)
+        elif handle.target == 0: self.next.append(handle)
+        else: self._push_timed(handle)
+
+    def cancel(self, handle):
+        """
+        Cancels the execution of the provided handle, note that the
+        removal from the underlying structures may be lazy, but the
+        reference to the callable is released immediately.
+
+        :type handle: Handle
+        :param handle: The handle that is going to be cancelled.
+        """
+
+        if not handle.is_pending(): return
+        if handle.target > 0: self._cancel_timed(handle)
+        self._release(handle)
+
+    def reschedule(self, handle, target):
+        """
+        Changes the target timestamp of the provided (pending) handle
+        keeping the same handle (and callable) for the operation.
+
+        Any entry of the handle that is still present in the underlying
+        structures becomes stale (new delay identifier) and is lazily
+        discarded by the scheduler.
+
+        :type handle: Handle
+        :param handle: The pending handle that is going to be re-scheduled.
+        :type target: float
+        :param target: The new target timestamp for the handle.
+        """
+
+        # in case the handle is not pending there's nothing to be
+        # re-scheduled (already executed or cancelled) and so the
+        # control flow returns immediately
+        if not handle.is_pending(): return
+
+        # removes the handle from the timed structure (constant time for
+        # most of the implementations) and in case there's a verification
+        # key for the handle updates it according to the new target
+        if handle.target > 0: self._cancel_timed(handle)
+        if handle.key:
+            if self.verified.get(handle.key, None) == handle:
+                del self.verified[handle.key]
+            handle.key = (target, handle.callable)
+            self.verified[handle.key] = handle
+
+        # updates the target and the delay identifier of the handle, so
+        # that any previous entry for it becomes stale, and inserts it
+        # back into the timed structure for the new target
+        handle.target = target
+        handle.did = self._did
+        self._did += 1
+        self._push_timed(handle)
+
+    def run(self, current, lid):
+        """
+        Runs the complete set of callables that are considered to be
+        ready for execution at the provided timestamp and loop id.
+
+        The immediate callables scheduled during this run are executed
+        in the same run, while the next tick ones are deferred.
+
+        :type current: float
+        :param current: The current timestamp to be used in the comparison
+        against the target timestamps of the scheduled callables.
+        :type lid: int
+        :param lid: The identifier of the current loop (tick).
+        """
+
+        # runs the complete set of immediate callables, this should
+        # include the ones scheduled by these same callables
+        self._immediates()
+
+        # iterates over the next tick callables, stopping once a callable
+        # scheduled in the current loop is found (avoids call loops), as
+        # the queue is fifo all the remaining ones are from this loop
+        next = self.next
+        while next:
+            handle = next[0]
+            if not handle.target == 0: next.popleft(); continue
+            if handle.lid == lid: break
+            next.popleft()
+            self._fire(handle)
+            if self.immediate: self._immediates()
+
+        # iterates over the complete set of timed callables that are
+        # ready to be called (target in the past) and calls them, making
+        # sure that immediate ones are called in between them
+        while True:
+            handle = self._pop_timed(current)
+            if not handle: break
+            self._fire(handle)
+            if self.immediate: self._immediates()
+
+        # in case the scheduler is now completely empty resets the delay
+        # identifier so that it never gets into a very large number
+        if self.is_empty(): self._did = 0
+
+    def clear(self):
+        self.immediate.clear()
+        self.next.clear()
+        self.verified.clear()
+        self.pending = 0
+        self._did = 0
+
+    def handles(self):
+        handles = []
+        handles.extend([handle for handle in self.immediate if handle.target == -1])
+        handles.extend([handle for handle in self.next if handle.target == 0])
+        handles.extend(self._handles_timed())
+        return [handle for handle in handles if handle.is_pending()]
+
+    def is_empty(self):
+        return not self.immediate and not self.next and self._is_empty_timed()
+
+    def instrument(self, stats):
+        """
+        Sets the loop statistics structure that is going to be used
+        to measure the lag and the duration of the delayed callables,
+        the instrumented fire operation is only used when this is set
+        so that no overhead exists for the non instrumented schedulers.
+
+        :type stats: LoopStats
+        :param stats: The statistics structure of the loop, or an invalid
+        value to disable the instrumentation of the scheduler.
+        """
+
+        self.stats = stats
+        self._fire = self._fire_stats if stats else self._fire_base
+
+    def info_dict(self, full = False):
+        info = dict(
+            name = self.name(),
+            pending = self.pending
+        )
+        if full: info.update(
+            immediate = len(self.immediate),
+            next = len(self.next),
+            verified = len(self.verified)
+        )
+        return info
+
+    def _immediates(self):
+        immediate = self.immediate
+        while immediate:
+            handle = immediate.popleft()
+            if not handle.target == -1: continue
+            self._fire(handle)
+
+    def _fire(self, handle):
+        callable = handle.callable
+        if callable == None: return
+        self._release(handle)
+        callable()
+
+    def _fire_stats(self, handle):
+        callable = handle.callable
+        if callable == None: return
+        target = handle.target
+        self._release(handle)
+        self.stats.call(callable, target = target)
+
+    _fire_base = _fire
+
+    def _release(self, handle):
+        key = handle.key
+        if key and self.verified.get(key, None) == handle:
+            del self.verified[key]
+        handle.callable = None
+        handle.scheduler = None
+        self.pending -= 1
+
+    def _push_timed(self, handle):
+        raise errors.NotImplemented("Missing implementation")
+
+    def _pop_timed(self, current):
+        raise errors.NotImplemented("Missing implementation")
+
+    def _cancel_timed(self, handle):
+        pass
+
+    def _handles_timed(self):
+        return []
+
+    def _is_empty_timed(self):
+        return True
+
+class HeapScheduler(Scheduler):
+    """
+    Simple scheduler implementation that stores the timed callables
+    in a binary heap, insertion and pop are O(log n) and removal
+    of cancelled handles is performed lazily (on pop).
+
+    The number of stale entries (cancelled or re-scheduled handles)
+    is counted and the heap is compacted once they represent most
+    of it, so that constantly refreshed timers (eg: idle timeouts)
+    do not make the heap grow without bounds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        Scheduler.__init__(self, *args, **kwargs)
+        self.heap = []
+        self.stale = 0
+
+    def clear(self):
+        Scheduler.clear(self)
+        del self.heap[:]
+        self.stale = 0
+
+    def info_dict(self, full = False):
+        info = Scheduler.info_dict(self, full = full)
+        if full: info.update(heap = len(self.heap), stale = self.stale)
+        return info
+
+    def _push_timed(self, handle):
+        heapq.heappush(self.heap, (handle.target, handle.did, handle))
+
+    def _pop_timed(self, current):
+        heap = self.heap
+        while heap:
+            target, did, handle = heap[0]
+            valid = handle.is_pending() and handle.did == did
+            if valid and target > current: return None
+            heapq.heappop(heap)
+            if valid: return handle
+            self.stale -= 1
+        return None
+
+    def _cancel_timed(self, handle):
+        # the entry of the handle is kept in the heap (lazy removal) and
+        # only counted as stale, in case the stale entries represent most
+        # of the heap it's compacted, removing them all at once
+        self.stale += 1
+        if self.stale < COMPACT_MIN: return
+        if self.stale * 2 < len(self.heap): return
+        self._compact(handle)
+
+    def _handles_timed(self):
+        return [handle for _target, did, handle in self.heap if handle.did == did]
+
+    def _is_empty_timed(self):
+        return not self.heap
+
+    def _compact(self, handle):
+        # re-builds the heap with only the valid entries, note that the
+        # provided handle is still pending (being cancelled or re-scheduled)
+        # and so its entry must be explicitly removed from the heap
+        self.heap = [
+            entry for entry in self.heap if entry[2].is_pending() and\
+            entry[2].did == entry[1] and not entry[2] == handle
+        ]
+        heapq.heapify(self.heap)
+        self.stale = 0
+
+class WheelScheduler(Scheduler):
+    """
+    Scheduler implementation based on an hierarchical timing wheel
+    (as described by Varghese and Lauck) with both O(1) insertion and
+    O(1) cancellation of timed callables.
+
+    Near future timers are stored in the lowest level of the wheel
+    and far future ones in the upper levels, being cascaded down as
+    the time advances, so that the cost of a tick is not dependent
+    on the number of pending timers.
+    """
+
+    def __init__(self, resolution = RESOLUTION, *args, **kwargs):
+        Scheduler.__init__(self, *args, **kwargs)
+        self.resolution = resolution
+        self.wheels = [
+            [set() for _index in range(WHEEL_SIZE)] for _level in range(WHEEL_LEVELS)
+        ]
+        self.overflow = set()
+        self.expired = []
+        self.count = 0
+        self.counts = [0] * (WHEEL_LEVELS + 1)
+        self._tick = self._to_tick(time.time())
+
+    def clear(self):
+        Scheduler.clear(self)
+        for wheel in self.wheels:
+            for slot in wheel: slot.clear()
+        self.overflow.clear()
+        del self.expired[:]
+        self.count = 0
+        self.counts = [0] * (WHEEL_LEVELS + 1)
+
+    def info_dict(self, full = False):
+        info = Scheduler.info_dict(self, full = full)
+        if full: info.update(
+            resolution = self.resolution,
+            wheel = self.count,
+            expired = len(self.expired)
+        )
+        return info
+
+    def _push_timed(self, handle):
+        # in case the wheel is currently empty the current tick is
+        # re-synchronized with the current time, avoiding the need
+        # to advance through a large number of (empty) slots
+        if not self.count: self._tick = max(
+            self._tick, self._to_tick(time.time())
+        )
+
+        # calculates the tick value for the handle (rounded up) so
+        # that the handle is never fired before the target time
+        # and then places it in the proper level of the wheel
+        handle.tick = self._to_tick(handle.target) + 1
+        self._place(handle)
+
+    def _pop_timed(self, current):
+        self._advance(current)
+        expired = self.expired
+        while expired:
+            _target, did, handle = heapq.heappop(expired)
+            if handle.is_pending() and handle.did == did: return handle
+        return None
+
+    def _cancel_timed(self, handle):
+        if handle.slot == None: return
+        level, slot = handle.slot
+        slot.discard(handle)
+        handle.slot = None
+        self.counts[level] -= 1
+        self.count -= 1
+
+    def _handles_timed(self):
+        handles = [handle for _target, did, handle in self.expired if handle.did == did]
+        for wheel in self.wheels:
+            for slot in wheel: handles.extend(slot)
+        handles.extend(self.overflow)
+        return handles
+
+    def _is_empty_timed(self):
+        return not self.count and not self.expired
+
+    def _place(self, handle):
+        # calculates the distance (in ticks) to the current tick of the
+        # wheel and in case it's already due adds it directly to the
+        # expired heap (to be fired in the current run)
+        delta = handle.tick - self._tick
+        if delta <= 0:
+            heapq.heappush(self.expired, (handle.target, handle.did, handle))
+            handle.slot = None
+            return
+
+        # iterates over the levels of the wheel to find the one that is
+        # able to hold the handle (according to the distance) falling
+        # back to the overflow structure for very far timers
+        for level in range(WHEEL_LEVELS):
+            shift = WHEEL_BITS * level
+            if delta >> shift >= WHEEL_SIZE: continue
+            index = (handle.tick >> shift) & WHEEL_MASK
+            slot = self.wheels[level][index]
+            break
+        else:
+            level = WHEEL_LEVELS
+            slot = self.overflow
+
+        # adds the handle to the selected slot, keeping a reference to
+        # it in the handle so that it may be removed in constant time
+        slot.add(handle)
+        handle.slot = (level, slot)
+        self.counts[level] += 1
+        self.count += 1
+
+    def _advance(self, current):
+        # converts the current timestamp into a tick and in case the
+        # wheel is already at (or after) it returns immediately
+        tick = self._to_tick(current)
+        if tick <= self._tick: return
+
+        # iterates over the complete set of ticks that have passed since
+        # the last advance, cascading the upper levels when the lower
+        # levels complete a turn and expiring the lowest level slots
+        wheel = self.wheels[0]
+        counts = self.counts
+        while self._tick < tick:
+            # in case there are no more timers in the wheel there's
+            # no need to go through the remaining (empty) slots
+            if not self.count: self._tick = tick; break
+
+            # in case the lowest level is empty jumps directly to the
+            # tick before the next cascade of the lowest non empty level
+            # avoiding the iteration over a large number of empty slots
+            if not counts[0]:
+                level = 1
+                while not counts[level]: level += 1
+                boundary = self._tick | ((1 << (WHEEL_BITS * level)) - 1)
+                if boundary > self._tick:
+                    self._tick = min(boundary, tick)
+                    continue
+
+            self._tick += 1
+            index = self._tick & WHEEL_MASK
+            if index == 0: self._cascade()
+
+            slot = wheel[index]
+            if not slot: continue
+            for handle in slot:
+                heapq.heappush(self.expired, (handle.target, handle.did, handle))
+                handle.slot = None
+            counts[0] -= len(slot)
+            self.count -= len(slot)
+            slot.clear()
+
+    def _cascade(self):
+        # iterates over the upper levels re-placing the handles of the
+        # slot for the current tick (moving them to lower levels), the
+        # iteration stops when a level has not completed a turn
+        for level in range(1, WHEEL_LEVELS):
+            index = (self._tick >> (WHEEL_BITS * level)) & WHEEL_MASK
+            self._move(level, self.wheels[level][index])
+            if index: return
+
+        # all of the levels have completed a turn, meaning that the
+        # overflow handles must be re-placed (very rare operation)
+        self._move(WHEEL_LEVELS, self.overflow)
+
+    def _move(self, level, slot):
+        if not slot: return
+        handles = list(slot)
+        slot.clear()
+        self.counts[level] -= len(handles)
+        self.count -= len(handles)
+        for handle in handles: self._place(handle)
+
+    def _to_tick(self, timestamp):
+        return int(timestamp / self.resolution)
@@ -37,6 +37,9 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import sys
+import time
+
 from .common import * #@UnusedWildImport
 
 BUFFER_SIZE_S = None
@@ -50,8 +53,59 @@ is going to be set on the on the sockets created by
 the server (client sockets), this is critical for a
 good performance of the server (large value) """
 
+ACCEPT_BUDGET = 128
+""" The maximum number of sockets that are going to be accepted
+for a single read event on the service socket, the remaining
+ones are accepted on the next tick so that the already existing
+connections are not starved under a connection storm """
+
+INHERIT_OPTIONS = sys.platform.startswith("linux")
+""" If the socket options of the service socket are inherited by
+the accepted (client) sockets, if that's the case the options
+that are equal in both sockets are not set for every accept """
+
+LOOP_ATTRIBUTES = (
+    "level",
+    "logging",
+    "poll_name",
+    "scheduler_name",
+    "poll_timeout",
+    "idle_timeout",
+    "keepalive_timeout",
+    "keepalive_interval",
+    "keepalive_count",
+    "allowed",
+    "allowed_m",
+    "accept_budget",
+    "instrument",
+    "slow_callback",
+    "host",
+    "port",
+    "type",
+    "ssl",
+    "ssl_host",
+    "env",
+    "key_file",
+    "cer_file",
+    "ca_file"
+)
+""" The names of the attributes that are copied from the primary
+server into its sibling loops at serve time, these are the values
+that may have been resolved from the environment (or the serve
+arguments) and that are not part of the construction arguments """
+
 class Server(Base):
 
+    def __new__(cls, *args, **kwargs):
+        # stores the arguments used in the construction of the server
+        # so that the sibling loops (multiple loops mode) are created
+        # using the exact same arguments, sharing the objects (eg: the
+        # application or caches) that have been provided to the server
+        server = Base.__new__(cls)
+        server._args = args
+        server._kwargs = kwargs
+        return server
+
     def __init__(self, *args, **kwargs):
         Base.__init__(self, *args, **kwargs)
         self.receive_buffer_s = kwargs.get("receive_buffer_s", BUFFER_SIZE_S)
@@ -68,6 +122,24 @@ class Server(Base):
         self.ca_file = None
         self.env = False
         self.allowed = []
+        self.allowed_m = None
+        self.accept_budget = kwargs.get("accept_budget", ACCEPT_BUDGET)
+        self.accepts_c = 0
+        self.accept_batches_c = 0
+        self.accept_exhausted_c = 0
+        self.accept_max = 0
+        self.accept_time = 0.0
+        self.loops = kwargs.get("loops", 1)
+        self._sockets = []
+        self._sockets_l = []
+        self._listen = None
+        self._options_c = None
+        self._loops = []
+        self._loop_threads = []
+        self._loop_index = 0
+        self._loop_next = 0
+        self._loop_event = None
+        self._loop_dispatch = False
 
     def welcome(self):
         Base.welcome(self)
@@ -75,20 +147,40 @@ class Server(Base):
         self.info("Booting %s %s (%s) ..." % (NAME, VERSION, PLATFORM))
 
     def cleanup(self):
+        # stops the complete set of sibling loops (if any) waiting for
+        # their threads to finish, so that no connection is left open
+        self._stop_loops()
+
         Base.cleanup(self)
 
         # unsubscribes the current socket from all the positions in
         # the current polling mechanism, required for coherence
-        self.unsub_all(self.socket)
+        if self.socket: self.unsub_all(self.socket)
 
         # tries to close the service socket, as this is the one that
         # has no connection associated and is independent
         try: self.socket.close()
         except: pass
 
+        # closes the complete set of extra listening sockets (reuse port
+        # mode) that may have been created for the children processes
+        for _socket in self._sockets + self._sockets_l:
+            if not _socket: continue
+            try: _socket.close()
+            except: pass
+
+        # closes the event file used to wake up the loop, this is only
+        # set in case the current server is a sibling loop
+        if self._loop_event: self._loop_event.close()
+
         # unsets the socket attribute as the socket should now be closed
         # and not able to be used for any kind of communication
         self.socket = None
+        self._sockets = []
+        self._sockets_l = []
+        self._listen = None
+        self._options_c = None
+        self._loop_event = None
 
     def info_dict(self, full = False):
         info = Base.info_dict(self, full = full)
@@ -96,10 +188,32 @@ class Server(Base):
             host = self.host,
             port = self.port,
             type = self.type,
-            ssl = self.ssl
+            ssl = self.ssl,
+            accept = self.accept_dict(),
+            loops = self.loops_dict()
         )
         return info
 
+    def accept_dict(self):
+        latency = self.accept_time / self.accepts_c if self.accepts_c else 0.0
+        return dict(
+            count = self.accepts_c,
+            batches = self.accept_batches_c,
+            exhausted = self.accept_exhausted_c,
+            max_batch = self.accept_max,
+            latency = latency * 1000.0,
+            budget = self.accept_budget
+        )
+
+    def loops_dict(self):
+        return dict(
+            count = len(self._loops) + 1,
+            index = self._loop_index,
+            dispatch = self._loop_dispatch,
+            connections = [len(self.connections)] +\
+                [len(loop.connections) for loop in self._loops]
+        )
+
     def serve(
         self,
         host = None,
@@ -146,8 +260,23 @@ class Server(Base):
         if env: self.diag = self.get_env("DIAG", self.diag, cast = bool)
         if env: self.children = self.get_env("CHILD", self.children, cast = int)
         if env: self.children = self.get_env("CHILDREN", self.children, cast = int)
+        if env: self.respawn = self.get_env("RESPAWN", self.respawn, cast = bool)
+        if env: self.reuse_port = self.get_env("REUSE_PORT", self.reuse_port, cast = bool)
+        if env: self.loops = self.get_env("LOOPS", self.loops, cast = int)
         if env: self.logging = self.get_env("LOGGING", self.logging)
         if env: self.poll_name = self.get_env("POLL", self.poll_name)
+        if env: self.scheduler_name = self.get_env("SCHEDULER", self.scheduler_name)
+        if env: self.instrument = self.get_env("INSTRUMENT", self.instrument, cast = bool)
+        if env: self.slow_callback = self.get_env(
+            "SLOW_CALLBACK",
+            self.slow_callback,
+            cast = float
+        )
+        if env: self.idle_timeout = self.get_env(
+            "IDLE_TIMEOUT",
+            self.idle_timeout,
+            cast = float
+        )
         if env: self.poll_timeout = self.get_env(
             "POLL_TIMEOUT",
             self.poll_timeout,
@@ -169,6 +298,16 @@ class Server(Base):
             cast = int
         )
         if env: self.allowed = self.get_env("ALLOWED", self.allowed, cast = list)
+        if env: self.accept_budget = self.get_env(
+            "ACCEPT_BUDGET",
+            self.accept_budget,
+            cast = int
+        )
+
+        # compiles the allowed list of addresses and networks into the
+        # matcher that is going to be used to verify every accepted
+        # connection, avoiding the (re-)parsing of the allowed values
+        self.allowed_m = self._allowed_matcher()
 
         # updates the current service status to the configuration
         # stage as the next steps is to configure the service socket
@@ -217,6 +356,19 @@ class Server(Base):
         # to work under a much more latency free unix sockets
         is_unix = host == "unix"
 
+        # determines if a different listening socket should be created for
+        # each of the children and for each of the loops (using the reuse
+        # port option), so that the kernel balances new connections among
+        # them (no thundering herd), note that if that's not possible for the
+        # loops the connections are dispatched by the loop that accepts them
+        self.loops = int(self.loops)
+        reuse_port = self.reuse_port and\
+            hasattr(socket, "SO_REUSEPORT") and not is_unix
+        reuse_children = reuse_port and int(self.children) > 0 and\
+            hasattr(os, "fork")
+        reuse_loops = reuse_port and self.loops > 1
+        reuse_port = reuse_children or reuse_loops
+
         # checks the type of service that is meant to be created and
         # creates a service socket according to the defined service
         family = socket.AF_INET6 if ipv6 else socket.AF_INET
@@ -228,9 +380,10 @@ class Server(Base):
             ca_file = ca_file,
             ca_root = ca_root,
             ssl_verify = ssl_verify,
-            family = family
+            family = family,
+            reuse_port = reuse_port
         )
-        elif type == UDP_TYPE: self.socket = self.socket_udp()
+        elif type == UDP_TYPE: self.socket = self.socket_udp(reuse_port = reuse_port)
         else: raise errors.NetiusError("Invalid server type provided '%d'" % type)
 
         # "calculates" the address "bind target", taking into account that this
@@ -246,6 +399,63 @@ class Server(Base):
         self.socket.bind(address)
         if type == TCP_TYPE: self.socket.listen(backlog)
 
+        # in case the reuse port mode is enabled creates the extra listening
+        # sockets for the remaining children, bound to the same (resolved)
+        # address, note that this is done before the set user id operation
+        # so that privileged ports are still available for binding, these
+        # sockets are kept in the master so that they may be re-used by
+        # the respawned children (no pending connections are lost), the
+        # listen arguments are stored so that the socket of a child that
+        # is not immediately respawned may be closed and re-created
+        self._sockets = [self.socket]
+        self._sockets_l = []
+        if reuse_port: address = (host, self.socket.getsockname()[1])
+        if reuse_children: self._listen = (
+            address,
+            type,
+            ssl,
+            dict(
+                key_file = key_file,
+                cer_file = cer_file,
+                ca_file = ca_file,
+                ca_root = ca_root,
+                ssl_verify = ssl_verify,
+                family = family,
+                backlog = backlog
+            )
+        )
+        for _index in range(1, self.children if reuse_children else 1):
+            _socket = self._socket_listen(
+                address,
+                type,
+                ssl,
+                key_file = key_file,
+                cer_file = cer_file,
+                ca_file = ca_file,
+                ca_root = ca_root,
+                ssl_verify = ssl_verify,
+                family = family,
+                backlog = backlog
+            )
+            self._sockets.append(_socket)
+
+        # does the same for the sibling loops of the (primary) loop, these
+        # sockets are going to be shared by the loops of every child process
+        for _index in range(1, self.loops if reuse_loops else 1):
+            _socket = self._socket_listen(
+                address,
+                type,
+                ssl,
+                key_file = key_file,
+                cer_file = cer_file,
+                ca_file = ca_file,
+                ca_root = ca_root,
+                ssl_verify = ssl_verify,
+                family = family,
+                backlog = backlog
+            )
+            self._sockets_l.append(_socket)
+
         # in case the set user id value the user of the current process should
         # be changed so that it represents the new (possibly unprivileged user)
         if setuid: os.setuid(setuid)
@@ -271,6 +481,11 @@ class Server(Base):
         result = self.fork()
         if not result: return
 
+        # in case the reuse port mode is enabled selects the listening socket
+        # associated with the index of the current child closing the other
+        # ones, as they are meant to be used by the other children
+        if reuse_children and self._child: self._socket_child()
+
         # ensures that the current polling mechanism is correctly open as the
         # service socket is going to be added to it next, this overrides the
         # default behavior of the common infra-structure (on start)
@@ -287,6 +502,11 @@ class Server(Base):
         # them may print some specific debugging information
         self.on_serve()
 
+        # starts the sibling loops (if requested) each of them running in
+        # its own thread, either with its own listening socket or receiving
+        # the connections dispatched by the current (primary) loop
+        self._start_loops()
+
         # starts the base system so that the event loop gets started and the
         # the servers gets ready to accept new connections (starts service)
         if start: self.start()
@@ -300,7 +520,8 @@ class Server(Base):
         ca_root = True,
         ssl_verify = False,
         family = socket.AF_INET,
-        type = socket.SOCK_STREAM
+        type = socket.SOCK_STREAM,
+        reuse_port = False
     ):
         # verifies if the provided family is of type internet and if that's
         # the case the associated flag is set to valid for usage
@@ -354,13 +575,23 @@ class Server(Base):
             socket.SO_SNDBUF,
             self.send_buffer_s
         )
+        if reuse_port: _socket.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_REUSEPORT, #@UndefinedVariable
+            1
+        )
         self._socket_keepalive(_socket)
 
         # returns the created tcp socket to the calling method so that it
         # may be used from this point on
         return _socket
 
-    def socket_udp(self, family = socket.AF_INET, type = socket.SOCK_DGRAM):
+    def socket_udp(
+        self,
+        family = socket.AF_INET,
+        type = socket.SOCK_DGRAM,
+        reuse_port = False
+    ):
         # prints a small debug message about the udp socket that is going
         # to be created for the server's connection
         self.debug("Creating server's udp socket ...")
@@ -374,6 +605,11 @@ class Server(Base):
         # ready for the operation with the highest possible performance
         _socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         _socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        if reuse_port: _socket.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_REUSEPORT, #@UndefinedVariable
+            1
+        )
 
         # returns the created udp socket to the calling method so that it
         # may be used from this point on
@@ -382,6 +618,196 @@ class Server(Base):
     def on_serve(self):
         pass
 
+    def serve_loop(self, primary, _socket = None):
+        """
+        Serves the current server as a sibling loop of the provided
+        (primary) server, blocking the current thread until the loop
+        is stopped, should be called from the thread of the loop.
+
+        The sibling loop re-uses the (resolved) configuration of the
+        primary server and either listens on the provided socket (reuse
+        port mode) or handles the sockets dispatched by the primary.
+
+        :type primary: Server
+        :param primary: The primary server from which the configuration
+        is going to be copied, should be already serving.
+        :type _socket: Socket
+        :param _socket: The listening socket of the loop, in case it's
+        not provided the loop only handles dispatched sockets.
+        """
+
+        # copies the complete set of configuration values (that may have
+        # been resolved at serve time) from the primary server
+        for name in LOOP_ATTRIBUTES:
+            setattr(self, name, getattr(primary, name))
+
+        # updates the current service status to the configuration
+        # stage and runs the loading of the base system
+        self.set_state(STATE_CONFIG)
+        self.load()
+
+        # sets the listening socket (if any) as the service socket and opens
+        # the polling mechanism subscribing both the service socket and the
+        # event file that is notified on every dispatched socket
+        self.socket = _socket
+        self._sockets = [_socket] if _socket else []
+        self.poll = self.build_poll()
+        self.poll.open(timeout = self.poll_timeout)
+        if _socket: self.sub_all(_socket)
+        if self._loop_event: self.poll.sub_read(self._loop_event)
+
+        # notifies the underlying services about the serving of the loop
+        # and then starts the event loop (blocking call)
+        self.on_serve()
+        self.start()
+
+    def _socket_listen(self, address, type, ssl, backlog = socket.SOMAXCONN, **kwargs):
+        # creates a new socket (of the provided type) that is using the reuse
+        # port option and binds it to the provided (already resolved) address
+        # so that it shares the incoming connections with the service socket
+        if type == TCP_TYPE: _socket = self.socket_tcp(
+            ssl,
+            reuse_port = True,
+            **kwargs
+        )
+        else: _socket = self.socket_udp(reuse_port = True)
+        _socket.bind(address)
+        if type == TCP_TYPE: _socket.listen(backlog)
+        return _socket
+
+    def _start_loops(self):
+        # in case the current server is not meant to run multiple loops or
+        # if it's a sibling loop itself there's nothing to be started
+        if self.loops < 2: return
+        if self._loop_index: return
+
+        # verifies if the sibling loops are going to have their own listening
+        # sockets, if that's not the case the dispatch mode is used, where
+        # the accepted sockets are handed to the loops (stream servers only)
+        dispatch = not self._sockets_l
+        if dispatch and not self.type == TCP_TYPE:
+            self.warning("Multiple loops not supported for '%s'" % self.name)
+            return
+
+        # prints a debug message about the starting of the loops, so that
+        # it's possible to know the mode that is going to be used
+        mode = "dispatch" if dispatch else "reuse port"
+        self.debug("Starting %d sibling loops in %s mode ..." % (self.loops - 1, mode))
+
+        # iterates over the sibling loops to be created, building a new
+        # server with the same construction arguments for each of them
+        # and running it in its own (daemon) thread
+        for index in range(1, self.loops):
+            cls = self.__class__
+            loop = cls(*self._args, **self._kwargs)
+            loop.loops = 1
+            loop.children = 0
+            loop.diag = False
+            loop._loop_index = index
+            if dispatch: loop._loop_event = self._loop_eventfd()
+            _socket = None if dispatch else self._sockets_l[index - 1]
+            thread = threading.Thread(
+                target = loop.serve_loop,
+                args = (self, _socket),
+                name = "%s-%d" % (self.name, index)
+            )
+            thread.daemon = True
+            thread.start()
+            self._loops.append(loop)
+            self._loop_threads.append(thread)
+
+        # updates the dispatch flag so that the accepted sockets are
+        # distributed among the complete set of loops (round robin)
+        self._loop_dispatch = dispatch
+
+    def _loop_eventfd(self):
+        import netius.pool
+        if os.name == "nt": return netius.pool.SocketEventFile()
+        return netius.pool.UnixEventFile()
+
+    def _stop_loops(self, timeout = 5.0):
+        # iterates over the complete set of sibling loops requesting them
+        # to stop and notifying their event file (if any) so that they
+        # leave the poll operation immediately (faster stop)
+        for loop in self._loops:
+            loop.stop()
+            try: loop._loop_event and loop._loop_event.notify()
+            except: pass
+
+        # waits for the threads of the loops to finish, note that as the
+        # loops are stopped at the next tick this should be a fast wait
+        for thread in self._loop_threads:
+            thread.join(timeout)
+
+        # resets the structures associated with the sibling loops
+        # as they are no longer running (no more dispatching)
+        self._loops = []
+        self._loop_threads = []
+        self._loop_dispatch = False
+
+    def _socket_child(self):
+        # retrieves the listening socket associated with the index of
+        # the current child and closes the complete set of other sockets
+        # (inherited from the master) setting it as the service socket,
+        # in case the socket is not available (failed to be re-created)
+        # the first available one is shared with its child instead
+        index = self._child_index % len(self._sockets)
+        _socket = self._sockets[index]
+        if not _socket: _socket = [other for other in self._sockets if other][0]
+        for other in self._sockets:
+            if not other: continue
+            if other == _socket: continue
+            try: other.close()
+            except: pass
+        self.socket = _socket
+        self._sockets = [_socket]
+
+    def _release(self, index):
+        Base._release(self, index)
+
+        # in case the reuse port mode is not enabled for the children
+        # there's no listening socket specific to the child to be closed
+        if not self._listen: return
+
+        # closes the listening socket associated with the child, so that
+        # no connections are queued in it while there's no process to
+        # accept them (they would be left hanging until the respawn)
+        index = index % len(self._sockets)
+        _socket = self._sockets[index]
+        if not _socket: return
+        try: _socket.close()
+        except: pass
+        self._sockets[index] = None
+
+    def _acquire(self, index):
+        Base._acquire(self, index)
+
+        # in case the reuse port mode is not enabled for the children
+        # or if the listening socket is still open there's nothing to
+        # be re-created, and the control flow returns immediately
+        if not self._listen: return
+        index = index % len(self._sockets)
+        if self._sockets[index]: return
+
+        # re-creates the listening socket for the child bound to the
+        # same address, note that this may fail (eg: privileged port
+        # after the set user id) and in that case the child shares
+        # another listening socket (warning is printed)
+        address, type, ssl, kwargs = self._listen
+        try: _socket = self._socket_listen(address, type, ssl, **kwargs)
+        except (socket.error, OSError) as exception:
+            self.warning(
+                "Failed to re-create listening socket for child %d: %s" %\
+                (index, str(exception))
+            )
+            return
+        self._sockets[index] = _socket
+        if index == 0: self.socket = _socket
+
+    def _allowed_matcher(self):
+        import netius.common
+        return netius.common.AddressMatcher(self.allowed)
+
 class DatagramServer(Server):
 
     def __init__(self, *args, **kwargs):
@@ -626,6 +1052,9 @@ class DatagramServer(Server):
 
         self.writes((self.socket,), state = False)
 
+    def _handlers(self, _socket):
+        return (self.on_read, self.on_write, self.on_error)
+
 class StreamServer(Server):
 
     def reads(self, reads, state = True):
@@ -650,10 +1079,31 @@ class StreamServer(Server):
         Server.serve(self, type = type, *args, **kwargs)
 
     def on_read_s(self, _socket):
+        # retrieves the maximum number of sockets to be accepted in the
+        # current batch (unset value means unlimited) and the timestamp
+        # of its start, used to measure the amount of time spent accepting
+        # the new connections
+        budget = self.accept_budget
+        count = 0
+        start = time.time()
+
         try:
             while True:
+                # in case the budget for the current batch has been reached
+                # the accept operation is stopped and a new batch is scheduled
+                # for the next tick (the poll is edge triggered and no new
+                # event would be raised for the remaining sockets), so that
+                # the already existing connections are not starved
+                if budget and count == budget:
+                    self.accept_exhausted_c += 1
+                    self.delay(self._accept_next, verify = True)
+                    break
+
                 socket_c, address = _socket.accept()
-                try: self.on_socket_c(socket_c, address)
+                count += 1
+                try:
+                    if self._loop_dispatch: self._dispatch_c(socket_c, address)
+                    else: self.on_socket_c(socket_c, address)
                 except: socket_c.close(); raise
         except ssl.SSLError as error:
             error_v = error.args[0] if error.args else None
@@ -671,6 +1121,11 @@ class StreamServer(Server):
                 self.on_exception_s(error)
         except BaseException as exception:
             self.on_exception_s(exception)
+        finally:
+            self.accepts_c += count
+            self.accept_batches_c += 1
+            self.accept_time += time.time() - start
+            if count > self.accept_max: self.accept_max = count
 
     def on_write_s(self, _socket):
         pass
@@ -699,6 +1154,10 @@ class StreamServer(Server):
             # state returns immediately (waits for next loop)
             if self._pending(_socket): return
 
+            # refreshes the idle timeout of the connection as there's
+            # new (read) activity in it, avoiding its closing
+            self._idle(connection)
+
             # iterates continuously trying to read as much data as possible
             # when there's a failure to read more data it should raise an
             # exception that should be handled properly
@@ -732,6 +1191,7 @@ class StreamServer(Server):
         if not connection.status == OPEN: return
 
         try:
+            self._idle(connection)
             connection._send()
         except ssl.SSLError as error:
             error_v = error.args[0] if error.args else None
@@ -773,6 +1233,10 @@ class StreamServer(Server):
     def on_expected_s(self, exception):
         self.debug(exception)
 
+    def on_connection_c(self, connection):
+        Server.on_connection_c(self, connection)
+        self._idle(connection)
+
     def on_upgrade(self, connection):
         connection.set_upgraded()
 
@@ -796,9 +1260,13 @@ class StreamServer(Server):
 
     def on_socket_c(self, socket_c, address):
         # verifies if the current address (host value) is present in
-        # the currently defined allowed list and in case that's not
-        # the case raises an exception indicating the issue
-        result = netius.common.assert_ip4(address[0], self.allowed)
+        # the currently defined allowed list (compiled matcher) and in
+        # case that's not the case raises an exception indicating the issue
+        allowed_m = self.allowed_m
+        if allowed_m == None:
+            allowed_m = self._allowed_matcher()
+            self.allowed_m = allowed_m
+        result = allowed_m.match(address[0])
         if not result: raise errors.NetiusError(
             "Address '%s' not present in allowed list" % address[0]
         )
@@ -813,31 +1281,20 @@ class StreamServer(Server):
         # to be to store pending callable operations in it
         if self.ssl: socket_c.pending = None
 
-        # verifies if the socket is of type internet (either ipv4
-        # of ipv6), this is going to be used for conditional setting
-        # of some of the socket options
-        is_inet = socket_c.family in (socket.AF_INET, socket.AF_INET6)
-
-        # sets the socket as non blocking and then updated a series
-        # of options in it, some of them taking into account if the
-        # socket if of type internet (timeout values)
+        # retrieves the (cached) list of options to be set in the
+        # accepted sockets, these are computed only once as they are
+        # the same for every socket accepted by the service socket
+        options_c = self._options_c
+        if options_c == None:
+            options_c = self._socket_options_c(socket_c.family)
+            self._options_c = options_c
+
+        # sets the socket as non blocking and then sets the complete
+        # set of options in it (in bulk), note that the options that
+        # are inherited from the service socket are not present
         socket_c.setblocking(0)
-        socket_c.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-        if is_inet: socket_c.setsockopt(
-            socket.IPPROTO_TCP,
-            socket.TCP_NODELAY,
-            1
-        )
-        if self.receive_buffer_c: socket_c.setsockopt(
-            socket.SOL_SOCKET,
-            socket.SO_RCVBUF,
-            self.receive_buffer_c
-        )
-        if self.send_buffer_c: socket_c.setsockopt(
-            socket.SOL_SOCKET,
-            socket.SO_SNDBUF,
-            self.send_buffer_c
-        )
+        for level, option, value in options_c:
+            socket_c.setsockopt(level, option, value)
 
         # the process creation is considered completed and a new
         # connection is created for it and opened, from this time
@@ -863,6 +1320,71 @@ class StreamServer(Server):
     def _upgradef(self, connection):
         self._ssl_handshake(connection.socket)
 
+    def _accept_next(self):
+        if not self.socket: return
+        self.on_read_s(self.socket)
+
+    def _dispatch_c(self, socket_c, address):
+        # selects the loop that is going to handle the accepted socket
+        # (round robin) and in case it's the current one handles it
+        # immediately, as no hand off is required for the socket
+        index = self._loop_next % (len(self._loops) + 1)
+        self._loop_next += 1
+        if index == 0: self.on_socket_c(socket_c, address); return
+
+        # hands off the socket to the selected sibling loop, using the
+        # thread safe version of the delay operation and notifying the
+        # event file of the loop so that it leaves the poll operation
+        loop = self._loops[index - 1]
+        loop.delay_s(lambda: loop._on_socket_l(socket_c, address))
+        loop._loop_event.notify()
+
+    def _on_socket_l(self, socket_c, address):
+        # "consumes" the notification of the event file associated with
+        # the loop and handles the dispatched socket as an accepted one
+        self._loop_event.denotify()
+        try: self.on_socket_c(socket_c, address)
+        except BaseException as exception:
+            socket_c.close()
+            self.on_exception_s(exception)
+
+    def _socket_options_c(self, family):
+        """
+        Builds the list of options (level, option and value tuples)
+        that are going to be set in the sockets accepted by the server.
+
+        In case the platform inherits the options of the service socket
+        in the accepted sockets the options with the same value in both
+        sockets are not included (avoids redundant system calls).
+
+        :type family: int
+        :param family: The family of the sockets that are going to be
+        accepted, used for the conditional (internet) options.
+        :rtype: List
+        :return: The list of (level, option, value) tuples to be set
+        in every accepted socket.
+        """
+
+        is_inet = family in (socket.AF_INET, socket.AF_INET6)
+        is_inherit = INHERIT_OPTIONS
+
+        options = []
+        if not is_inherit: options.append(
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        )
+        if is_inet and not is_inherit: options.append(
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        )
+        if self.receive_buffer_c and not (is_inherit and\
+            self.receive_buffer_c == self.receive_buffer_s): options.append(
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_c)
+        )
+        if self.send_buffer_c and not (is_inherit and\
+            self.send_buffer_c == self.send_buffer_s): options.append(
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_c)
+        )
+        return options
+
     def _ssl_handshake(self, _socket):
         Server._ssl_handshake(self, _socket)
 
@@ -885,3 +1407,7 @@ class StreamServer(Server):
         # that ssl is now enabled for that socket/connection and so
         # the communication between peers is now secured
         self.on_ssl(connection)
+
+    def _handlers(self, _socket):
+        if _socket == self.socket: return (self.on_read_s, self.on_write_s, self.on_error_s)
+        return (self.on_read, self.on_write, self.on_error)
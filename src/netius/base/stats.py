@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import collections
+
+SLOW_CALLBACK = 0.1
+""" The default threshold (in seconds) above which a single
+callback (event handler or delayed callable) is considered
+to be slow, and so logged as a warning with its name """
+
+BUCKETS = 32
+""" The number of (power of two) buckets of each histogram,
+with microsecond values this covers more than one hour """
+
+RECENT = 16
+""" The maximum number of slow callbacks that are kept in
+memory (the most recent ones) for diagnostics """
+
+class Histogram(object):
+    """
+    Low overhead histogram with power of two buckets, the value
+    is scaled into an integer and its bit length is used as the
+    index of the bucket (no search or logarithm is required).
+
+    The percentiles are approximated by the upper bound of the
+    bucket in which they fall (at most a factor of two error).
+    """
+
+    __slots__ = ("scale", "buckets", "count", "total", "max")
+
+    def __init__(self, scale = 1000000.0):
+        self.scale = scale
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = int(value * self.scale).bit_length()
+        if index >= BUCKETS: index = BUCKETS - 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max: self.max = value
+
+    def percentile(self, value):
+        if not self.count: return 0.0
+        target = self.count * value
+        count = 0
+        for index, bucket in enumerate(self.buckets):
+            count += bucket
+            if count >= target: return self._upper(index)
+        return self.max
+
+    def info_dict(self, full = False, unit = 1000.0):
+        info = dict(
+            count = self.count,
+            mean = self.total / self.count * unit if self.count else 0.0,
+            max = self.max * unit,
+            p50 = min(self.percentile(0.5), self.max) * unit,
+            p99 = min(self.percentile(0.99), self.max) * unit,
+            p999 = min(self.percentile(0.999), self.max) * unit
+        )
+        if full: info.update(
+            buckets = [
+                [self._upper(index) * unit, bucket] for index, bucket in\
+                    enumerate(self.buckets) if bucket
+            ]
+        )
+        return info
+
+    def _upper(self, index):
+        return ((1 << index) - 1) / self.scale if index else 0.0
+
+class LoopStats(object):
+    """
+    Container of the instrumentation data of an event loop, the
+    histograms of the poll wait time, of the time spent in each of
+    the phases of the loop, of the lag of the delayed callables and
+    of the number of events per tick.
+
+    Each callback that takes more than the threshold is logged (as
+    a warning) together with its qualified name.
+    """
+
+    def __init__(self, owner = None, threshold = SLOW_CALLBACK):
+        self.owner = owner
+        self.threshold = threshold
+        self.poll = Histogram()
+        self.events = Histogram(scale = 1.0)
+        self.lag = Histogram()
+        self.delays = Histogram()
+        self.phases = dict()
+        self.ticks = 0
+        self.slow_c = 0
+        self.slow = collections.deque(maxlen = RECENT)
+
+    def info_dict(self, full = False):
+        info = dict(
+            ticks = self.ticks,
+            poll = self.poll.info_dict(full = full),
+            events = self.events.info_dict(full = full, unit = 1.0),
+            lag = self.lag.info_dict(full = full),
+            delays = self.delays.info_dict(full = full),
+            phases = dict(
+                (name, histogram.info_dict(full = full)) for name, histogram in\
+                    self.phases.items()
+            ),
+            slow = dict(
+                threshold = self.threshold * 1000.0,
+                count = self.slow_c,
+                recent = list(self.slow)
+            )
+        )
+        return info
+
+    def reset(self):
+        self.__init__(owner = self.owner, threshold = self.threshold)
+
+    def tick(self, wait, events):
+        self.ticks += 1
+        self.poll.add(wait)
+        self.events.add(events)
+
+    def phase(self, name, duration):
+        histogram = self.phases.get(name, None)
+        if not histogram: histogram = self.phases[name] = Histogram()
+        histogram.add(duration)
+
+    def call(self, callable, target = 0):
+        """
+        Calls the provided (delayed) callable measuring both its lag,
+        the difference between the time of the call and the target time
+        (only for timed callables) and the time spent in the call.
+
+        :type callable: Function
+        :param callable: The delayed callable that is going to be called.
+        :type target: float
+        :param target: The target timestamp of the callable, or one of the
+        special values (current and next tick) for which there's no lag.
+        """
+
+        start = time.time()
+        if target > 0: self.lag.add(start - target)
+        try: callable()
+        finally:
+            duration = time.time() - start
+            self.delays.add(duration)
+            if duration > self.threshold: self.slow_callback(callable, duration)
+
+    def slow_callback(self, callable, duration, extra = None):
+        """
+        Registers a slow callback, logging a warning message with the
+        qualified name of the callback and the time it took.
+
+        :type callable: Function
+        :param callable: The callable (or the name of it) that took more
+        than the threshold time to be executed.
+        :type duration: float
+        :param duration: The time (in seconds) spent in the callback.
+        :type extra: String
+        :param extra: Extra information about the callback to be appended
+        to the name of it (eg: the connection being handled).
+        """
+
+        name = callable if type(callable) == str else qualname(callable)
+        if extra: name += " (%s)" % extra
+        self.slow_c += 1
+        self.slow.append(
+            dict(name = name, duration = duration * 1000.0, timestamp = time.time())
+        )
+        if not self.owner: return
+        self.owner.warning("Slow callback '%s' took %.2fms" % (name, duration * 1000.0))
+
+def qualname(callable):
+    """
+    Retrieves the qualified name (module, class and name) of the
+    provided callable, taking into account bound methods, lambdas
+    and partial functions (under both python 2 and 3).
+
+    :type callable: Function
+    :param callable: The callable to retrieve the qualified name.
+    :rtype: String
+    :return: The qualified name of the callable.
+    """
+
+    function = getattr(callable, "func", None)
+    if function: return qualname(function)
+    owner = getattr(callable, "__self__", None)
+    name = getattr(callable, "__qualname__", None)
+    if not owner == None and not name: name = owner.__class__.__name__ + "." + callable.__name__
+    name = name or getattr(callable, "__name__", None) or callable.__class__.__name__
+    module = getattr(callable, "__module__", None)
+    return module + "." + name if module else name
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import errno
+import select
+import socket
+import subprocess
+
+import netius.common
+
+PORT = 9098
+""" The port to be used by the echo server that is going
+to be launched (as a sub process) for the benchmark """
+
+BUDGETS = (0, 128, 16)
+""" The accept budgets (per read event) that are going to
+be measured, the zero value means an unlimited budget """
+
+MESSAGE = b"x" * 32
+""" The (small) message that is sent through every connection
+and echoed back by the server """
+
+def launch(budget, port = PORT):
+    env = dict(os.environ)
+    env.update(PORT = str(port), LEVEL = "WARNING", ACCEPT_BUDGET = str(budget))
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import netius.bench.poll; netius.bench.poll.serve()"],
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def measure(budget, storm, active, port = PORT):
+    process = launch(budget, port = port)
+    try:
+        epoll = select.epoll()
+        sockets = dict()
+        sent = dict()
+
+        # creates the active connections, that are going to run a ping
+        # pong cycle during the storm, measuring the round trip latency
+        # as seen by the connections already established in the server
+        for _index in range(active):
+            _socket = socket.create_connection(("127.0.0.1", port))
+            _socket.setblocking(0)
+            epoll.register(_socket.fileno(), select.EPOLLIN)
+            sockets[_socket.fileno()] = _socket
+            sent[_socket.fileno()] = time.time()
+            _socket.send(MESSAGE)
+        actives = set(sockets.keys())
+
+        # starts the storm creating the requested number of connections
+        # (in a non blocking fashion) and sending a message through each
+        # of them as soon as the connection is established, a connection
+        # is considered served once its message has been echoed back
+        start = time.time()
+        pending = dict()
+        for _index in range(storm):
+            _socket = socket.socket()
+            _socket.setblocking(0)
+            error = _socket.connect_ex(("127.0.0.1", port))
+            if not error in (0, errno.EINPROGRESS): raise socket.error(error)
+            epoll.register(_socket.fileno(), select.EPOLLOUT)
+            sockets[_socket.fileno()] = _socket
+            pending[_socket.fileno()] = True
+
+        # runs the event loop until the complete set of storm connections
+        # has been served, registering the latency of every round trip
+        # of the active connections (until the storm is over)
+        latencies = []
+        while pending:
+            for fd, event in epoll.poll(0.1):
+                _socket = sockets[fd]
+                if event & select.EPOLLOUT:
+                    epoll.modify(fd, select.EPOLLIN)
+                    _socket.send(MESSAGE)
+                    continue
+                data = _socket.recv(65536)
+                if not data: raise socket.error("Connection closed")
+                if fd in actives:
+                    current = time.time()
+                    latencies.append(current - sent[fd])
+                    sent[fd] = current
+                    _socket.send(MESSAGE)
+                else:
+                    pending.pop(fd, None)
+        duration = time.time() - start
+
+        epoll.close()
+        for _socket in sockets.values(): _socket.close()
+    finally:
+        process.kill()
+        process.wait()
+
+    latencies.sort()
+    maximum = latencies[-1] if latencies else 0.0
+    median = latencies[len(latencies) // 2] if latencies else 0.0
+    return duration, median, maximum
+
+def run(storm = 2000, active = 10, port = PORT):
+    """
+    Runs the accept benchmark launching an echo server as a sub process
+    for each of the accept budgets and running a connection storm against
+    it while a series of active connections run a ping pong cycle, printing
+    the time to serve the storm and the latency of the active connections.
+
+    :type storm: int
+    :param storm: The number of connections in the storm.
+    :type active: int
+    :param active: The number of active (ping pong) connections.
+    :type port: int
+    :param port: The port to be used by the echo server.
+    """
+
+    print("%-8s %8s %8s %10s %10s %12s %12s" % ("budget", "storm", "active", "time (s)", "conn/s", "median (ms)", "max (ms)"))
+    print("-" * 74)
+    for budget in BUDGETS:
+        duration, median, maximum = measure(budget, storm, active, port = port)
+        print("%-8s %8d %8d %10.3f %10.0f %12.2f %12.2f" % (
+            budget or "none",
+            storm,
+            active,
+            duration,
+            storm / duration,
+            median * 1000.0,
+            maximum * 1000.0
+        ))
+
+if __name__ == "__main__":
+    storm = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    active = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    run(storm = storm, active = active)
@@ -0,0 +1,119 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+import random
+
+import netius.common
+
+def ranges4(count):
+    random.seed(count)
+    items = []
+    for _index in range(count):
+        length = random.randint(16, 32)
+        value = random.getrandbits(32) >> (32 - length) << (32 - length)
+        address = netius.common.addr_to_ip4(value)
+        items.append(address if length == 32 else "%s/%d" % (address, length))
+    return items
+
+def ranges6(count):
+    random.seed(count)
+    items = []
+    for _index in range(count):
+        length = random.randint(32, 128)
+        value = random.getrandbits(128) >> (128 - length) << (128 - length)
+        groups = ["%x" % ((value >> shift) & 0xffff) for shift in range(112, -16, -16)]
+        items.append("%s/%d" % (":".join(groups), length))
+    return items
+
+def addresses4(count):
+    return [netius.common.addr_to_ip4(random.getrandbits(32)) for _index in range(count)]
+
+def addresses6(count):
+    return [
+        ":".join("%x" % random.getrandbits(16) for _index in range(8)) for _index in range(count)
+    ]
+
+def measure(callable, addresses):
+    start = time.time()
+    for address in addresses: callable(address)
+    return (time.time() - start) / len(addresses)
+
+def run(size = 10000, lookups = 100000):
+    """
+    Runs the allow list benchmark, measuring the cost of a lookup
+    for both the (legacy) list based verification and the compiled
+    address matcher, for allow lists with the provided number of ipv4
+    and ipv6 ranges, note that the legacy verification is ipv4 only.
+
+    :type size: int
+    :param size: The number of ranges (networks) in the allow list.
+    :type lookups: int
+    :param lookups: The number of lookups to be performed.
+    """
+
+    allowed4 = ranges4(size)
+    allowed6 = ranges6(size)
+
+    start = time.time()
+    matcher = netius.common.AddressMatcher(allowed4 + allowed6)
+    build = time.time() - start
+
+    # the legacy verification is orders of magnitude slower so only
+    # a small fraction of the lookups is performed for it
+    legacy = measure(
+        lambda address: netius.common.assert_ip4(address, allowed4),
+        addresses4(max(lookups // 1000, 10))
+    )
+    compiled4 = measure(matcher.match, addresses4(lookups))
+    compiled6 = measure(matcher.match, addresses6(lookups))
+
+    print("%-16s %8s %14s %14s" % ("matcher", "ranges", "lookup (us)", "lookups/s"))
+    print("-" * 55)
+    for name, value in (
+        ("legacy (ipv4)", legacy),
+        ("compiled (ipv4)", compiled4),
+        ("compiled (ipv6)", compiled6)
+    ):
+        print("%-16s %8d %14.2f %14.0f" % (name, size, value * 1000000.0, 1.0 / value))
+    print("compiled build of %d ranges in %.2f ms" % (size * 2, build * 1000.0))
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(size = size)
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+import netius.common
+
+PORT = 9099
+""" The port to be used by the echo server that is going
+to be launched (as a sub process) for the benchmark """
+
+MESSAGE = b"x" * 32
+""" The (small) message that is going to be sent through the
+websocket connections and echoed back by the server """
+
+HANDSHAKE = b"GET / HTTP/1.1\r\n\
+Host: localhost\r\n\
+Upgrade: websocket\r\n\
+Connection: Upgrade\r\n\
+Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\
+Sec-WebSocket-Version: 13\r\n\
+\r\n"
+""" The handshake request that is going to be used to upgrade
+each of the client connections into websockets """
+
+def launch(port = PORT):
+    env = dict(os.environ)
+    env.update(PORT = str(port), LEVEL = "WARNING")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "netius.servers.echo"],
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def client(port, duration, window, counts):
+    # creates the connection to the server and runs the handshake
+    # operation reading the complete (upgrade) response from it
+    _socket = socket.create_connection(("127.0.0.1", port))
+    _socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    _socket.sendall(HANDSHAKE)
+    buffer = b""
+    while not b"\r\n\r\n" in buffer: buffer += _socket.recv(4096)
+    buffer = buffer.split(b"\r\n\r\n", 1)[1]
+
+    # encodes the window of messages that is going to be sent per
+    # iteration (pipelined) and calculates the size of the echoes
+    frame = netius.common.encode_ws(MESSAGE, mask = True)
+    frames = frame * window
+    expected = len(netius.common.encode_ws(MESSAGE, mask = False)) * window
+
+    # runs the send and receive cycle until the duration of the
+    # benchmark is reached, counting the number of echoed messages
+    count = 0
+    end = time.time() + duration
+    while time.time() < end:
+        _socket.sendall(frames)
+        while len(buffer) < expected:
+            data = _socket.recv(65536)
+            if not data: raise socket.error("Connection closed")
+            buffer += data
+        buffer = buffer[expected:]
+        count += window
+
+    _socket.close()
+    counts.append(count)
+
+def run(connections = 4, duration = 3.0, window = 16, port = PORT):
+    """
+    Runs the echo benchmark launching an echo (websocket) server
+    as a sub process and then flooding it with small messages from
+    a series of concurrent (pipelined) connections, printing the
+    resulting throughput in messages per second.
+
+    :type connections: int
+    :param connections: The number of concurrent client connections.
+    :type duration: float
+    :param duration: The duration of the benchmark in seconds.
+    :type window: int
+    :param window: The number of messages sent (pipelined) by each
+    connection before waiting for the echoes.
+    :type port: int
+    :param port: The port to be used by the echo server.
+    """
+
+    process = launch(port = port)
+    try:
+        counts = []
+        threads = [
+            threading.Thread(
+                target = client,
+                args = (port, duration, window, counts)
+            ) for _index in range(connections)
+        ]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+    finally:
+        process.kill()
+        process.wait()
+
+    total = sum(counts)
+    print("%-12s %8s %12s %12s" % ("connections", "window", "messages", "msg/s"))
+    print("%-12d %8d %12d %12.0f" % (connections, window, total, total / duration))
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    run(connections = connections)
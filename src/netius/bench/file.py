@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+
+PORT = 9098
+""" The port to be used by the file server that is going
+to be launched (as a sub process) for the benchmark """
+
+SIZE = 1073741824
+""" The size in bytes of the file that is going to be created
+and then downloaded by each of the clients (default 1 GiB) """
+
+CHUNK = 1048576
+""" The size of the chunk used both to create the file and
+to receive its contents on the client side """
+
+def create(path, size = SIZE):
+    # writes the file with random (non compressible) contents, note
+    # that the same random chunk is repeated to avoid the generation
+    # of random data to dominate the preparation time
+    chunk = os.urandom(CHUNK)
+    file = open(path, "wb")
+    try:
+        for _index in range(size // CHUNK): file.write(chunk)
+        file.write(chunk[:size % CHUNK])
+    finally:
+        file.close()
+
+def launch(base_path, sendfile = True, port = PORT):
+    env = dict(os.environ)
+    env.update(
+        PORT = str(port),
+        LEVEL = "WARNING",
+        BASE_PATH = base_path,
+        SENDFILE = "1" if sendfile else "0"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "netius.extra.file"],
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def client(port, name, counts):
+    # sends the request for the file and reads the complete set of
+    # headers from the response, extracting the content length
+    _socket = socket.create_connection(("127.0.0.1", port))
+    _socket.sendall(b"GET /" + name + b" HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    buffer = b""
+    while not b"\r\n\r\n" in buffer: buffer += _socket.recv(4096)
+    headers, buffer = buffer.split(b"\r\n\r\n", 1)
+    length = [
+        int(line.split(b":", 1)[1]) for line in headers.split(b"\r\n")\
+        if line.lower().startswith(b"content-length:")
+    ][0]
+
+    # receives (and discards) the contents of the file until the
+    # complete set of bytes (as defined in the headers) is received
+    count = len(buffer)
+    while count < length:
+        data = _socket.recv(CHUNK)
+        if not data: raise socket.error("Connection closed")
+        count += len(data)
+
+    _socket.close()
+    counts.append(count)
+
+def measure(base_path, name, connections, sendfile, port = PORT):
+    process = launch(base_path, sendfile = sendfile, port = port)
+    try:
+        counts = []
+        threads = [
+            threading.Thread(
+                target = client,
+                args = (port, name, counts)
+            ) for _index in range(connections)
+        ]
+        start = time.time()
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        duration = time.time() - start
+    finally:
+        process.kill()
+        process.wait()
+
+    return sum(counts), duration
+
+def run(connections = 4, size = SIZE, port = PORT):
+    """
+    Runs the file benchmark creating a (large) file in a temporary
+    directory and downloading it from a file server (launched as a
+    sub process) through a series of concurrent connections, both
+    with and without the zero copy (sendfile) approach, printing the
+    resulting throughput in megabytes per second.
+
+    :type connections: int
+    :param connections: The number of concurrent client connections.
+    :type size: int
+    :param size: The size in bytes of the file to be downloaded.
+    :type port: int
+    :param port: The port to be used by the file server.
+    """
+
+    base_path = tempfile.mkdtemp()
+    try:
+        create(os.path.join(base_path, "file.bin"), size = size)
+        print("%-10s %12s %14s %10s %10s" % ("sendfile", "connections", "bytes", "seconds", "MB/s"))
+        print("-" * 60)
+        for sendfile in (False, True):
+            total, duration = measure(
+                base_path,
+                b"file.bin",
+                connections,
+                sendfile,
+                port = port
+            )
+            print("%-10s %12d %14d %10.2f %10.2f" % (
+                "yes" if sendfile else "no",
+                connections,
+                total,
+                duration,
+                total / duration / (1024 * 1024)
+            ))
+    finally:
+        shutil.rmtree(base_path)
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    run(connections = connections)
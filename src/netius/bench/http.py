@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+
+import netius.common
+
+CHUNK_SIZES = (1, 1460, 65536)
+""" The default sizes of the chunks that are going to be fed to
+the parser, simulating respectively a worst case (byte by byte)
+scenario, a typical tcp segment and a large socket read """
+
+PARSERS = (netius.common.PyHTTPParser, netius.common.NativeHTTPParser)
+""" The sequence of parser classes (implementations) that are
+going to be measured, the ones that are not available in the
+current environment are ignored """
+
+GET_REQUEST = b"GET /index.html HTTP/1.1\r\n\
+Host: localhost\r\n\
+User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)\r\n\
+Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n\
+Accept-Language: en-US,en;q=0.5\r\n\
+Accept-Encoding: gzip, deflate\r\n\
+Cookie: session=2b4e8d3f8a8f4c3c9d4c6f2d1a7b9e0f; theme=dark; locale=en_US\r\n\
+Cache-Control: max-age=0\r\n\
+Connection: keep-alive\r\n\
+\r\n"
+""" The request to be used for the headers (pipelined requests)
+scenario of the benchmark, should be similar to a request sent
+by a typical browser (no message body) """
+
+POST_REQUEST = b"POST /upload HTTP/1.1\r\n\
+Host: localhost\r\n\
+Content-Type: application/octet-stream\r\n\
+Content-Length: %d\r\n\
+\r\n"
+""" The template for the request to be used in the body scenario
+of the benchmark, the content length is going to be populated
+according to the size of the body that is going to be used """
+
+def build_get(count = 512):
+    return GET_REQUEST * count
+
+def build_large(count = 16, size = 32768):
+    cookie = b"Cookie: " + b"x" * size + b"\r\n"
+    return (GET_REQUEST[:-2] + cookie + b"\r\n") * count
+
+def build_post(body = 262144):
+    return POST_REQUEST % body + b"x" * body
+
+def measure(data, chunk_size, repeat = 3, parser_c = netius.common.HTTPParser):
+    # splits the data into chunks before the measurement so that the
+    # slicing of the data is not accounted as part of the parsing time
+    data_l = len(data)
+    chunks = [data[index:index + chunk_size] for index in range(0, data_l, chunk_size)]
+
+    # runs the parsing of the complete set of chunks multiple times
+    # and retrieves the best value (minimum time) as the result, the
+    # number of parsed messages is counted to provide a requests rate
+    best = None
+    for _index in range(repeat):
+        messages = []
+        parser = parser_c(None, type = netius.common.REQUEST)
+        parser.bind("on_data", lambda: messages.append(True))
+        start = time.time()
+        for chunk in chunks: parser.parse(chunk)
+        delta = time.time() - start
+        best = delta if best == None else min(best, delta)
+        parser.destroy()
+
+    # returns both the throughput of the parsing operation in MB/s
+    # and the number of requests parsed per second
+    best = max(best, 1e-9)
+    return data_l / best / 1048576.0, len(messages) / best
+
+def run(chunk_sizes = CHUNK_SIZES, parsers = PARSERS, repeat = 3):
+    """
+    Runs the http parser benchmark feeding both a sequence of
+    pipelined requests (headers only) and a request with a large
+    body in chunks of the provided sizes, printing the throughput
+    (in MB/s and requests/s) for each of the parser implementations,
+    scenarios and chunk sizes.
+
+    :type chunk_sizes: Tuple
+    :param chunk_sizes: The sequence of chunk sizes to be measured.
+    :type parsers: Tuple
+    :param parsers: The parser classes that are going to be measured.
+    :type repeat: int
+    :param repeat: The number of times each measure is repeated, the
+    best value (minimum time) is the one that is going to be used.
+    """
+
+    scenarios = (
+        ("headers", build_get()),
+        ("large", build_large()),
+        ("body", build_post())
+    )
+
+    header = "%-8s %-10s %8s %10s %10s %12s" % (
+        "parser", "scenario", "chunk", "bytes", "MB/s", "req/s"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for parser_c in parsers:
+        if not parser_c.test(): continue
+        for name, data in scenarios:
+            for chunk_size in chunk_sizes:
+                throughput, rate = measure(
+                    data,
+                    chunk_size,
+                    repeat = repeat,
+                    parser_c = parser_c
+                )
+                print("%-8s %-10s %8d %10d %10.2f %12.0f" % (
+                    parser_c.name(), name, chunk_size, len(data), throughput, rate
+                ))
+
+if __name__ == "__main__":
+    chunk_sizes = [int(value) for value in sys.argv[1:]] or CHUNK_SIZES
+    run(chunk_sizes = chunk_sizes)
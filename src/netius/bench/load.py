@@ -0,0 +1,444 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import subprocess
+import collections
+
+import netius.clients
+
+from . import poll
+from . import memory
+
+PORT = 9100
+""" The port to be used by the server that is going to be
+launched (as a sub process) for the benchmark, the port that
+follows it is used by the back-end server (proxy scenario) """
+
+MESSAGE = b"x" * 32
+""" The (small) message that is sent through the echo and the
+websockets connections and echoed back by the server """
+
+FILE_SIZE = 16384
+""" The size in bytes of the file that is going to be served
+by the file server (file scenario) """
+
+SCENARIOS = dict(
+    hello = dict(
+        protocol = "http",
+        path = "/",
+        server = "import netius.extra; netius.extra.HelloServer().serve(env = True)"
+    ),
+    h2 = dict(
+        protocol = "h2",
+        path = "/",
+        server = "import netius.extra; netius.extra.HelloServer(legacy = False).serve(env = True)"
+    ),
+    echo = dict(
+        protocol = "raw",
+        path = None,
+        server = "import netius.bench.poll; netius.bench.poll.serve()"
+    ),
+    ws = dict(
+        protocol = "ws",
+        path = "/",
+        server = "import netius.servers; netius.servers.EchoServer().serve(env = True)"
+    ),
+    file = dict(
+        protocol = "http",
+        path = "/file.bin",
+        server = "import netius.extra; netius.extra.FileServer().serve(env = True)"
+    ),
+    proxy = dict(
+        protocol = "http",
+        path = "/",
+        server = "import os, netius.extra; netius.extra.ReverseProxyServer(\
+hosts = {\"127.0.0.1\" : \"http://127.0.0.1:\" + os.environ[\"BACKEND_PORT\"]}).serve(env = True)",
+        backend = "import netius.extra; netius.extra.HelloServer().serve(env = True)"
+    )
+)
+""" The map associating the name of the scenario with the protocol
+used by the load generator, the path to be requested and the python
+code used to launch the server (and the back-end server) """
+
+TICK = 0.001
+""" The (maximum) interval in seconds between the ticks that
+schedule the requests in the open loop mode, used as the timeout
+of the poll operation of the client (so that ticks are precise) """
+
+PERCENTILES = (("p50", 0.5), ("p99", 0.99), ("p999", 0.999))
+""" The percentiles (name and value) of the latency that are
+going to be reported for each of the scenarios """
+
+class LoadSlot(object):
+    """
+    Placeholder for a connection of the load generator under the
+    h2 protocol, where each request is sent through its own stream
+    (multiplexed over a shared connection) so that the slot is the
+    object that holds the state of the request being handled.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.received = 0
+
+class LoadGenerator(object):
+    """
+    Load generator that opens a series of connections to a server
+    (over loopback) and runs requests through them, using the netius
+    clients (http, h2, raw and websockets), recording the latency of
+    each of the requests (responses) received.
+
+    Supports both a closed loop mode, where a new request is sent
+    as soon as the response to the previous one is received, and an
+    open loop mode, where the requests are scheduled at a fixed rate
+    independently of the responses, in the open loop mode the latency
+    is measured from the scheduled time, so that the time a request
+    waits for a free connection is accounted (no coordinated omission).
+    """
+
+    def __init__(
+        self,
+        protocol,
+        port,
+        path = "/",
+        connections = 10,
+        duration = 5.0,
+        rate = None,
+        message = MESSAGE
+    ):
+        self.protocol = protocol
+        self.port = port
+        self.path = path
+        self.connections = connections
+        self.duration = duration
+        self.rate = rate
+        self.message = message
+        self.url = "http://127.0.0.1:%d%s" % (port, path)
+        self.client = None
+        self.latencies = []
+        self.errors = 0
+        self.issued = 0
+        self.start = None
+        self.end = None
+        self.idle = collections.deque()
+        self.backlog = collections.deque()
+
+    def run(self):
+        # builds the client for the protocol and opens the complete set
+        # of connections, then schedules the end of the run and (in case
+        # of the open loop mode) the ticking of the requests, blocking
+        # the current thread in the event loop of the client
+        self.client = self.build_client()
+        for _index in range(self.connections): self.open()
+        self.start = time.time()
+        self.client.delay(self.finish, timeout = self.duration)
+        if self.rate: self.client.delay(self.tick, immediately = True)
+        self.client.start()
+        return self.result()
+
+    def result(self):
+        duration = (self.end or time.time()) - self.start
+        count = len(self.latencies)
+        latencies = sorted(self.latencies)
+        result = dict(
+            protocol = self.protocol,
+            mode = "open" if self.rate else "closed",
+            connections = self.connections,
+            rate = self.rate,
+            duration = duration,
+            requests = count,
+            errors = self.errors,
+            throughput = count / duration if duration else 0.0
+        )
+        for name, value in PERCENTILES:
+            result[name] = percentile(latencies, value) * 1000.0
+        return result
+
+    def build_client(self):
+        # builds the client for the protocol of the generator, note that
+        # the client is not run in its own thread as the event loop is run
+        # by the generator itself (in the current thread) and that for the
+        # open loop mode the poll timeout is reduced to the tick interval
+        kwargs = dict(poll_timeout = TICK) if self.rate else dict()
+        if self.protocol == "http":
+            client = netius.clients.HTTPClient(
+                thread = False,
+                auto_release = False,
+                **kwargs
+            )
+        elif self.protocol == "h2":
+            client = netius.clients.HTTP2Client(
+                thread = False,
+                **kwargs
+            )
+        elif self.protocol == "ws":
+            client = netius.clients.WSClient(
+                thread = False,
+                **kwargs
+            )
+            client.bind("handshake", lambda client, connection: self.ready(connection))
+            client.bind("message", lambda client, connection, data: self.on_response(connection))
+        else:
+            client = netius.clients.RawClient(
+                thread = False,
+                **kwargs
+            )
+            client.bind("connect", lambda client, connection: self.ready(connection))
+            client.bind("data", self.on_data_raw)
+        client.bind("close", self.on_close)
+        return client
+
+    def open(self):
+        # creates a new connection according to the protocol, the http
+        # connections are ready immediately (the request is queued until
+        # the connection is established) while the raw and websockets ones
+        # are only ready after the connection (or handshake) is completed,
+        # the h2 ones are slots as the streams are created per request
+        if self.protocol == "http":
+            connection = self.client.acquire_c("127.0.0.1", self.port)
+        elif self.protocol == "h2":
+            connection = LoadSlot()
+        elif self.protocol == "ws":
+            connection = self.client.connect_ws("ws://127.0.0.1:%d%s" % (self.port, self.path))
+        else:
+            connection = self.client.connect("127.0.0.1", self.port)
+        connection.started = None
+        connection.received = 0
+        if self.protocol in ("http", "h2"): self.ready(connection)
+
+    def ready(self, connection):
+        # in case the open loop mode is used the connection is either used
+        # for a request that is waiting in the backlog or set as idle,
+        # otherwise (closed loop mode) a new request is sent immediately
+        if not self.rate: self.request(connection, time.time()); return
+        if self.backlog: self.request(connection, self.backlog.popleft())
+        else: self.idle.append(connection)
+
+    def request(self, connection, started):
+        connection.started = started
+        connection.received = 0
+        if self.protocol == "http": self.client.method(
+            "GET",
+            self.url,
+            connection = connection,
+            callback = lambda connection, parser, message: self.on_response(connection)
+        )
+        elif self.protocol == "h2": self.client.method(
+            "GET",
+            self.url,
+            callback = lambda stream, parser, message: self.on_response(connection)
+        )
+        elif self.protocol == "ws": connection.send_ws(self.message)
+        else: connection.send(self.message)
+
+    def tick(self):
+        # schedules the requests that are due (fixed rate) since the last
+        # tick, using the free connections and adding the remaining ones to
+        # the backlog (waiting for a connection), note that the scheduled
+        # time is the one used as the start of the request (latency) and
+        # that the tick is run on every iteration of the event loop (the
+        # poll timeout is the tick interval) avoiding the timer resolution
+        now = time.time()
+        due = int((now - self.start) * self.rate)
+        while self.issued < due:
+            started = self.start + self.issued / float(self.rate)
+            self.issued += 1
+            if self.idle: self.request(self.idle.popleft(), started)
+            else: self.backlog.append(started)
+        if self.end: return
+        self.client.delay(self.tick)
+
+    def finish(self):
+        self.end = time.time()
+        self.client.stop()
+
+    def on_response(self, connection):
+        if self.end: return
+        self.latencies.append(time.time() - connection.started)
+        self.ready(connection)
+
+    def on_data_raw(self, client, connection, data):
+        connection.received += len(data)
+        if connection.received < len(self.message): return
+        self.on_response(connection)
+
+    def on_close(self, client, connection):
+        # the streams of the h2 protocol are closed once their response
+        # is received so only the closing of connections is an error
+        if self.end: return
+        if isinstance(connection, netius.Stream): return
+        self.errors += 1
+
+def percentile(values, value):
+    # retrieves the value of the percentile from the (sorted) sequence
+    # of values using the nearest rank method, zero for no values
+    if not values: return 0.0
+    index = int(len(values) * value)
+    return values[min(index, len(values) - 1)]
+
+def launch(code, port = PORT, **kwargs):
+    env = dict(os.environ)
+    env.update(PORT = str(port), LEVEL = "WARNING")
+    env.update(kwargs)
+    process = subprocess.Popen(
+        [sys.executable, "-c", code],
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def measure(name, connections = 10, duration = 5.0, rate = None, port = PORT):
+    scenario = SCENARIOS[name]
+    processes = []
+    base_path = tempfile.mkdtemp()
+
+    try:
+        # creates the file to be served by the file server and launches
+        # the server (and the back-end server) for the scenario, note that
+        # the back-end server is launched first (ready for the proxy)
+        file = open(os.path.join(base_path, "file.bin"), "wb")
+        try: file.write(b"x" * FILE_SIZE)
+        finally: file.close()
+        backend = scenario.get("backend", None)
+        if backend: processes.append(launch(backend, port = port + 1))
+        process = launch(
+            scenario["server"],
+            port = port,
+            BASE_PATH = base_path,
+            BACKEND_PORT = str(port + 1)
+        )
+        processes.append(process)
+
+        # runs the load generator against the server measuring the cpu
+        # time of the server (and the back-end server) and the resident
+        # memory of the server before and after the connections are open
+        rss_start = memory.rss(process.pid)
+        cpu_start = sum(poll.cpu(_process.pid) for _process in processes)
+        client_start = sum(os.times()[:2])
+        generator = LoadGenerator(
+            scenario["protocol"],
+            port,
+            path = scenario["path"],
+            connections = connections,
+            duration = duration,
+            rate = rate
+        )
+        result = generator.run()
+        rss_end = memory.rss(process.pid)
+        cpu_time = sum(poll.cpu(_process.pid) for _process in processes) - cpu_start
+        client_time = sum(os.times()[:2]) - client_start
+    finally:
+        for _process in processes: _process.kill()
+        for _process in processes: _process.wait()
+        shutil.rmtree(base_path, ignore_errors = True)
+
+    # updates the result of the load generator with the resource usage
+    # values, normalized by the number of requests and connections
+    requests = max(result["requests"], 1)
+    result.update(
+        scenario = name,
+        cpu_request = cpu_time / requests * 1000000.0,
+        client_cpu_request = client_time / requests * 1000000.0,
+        rss = rss_end,
+        rss_connection = max(rss_end - rss_start, 0) / float(connections)
+    )
+    return result
+
+def run(
+    scenarios = ("hello", "h2", "echo", "ws", "file", "proxy"),
+    connections = 10,
+    duration = 5.0,
+    rate = None,
+    port = PORT
+):
+    """
+    Runs the load benchmark for the provided scenarios, launching the
+    associated server (as a sub process) and running a netius based
+    load generator against it (over loopback), printing the results
+    as json so that they may be stored and compared between releases.
+
+    The reported values include the throughput (requests per second),
+    the latency percentiles (in milliseconds), the cpu time of the
+    server per request (in microseconds) and the resident memory of
+    the server per connection (in bytes).
+
+    :type scenarios: Tuple
+    :param scenarios: The names of the scenarios to be measured.
+    :type connections: int
+    :param connections: The number of (concurrent) connections.
+    :type duration: float
+    :param duration: The duration of each scenario in seconds.
+    :type rate: int
+    :param rate: The number of requests per second to be scheduled
+    (open loop mode), if not set the closed loop mode is used.
+    :type port: int
+    :param port: The port to be used by the server.
+    :rtype: List
+    :return: The list containing the results for each scenario.
+    """
+
+    results = []
+    for name in scenarios:
+        result = measure(
+            name,
+            connections = connections,
+            duration = duration,
+            rate = rate,
+            port = port
+        )
+        results.append(result)
+    print(json.dumps(results, indent = 4, sort_keys = True))
+    return results
+
+if __name__ == "__main__":
+    scenarios = sys.argv[1].split(",") if len(sys.argv) > 1 else SCENARIOS.keys()
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rate = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    run(scenarios = scenarios, connections = connections, rate = rate)
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import select
+import socket
+import subprocess
+
+from . import poll
+
+PORT = 9099
+""" The port to be used by the echo server that is going
+to be launched (as a sub process) for the benchmark """
+
+LOOPS = (1, 2, 4, 8)
+""" The number of event loops (inside the server process) that
+are going to be measured for each of the modes """
+
+MODES = (True, False)
+""" The modes of the multiple loops, either using one listening
+socket per loop (reuse port) or dispatching the sockets accepted
+by the primary loop to the other loops """
+
+MESSAGE = b"x" * 32
+""" The (small) message that is sent through every connection
+and echoed back by the server """
+
+def launch(loops, reuse_port, port = PORT):
+    env = dict(os.environ)
+    env.update(
+        PORT = str(port),
+        LEVEL = "WARNING",
+        LOOPS = str(loops),
+        REUSE_PORT = "1" if reuse_port else "0"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", "import netius.bench.poll; netius.bench.poll.serve()"],
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def client(active, duration, port = PORT):
+    # creates the active connections and runs the ping pong cycle on
+    # each of them until the duration is reached, printing the number
+    # of round trips to the standard output (read by the benchmark)
+    sockets = dict()
+    epoll = select.epoll()
+    for _socket in poll.connect(active, port = port):
+        _socket.setblocking(0)
+        epoll.register(_socket.fileno(), select.EPOLLIN)
+        sockets[_socket.fileno()] = _socket
+        _socket.send(MESSAGE)
+
+    count = 0
+    pending = dict((fd, 0) for fd in sockets)
+    end = time.time() + duration
+    while time.time() < end:
+        for fd, _event in epoll.poll(0.1):
+            _socket = sockets[fd]
+            data = _socket.recv(65536)
+            if not data: raise socket.error("Connection closed")
+            received = pending[fd] + len(data)
+            responses = received // len(MESSAGE)
+            pending[fd] = received % len(MESSAGE)
+            count += responses
+            if responses: _socket.send(MESSAGE * responses)
+
+    epoll.close()
+    for _socket in sockets.values(): _socket.close()
+    sys.stdout.write(str(count))
+    sys.stdout.flush()
+
+def measure(loops, reuse_port, clients, active, duration, port = PORT):
+    process = launch(loops, reuse_port, port = port)
+    try:
+        # launches the client processes (so that the client side is not
+        # the bottleneck) and waits for them to finish, summing the number
+        # of round trips and measuring the cpu time used by the server
+        start_cpu = poll.cpu(process.pid)
+        command = "import netius.bench.loops; netius.bench.loops.client(%d, %f, port = %d)"
+        processes = [subprocess.Popen(
+            [sys.executable, "-c", command % (active, duration, port)],
+            stdout = subprocess.PIPE
+        ) for _index in range(clients)]
+        count = sum(int(_process.communicate()[0] or 0) for _process in processes)
+        cpu_time = poll.cpu(process.pid) - start_cpu
+    finally:
+        process.kill()
+        process.wait()
+
+    return count, cpu_time
+
+def run(clients = 4, active = 100, duration = 5.0, port = PORT):
+    """
+    Runs the loops benchmark launching an echo server (as a sub
+    process) with a varying number of event loops (one thread per
+    loop), in both the reuse port and the dispatch modes, and then
+    running a ping pong cycle of small messages from a series of
+    client processes, printing the resulting throughput and the server
+    cpu time (relative to the wall time) for each configuration.
+
+    Note that under an interpreter with a global lock (eg: CPython)
+    the loops do not run python code in parallel, so the throughput
+    only scales with the time spent outside of the interpreter.
+
+    :type clients: int
+    :param clients: The number of client processes to be used.
+    :type active: int
+    :param active: The number of active connections per client.
+    :type duration: float
+    :param duration: The duration of each measurement in seconds.
+    :type port: int
+    :param port: The port to be used by the echo server.
+    """
+
+    print("%-6s %-10s %12s %10s %8s" % ("loops", "mode", "messages", "msg/s", "cpu (%)"))
+    print("-" * 50)
+    for reuse_port in MODES:
+        for loops in LOOPS:
+            count, cpu_time = measure(loops, reuse_port, clients, active, duration, port = port)
+            print("%-6d %-10s %12d %10.0f %8.1f" % (
+                loops,
+                "reuse port" if reuse_port else "dispatch",
+                count,
+                count / duration,
+                cpu_time / duration * 100.0
+            ))
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    active = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run(clients = clients, active = active)
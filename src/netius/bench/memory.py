@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import socket
+import subprocess
+
+PORT = 9096
+""" The port to be used by the server that is going to
+be launched (as a sub process) for the benchmark """
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+""" The (keep alive) request that is sent through each of the
+connections in the http mode, before they become idle """
+
+HANDSHAKE = b"GET / HTTP/1.1\r\n\
+Host: localhost\r\n\
+Upgrade: websocket\r\n\
+Connection: Upgrade\r\n\
+Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\
+Sec-WebSocket-Version: 13\r\n\
+\r\n"
+""" The handshake request that is used to upgrade each of the
+connections into websockets in the ws mode """
+
+MODES = dict(
+    echo = (
+        ["-c", "import netius.bench.poll; netius.bench.poll.serve()"],
+        None,
+        None
+    ),
+    http = (
+        ["-c", "import netius.extra; netius.extra.HelloServer().serve(env = True)"],
+        REQUEST,
+        b"Hello World"
+    ),
+    ws = (
+        ["-c", "import netius.servers; netius.servers.EchoServer().serve(env = True)"],
+        HANDSHAKE,
+        b"\r\n\r\n"
+    )
+)
+""" The map associating the mode of the benchmark with the
+arguments used to launch the server, the request that is sent
+through each connection and the marker of its (complete) response """
+
+def launch(mode, port = PORT):
+    env = dict(os.environ)
+    env.update(PORT = str(port), LEVEL = "WARNING")
+    arguments, _request, _marker = MODES[mode]
+    process = subprocess.Popen(
+        [sys.executable] + arguments,
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def rss(pid):
+    # retrieves the resident set size (in bytes) of the process with
+    # the provided pid from the proc file system (status file)
+    file = open("/proc/%d/status" % pid, "r")
+    try: lines = file.readlines()
+    finally: file.close()
+    for line in lines:
+        if not line.startswith("VmRSS:"): continue
+        return int(line.split()[1]) * 1024
+    return 0
+
+def measure(mode, count, port = PORT):
+    _arguments, request, marker = MODES[mode]
+    process = launch(mode, port = port)
+    try:
+        # waits for the server to settle and then retrieves the initial
+        # resident size of it, to be used as the reference value
+        time.sleep(0.5)
+        start = rss(process.pid)
+
+        # creates the requested number of connections and runs the request
+        # (and response) cycle in each of them so that the connections are
+        # set in their idle (and complete) state, before the measure
+        sockets = []
+        for index in range(count):
+            _socket = socket.create_connection(("127.0.0.1", port))
+            sockets.append(_socket)
+            if index % 100 == 99: time.sleep(0.01)
+            if not request: continue
+            _socket.sendall(request)
+            buffer = b""
+            while not marker in buffer:
+                data = _socket.recv(4096)
+                if not data: raise socket.error("Connection closed")
+                buffer += data
+
+        # waits for the server to process the (pending) connections and
+        # retrieves the final resident size of it, closing the connections
+        time.sleep(1.0)
+        end = rss(process.pid)
+        for _socket in sockets: _socket.close()
+    finally:
+        process.kill()
+        process.wait()
+
+    return end - start
+
+def run(count = 10000, port = PORT):
+    """
+    Runs the memory benchmark launching an echo, an http and a websocket
+    server as sub processes, opening a series of (idle) connections to each
+    of them and printing the growth of the resident size of the server per
+    connection, note that the kernel socket buffers are not accounted.
+
+    :type count: int
+    :param count: The number of connections opened to each server.
+    :type port: int
+    :param port: The port to be used by the servers.
+    """
+
+    print("%-6s %12s %14s %16s" % ("mode", "connections", "rss (MB)", "bytes/conn"))
+    print("-" * 51)
+    for mode in ("echo", "http", "ws"):
+        size = measure(mode, count, port = port)
+        print("%-6s %12d %14.2f %16.0f" % (
+            mode,
+            count,
+            size / 1048576.0,
+            size / float(count)
+        ))
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(count = count)
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import select
+import socket
+import subprocess
+
+import netius.common
+
+PORT = 9097
+""" The port to be used by the server that is going to
+be launched (as a sub process) for the benchmark """
+
+POLLS = ("epoll", "poll", "select")
+""" The names of the poll mechanisms that are going to be
+measured, the ones that are not available in the current
+environment are ignored """
+
+MESSAGE = b"x" * 32
+""" The (small) message that is going to be sent through the
+active connections and echoed back by the server """
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+""" The (keep alive) request that is going to be sent through
+the active connections in the http mode of the benchmark """
+
+MODES = dict(
+    echo = (
+        ["-c", "import netius.bench.poll; netius.bench.poll.serve()"],
+        MESSAGE,
+        MESSAGE
+    ),
+    http = (
+        ["-c", "import netius.extra; netius.extra.HelloServer().serve(env = True)"],
+        REQUEST,
+        b"Hello World"
+    )
+)
+""" The map associating the mode of the benchmark with the
+arguments used to launch the server, the message to be sent
+and the marker that identifies a complete response """
+
+class EchoServer(netius.StreamServer):
+    """
+    Simple (raw) echo server that sends back the data received
+    from each of its connections, to be used in the benchmark.
+    """
+
+    def on_data(self, connection, data):
+        netius.StreamServer.on_data(self, connection, data)
+        connection.send(data)
+
+def serve():
+    server = EchoServer()
+    server.serve(env = True)
+
+def launch(poll, mode = "echo", port = PORT):
+    env = dict(os.environ)
+    env.update(PORT = str(port), LEVEL = "WARNING", POLL = poll)
+    arguments, _message, _marker = MODES[mode]
+    process = subprocess.Popen(
+        [sys.executable] + arguments,
+        env = env
+    )
+    for _index in range(100):
+        try: _socket = socket.create_connection(("127.0.0.1", port))
+        except socket.error: time.sleep(0.05); continue
+        _socket.close()
+        break
+    return process
+
+def connect(count, port = PORT):
+    # creates the requested number of connections to the server in
+    # batches so that the listen backlog of the server is not exceeded
+    sockets = []
+    for index in range(count):
+        _socket = socket.create_connection(("127.0.0.1", port))
+        _socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sockets.append(_socket)
+        if index % 100 == 99: time.sleep(0.01)
+    return sockets
+
+def cpu(pid):
+    # retrieves the amount of (user and system) cpu time consumed by
+    # the process with the provided pid from the proc file system
+    file = open("/proc/%d/stat" % pid, "r")
+    try: fields = file.read().rsplit(")", 1)[1].split()
+    finally: file.close()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / float(ticks)
+
+def measure(poll, mode, idle, active, duration, port = PORT):
+    _arguments, message, marker = MODES[mode]
+    process = launch(poll, mode = mode, port = port)
+    try:
+        # creates both the idle and the active connections, note that
+        # the idle ones are kept open (registered) during the benchmark
+        idles = connect(idle, port = port)
+        actives = connect(active, port = port)
+        for _socket in actives: _socket.setblocking(0)
+
+        # registers the active connections in the (client side) epoll
+        # and starts the ping pong cycle on each of them
+        epoll = select.epoll()
+        sockets = dict()
+        buffers = dict()
+        for _socket in actives:
+            epoll.register(_socket.fileno(), select.EPOLLIN)
+            sockets[_socket.fileno()] = _socket
+            buffers[_socket.fileno()] = b""
+            _socket.send(message)
+
+        # runs the ping pong cycle until the duration is reached, counting
+        # the number of complete responses received (round trips), sending
+        # a new message for each of them, and the server cpu time
+        count = 0
+        start_cpu = cpu(process.pid)
+        end = time.time() + duration
+        while time.time() < end:
+            for fd, _event in epoll.poll(0.1):
+                _socket = sockets[fd]
+                data = _socket.recv(65536)
+                if not data: raise socket.error("Connection closed")
+                buffer = buffers[fd] + data
+                responses = buffer.count(marker)
+                if responses: buffer = buffer[buffer.rindex(marker) + len(marker):]
+                buffers[fd] = buffer
+                count += responses
+                if responses: _socket.send(message * responses)
+        cpu_time = cpu(process.pid) - start_cpu
+
+        epoll.close()
+        for _socket in idles + actives: _socket.close()
+    finally:
+        process.kill()
+        process.wait()
+
+    return count, cpu_time
+
+def run(mode = "echo", idle = 10000, active = 1000, duration = 5.0, port = PORT):
+    """
+    Runs the poll benchmark launching either a (raw) echo server or
+    an hello (http) server as a sub process, for each of the available
+    poll backends, opening a series of idle connections and then running
+    a ping pong cycle of small messages (or requests) over the active
+    ones, printing the resulting throughput and the server cpu time
+    per message.
+
+    :type mode: String
+    :param mode: The mode of the benchmark, either echo or http.
+    :type idle: int
+    :param idle: The number of idle connections (kept open).
+    :type active: int
+    :param active: The number of active (ping pong) connections.
+    :type duration: float
+    :param duration: The duration of the benchmark in seconds.
+    :type port: int
+    :param port: The port to be used by the echo server.
+    """
+
+    print("%-6s %-8s %8s %8s %12s %10s %12s" % ("mode", "poll", "idle", "active", "messages", "msg/s", "cpu (us/msg)"))
+    print("-" * 70)
+    for poll in POLLS:
+        if not netius.Base.test_poll(preferred = poll).name() == poll: continue
+        count, cpu_time = measure(poll, mode, idle, active, duration, port = port)
+        print("%-6s %-8s %8d %8d %12d %10.0f %12.2f" % (
+            mode,
+            poll,
+            idle,
+            active,
+            count,
+            count / duration,
+            cpu_time / max(count, 1) * 1000000.0
+        ))
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "echo"
+    idle = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    active = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    run(mode = mode, idle = idle, active = active)
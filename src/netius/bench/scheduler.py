@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+
+import netius
+
+SIZES = (1000, 10000, 100000)
+""" The default sizes (number of pending timers) for which
+the scheduler implementations are going to be measured """
+
+SCHEDULERS = (netius.HeapScheduler, netius.WheelScheduler)
+""" The sequence of scheduler classes that are going to be
+compared against each other in the benchmark """
+
+def noop():
+    pass
+
+def measure(callable, *args, **kwargs):
+    start = time.time()
+    result = callable(*args, **kwargs)
+    return time.time() - start, result
+
+def insert(scheduler, count, base):
+    return [
+        scheduler.add(noop, base + 1.0 + (index % 3600), 0) for index in range(count)
+    ]
+
+def cancel(scheduler, handles):
+    for handle in handles[::2]: scheduler.cancel(handle)
+
+def verify(scheduler, count, base):
+    target = base + 60.0
+    for _index in range(count): scheduler.add(noop, target, 0, verify = True)
+
+def tick(scheduler, ticks, base):
+    # runs the scheduler through a series of (empty) ticks, this
+    # simulates an idle event loop with a large number of timers
+    # pending and should be (almost) free for a proper scheduler
+    for index in range(ticks): scheduler.run(base + index * 0.001, index + 1)
+
+def expire(scheduler, base):
+    scheduler.run(base + 3601.0, -1)
+
+def run(sizes = SIZES, schedulers = SCHEDULERS, ticks = 10000):
+    """
+    Runs the complete scheduler benchmark for the provided sizes
+    and scheduler classes, printing the results to the standard
+    output in a tabular (human readable) format.
+
+    :type sizes: Tuple
+    :param sizes: The sequence of pending timer counts to be used.
+    :type schedulers: Tuple
+    :param schedulers: The scheduler classes to be measured.
+    :type ticks: int
+    :param ticks: The number of (idle) ticks to be run per measure.
+    """
+
+    header = "%-8s %8s %10s %10s %10s %10s %10s" % (
+        "name", "size", "insert", "cancel", "verify", "tick", "expire"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for size in sizes:
+        for scheduler_c in schedulers:
+            base = time.time()
+            scheduler = scheduler_c()
+            insert_t, handles = measure(insert, scheduler, size, base)
+            cancel_t, _result = measure(cancel, scheduler, handles)
+            verify_t, _result = measure(verify, scheduler, size, base)
+            tick_t, _result = measure(tick, scheduler, ticks, base)
+            expire_t, _result = measure(expire, scheduler, base)
+            print("%-8s %8d %9.3fs %9.3fs %9.3fs %9.3fs %9.3fs" % (
+                scheduler.name(), size, insert_t, cancel_t, verify_t, tick_t, expire_t
+            ))
+
+if __name__ == "__main__":
+    sizes = [int(value) for value in sys.argv[1:]] or SIZES
+    run(sizes = sizes)
@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+import socket
+import threading
+import collections
+
+import netius
+
+MODES = ("single", "coalesced", "vectored")
+""" The modes of sending that are going to be compared, the single
+mode sends one pending buffer per system call, the coalesced one
+joins the pending buffers into a single buffer (ssl fallback) and
+the vectored one uses scatter/gather (sendmsg) operations """
+
+class CountingSocket(object):
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.calls = 0
+
+    def send(self, data):
+        self.calls += 1
+        return self.socket.send(data)
+
+class VectoredSocket(CountingSocket):
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        return self.socket.sendmsg(buffers)
+
+def build_http(count = 64, size = 1024):
+    header = "HTTP/1.1 200 OK\r\nContent-Length: %d\r\nServer: netius\r\n\r\n" % size
+    header = netius.legacy.bytes(header)
+    return [header, b"x" * size] * count
+
+def build_frames(count = 256, size = 96):
+    return [b"\x00\x00\x60\x00\x00\x00\x00\x00\x01", b"x" * size] * count
+
+def build_large(count = 16, size = 65536):
+    return [b"x" * size] * count
+
+def drain(_socket):
+    while True:
+        data = _socket.recv(1048576)
+        if not data: break
+
+def measure(buffers, mode, rounds = 100):
+    # creates the pair of connected sockets, the receiving end is
+    # drained by a background thread so that the sending is never
+    # blocked (measures the cost of the send operation itself)
+    first, second = socket.socketpair()
+    thread = threading.Thread(target = drain, args = (second,))
+    thread.start()
+
+    # wraps the sending socket so that the number of system calls
+    # is counted and creates the connection object that is going
+    # to be used for the sending of the buffers (without owner)
+    is_vectored = mode == "vectored" and hasattr(first, "sendmsg")
+    socket_c = VectoredSocket if is_vectored else CountingSocket
+    wrapper = socket_c(first)
+    connection = netius.Connection(socket = wrapper)
+    if mode == "single": connection.send_buffers = 1
+
+    # runs the multiple rounds of sending, each of them pushes the
+    # complete set of buffers to the pending list (as a sequence of
+    # send operations during a tick would) and flushes them at once
+    start = time.time()
+    for _index in range(rounds):
+        connection.pending = collections.deque()
+        for data in buffers:
+            connection.pending.append(data)
+            connection.pending_s += len(data)
+        connection._send()
+    delta = time.time() - start
+
+    # closes the sending socket so that the draining thread is able
+    # to finish and joins it, closing then the receiving socket
+    first.shutdown(socket.SHUT_WR)
+    thread.join()
+    first.close()
+    second.close()
+
+    # returns the number of system calls used per round and the
+    # throughput of the sending operation in MB/s
+    data_l = sum(len(data) for data in buffers) * rounds
+    return wrapper.calls / float(rounds), data_l / max(delta, 1e-9) / 1048576.0
+
+def run(modes = MODES, rounds = 100):
+    """
+    Runs the send benchmark for a series of scenarios (http responses
+    with header and body, small http2 like frames and large buffers)
+    printing the number of system calls per flush operation and the
+    resulting throughput for each of the sending modes.
+
+    :type modes: Tuple
+    :param modes: The sequence of sending modes to be measured.
+    :type rounds: int
+    :param rounds: The number of flush operations per measure.
+    """
+
+    scenarios = (
+        ("http", build_http()),
+        ("frames", build_frames()),
+        ("large", build_large())
+    )
+
+    header = "%-10s %-10s %8s %10s %10s" % (
+        "mode", "scenario", "buffers", "calls", "MB/s"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for name, buffers in scenarios:
+        for mode in modes:
+            calls, throughput = measure(buffers, mode, rounds = rounds)
+            print("%-10s %-10s %8d %10.1f %10.2f" % (
+                mode, name, len(buffers), calls, throughput
+            ))
+
+if __name__ == "__main__":
+    modes = sys.argv[1:] or MODES
+    run(modes = modes)
@@ -0,0 +1,216 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import sys
+import time
+import struct
+import select
+import socket
+
+import netius.common
+import netius.servers
+
+from . import load
+
+PORT = 9110
+""" The port to be used by the (h2c) server that is going to be
+launched as a sub process for the upload benchmark """
+
+SIZE = 67108864
+""" The default size in bytes of the payload that is going to be
+uploaded to the server in each of the measures """
+
+FRAME_SIZES = (16384, 131072)
+""" The sizes of the DATA frames to be used by the client, the
+first one is the default (and most common) frame size and the
+second one the maximum allowed by the optimal server settings """
+
+SERVER = "import netius.bench.upload; netius.bench.upload.serve()"
+""" The code to be executed by the sub process that runs the
+server, the port is provided using the environment """
+
+def app(environ, start_response):
+    # reads the complete payload from the input (in chunks) so that
+    # the server side of the upload is accounted, returning the number
+    # of bytes that have been received as the response
+    input = environ["wsgi.input"]
+    count = 0
+    while True:
+        data = input.read(65536)
+        if not data: break
+        count += len(data)
+    result = netius.legacy.bytes(str(count))
+    start_response("200 OK", [("Content-Length", str(len(result)))])
+    return [result]
+
+def serve():
+    server = netius.servers.WSGIServer(app = app, legacy = False)
+    server.serve(env = True)
+
+def frame(type, flags, stream, payload = b""):
+    length = len(payload)
+    header = struct.pack("!BHBBI", length >> 16, length & 0xffff, type, flags, stream)
+    return header + payload
+
+def receive(_socket, size):
+    data = []
+    while size > 0:
+        chunk = _socket.recv(size)
+        if not chunk: raise netius.NetiusError("Connection closed by server")
+        data.append(chunk)
+        size -= len(chunk)
+    return b"".join(data)
+
+def upload(size = SIZE, frame_size = 16384, port = PORT):
+    """
+    Uploads a payload with the provided size to the (h2c) server
+    listening on the provided port, using a raw socket based client
+    with prior knowledge (no upgrade) and honoring flow control.
+
+    :type size: int
+    :param size: The size in bytes of the payload to be uploaded.
+    :type frame_size: int
+    :param frame_size: The maximum size of each DATA frame.
+    :type port: int
+    :param port: The port where the server is listening.
+    :rtype: float
+    :return: The time (in seconds) taken by the upload, including
+    the reception of the response from the server.
+    """
+
+    _socket = socket.create_connection(("127.0.0.1", port))
+    _socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    encoder = netius.common.HPACKEncoder()
+    block = encoder.encode([
+        (":method", "POST"),
+        (":scheme", "http"),
+        (":path", "/"),
+        (":authority", "localhost"),
+        ("content-length", str(size))
+    ])
+    payload = b"x" * frame_size
+    windows = dict(connection = 65535, stream = 65535)
+    state = dict(finished = False)
+
+    def process():
+        # reads and handles a single frame from the server, updating
+        # the flow control windows and acknowledging the settings
+        header = receive(_socket, 9)
+        extra, length, type, flags, stream = struct.unpack("!BHBBI", header)
+        data = receive(_socket, (extra << 16) + length)
+        if type == netius.common.SETTINGS and not flags & 0x01:
+            settings = dict(
+                struct.unpack("!HI", data[index:index + 6]) for index in range(0, len(data), 6)
+            )
+            window = settings.get(netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE, None)
+            if window: windows["stream"] += window - 65535
+            _socket.sendall(frame(netius.common.SETTINGS, 0x01, 0))
+        elif type == netius.common.WINDOW_UPDATE:
+            increment, = struct.unpack("!I", data)
+            windows["stream" if stream else "connection"] += increment
+        elif type in (netius.common.RST_STREAM, netius.common.GOAWAY):
+            raise netius.NetiusError("Upload aborted by server")
+        if type in (netius.common.HEADERS, netius.common.DATA) and flags & 0x01:
+            state["finished"] = True
+
+    start = time.time()
+    try:
+        _socket.sendall(
+            netius.common.HTTP2_PREFACE +\
+            frame(netius.common.SETTINGS, 0x00, 0) +\
+            frame(netius.common.HEADERS, 0x04, 1, block)
+        )
+
+        remaining = size
+        while remaining > 0:
+            # processes the pending frames from the server (without blocking)
+            # and then in case there's no window available blocks waiting for
+            # a window update, otherwise sends the next DATA frame
+            while select.select([_socket], [], [], 0)[0]: process()
+            available = min(windows["connection"], windows["stream"], frame_size, remaining)
+            if available <= 0: process(); continue
+            remaining -= available
+            flags = 0x00 if remaining else 0x01
+            _socket.sendall(frame(netius.common.DATA, flags, 1, payload[:available]))
+            windows["connection"] -= available
+            windows["stream"] -= available
+
+        while not state["finished"]: process()
+    finally:
+        _socket.close()
+    return time.time() - start
+
+def run(size = SIZE, frame_sizes = FRAME_SIZES, repeat = 3, port = PORT):
+    """
+    Runs the upload benchmark launching a netius WSGI server (as
+    a sub process) with HTTP2 enabled and uploading a payload of
+    the provided size using each of the frame sizes, printing the
+    best throughput (in MB/s) to the standard output.
+
+    :type size: int
+    :param size: The size in bytes of each upload.
+    :type frame_sizes: Tuple
+    :param frame_sizes: The sequence of DATA frame sizes to be used.
+    :type repeat: int
+    :param repeat: The number of uploads per frame size, the best
+    value (minimum time) is the one that is going to be used.
+    :type port: int
+    :param port: The port to be used by the server.
+    """
+
+    header = "%-8s %12s %10s" % ("frame", "bytes", "MB/s")
+    print(header)
+    print("-" * len(header))
+
+    process = load.launch(SERVER, port = port)
+    try:
+        for frame_size in frame_sizes:
+            best = min(
+                upload(size = size, frame_size = frame_size, port = port) for _index in range(repeat)
+            )
+            print("%-8d %12d %10.2f" % (frame_size, size, size / max(best, 1e-9) / 1048576.0))
+    finally:
+        process.kill()
+        process.wait()
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+    frame_sizes = [int(value) for value in sys.argv[2:]] or FRAME_SIZES
+    run(size = size, frame_sizes = frame_sizes)
@@ -38,6 +38,7 @@ from . import apn
 from . import dht
 from . import dns
 from . import http
+from . import http2
 from . import mjpg
 from . import raw
 from . import smtp
@@ -49,6 +50,7 @@ from .apn import APNConnection, APNClient
 from .dht import DHTRequest, DHTResponse, DHTClient
 from .dns import DNSRequest, DNSResponse, DNSClient
 from .http import HTTPConnection, HTTPClient
+from .http2 import HTTP2Response, HTTP2Request, HTTP2Connection, HTTP2Client
 from .mjpg import MJPGConnection, MJPGClient
 from .raw import RawClient
 from .smtp import SMTPConnection, SMTPClient
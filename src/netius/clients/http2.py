@@ -0,0 +1,811 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import zlib
+
+import netius.common
+
+from netius.common import PLAIN_ENCODING
+
+from netius.servers import http2 as http2_s
+
+from . import http
+
+HOP_HEADERS = (
+    "connection",
+    "keep-alive",
+    "proxy-connection",
+    "transfer-encoding",
+    "upgrade",
+    "http2-settings"
+)
+""" The connection specific (hop by hop) headers that are not
+allowed in HTTP2 and that must be removed from the requests """
+
+MAX_IDENTIFIER = 2147483647
+""" The maximum value allowed for a stream identifier, once
+reached no more streams may be created in the connection """
+
+class HTTP2Response(object):
+    """
+    Parser like representation of the response received for a
+    request sent through an HTTP2 stream, exposing the same interface
+    as the HTTP parser used by the HTTP 1.1 client connections.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.code = None
+        self.code_s = None
+        self.status = None
+        self.status_s = None
+        self.version = netius.common.http2.HTTP_20
+        self.version_s = "HTTP/2.0"
+        self.keep_alive = True
+        self.content_l = -1
+        self.headers = dict()
+
+    def clear(self, force = False):
+        pass
+
+    def get_message(self):
+        return self.owner.get_message_b().read()
+
+    def get_headers(self):
+        headers = dict()
+        for key, value in self.headers.items():
+            key_up = netius.common.header_up(key)
+            headers[key_up] = value
+        return headers
+
+class HTTP2Request(netius.common.HTTP2Stream):
+    """
+    Stream that represents a request sent through an HTTP2 connection,
+    acting as a "virtual" connection that is compatible with the interface
+    of the HTTP client connection (one connection per request).
+
+    The protocol level stream is released once the response has been
+    completely received, but the object remains open until it's explicitly
+    closed, the same way a keep alive connection would remain open.
+    """
+
+    def __init__(self, *args, **kwargs):
+        netius.common.HTTP2Stream.__init__(self, *args, **kwargs)
+        self.header_b = []
+        self.response = HTTP2Response(self)
+        self.current = PLAIN_ENCODING
+        self.renable = True
+        self.gzip_c = None
+        self.method = "GET"
+        self.encodings = "gzip, deflate"
+        self.url = None
+        self.base = None
+        self.host = None
+        self.port = None
+        self.path = None
+        self.ssl = False
+        self.parsed = None
+        self.safe = False
+        self.headers_r = dict()
+        self.data = None
+
+    def close(self, flush = False, destroy = True, reset = True):
+        # verifies if the current stream is already closed and
+        # if that's the case returns immediately, avoiding duplicate
+        if self.status == netius.CLOSED: return
+
+        # in case the request is still active (response not received)
+        # the peer is notified that it's no longer required (cancel)
+        is_active = self.owner._has_stream(self.identifier)
+        if reset and is_active: self.send_reset(
+            error_code = netius.common.http2.CANCEL
+        )
+
+        # calls the parent close method so that the upper layer
+        # instructions are correctly processed/handled, then releases
+        # the stream from the connection and notifies the listeners
+        netius.Stream.close(self)
+        self._release()
+        self.trigger("close", self)
+
+    def close_error(self, error_code = 0x00):
+        self.send_reset(error_code = error_code)
+        self.close(reset = False)
+
+    def set_http(
+        self,
+        version = "HTTP/1.1",
+        method = "GET",
+        url = None,
+        base = None,
+        host = None,
+        port = None,
+        path = None,
+        ssl = False,
+        parsed = None,
+        safe = False
+    ):
+        # notice that the provided version is ignored as the request
+        # is always going to be sent using the HTTP2 protocol
+        self.method = method.upper()
+        self.url = url
+        self.base = base
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ssl = ssl
+        self.parsed = parsed
+        self.safe = safe
+
+    def send_request(self):
+        method = self.method
+        path = self.path
+        headers = self.headers_r
+        data = self.data
+        parsed = self.parsed
+        safe = self.safe
+
+        if parsed.query: path += "?" + parsed.query
+
+        headers = dict(headers)
+        self._apply_base(headers)
+        self._apply_dynamic(headers)
+        if safe: self._headers_normalize(headers)
+
+        # the authority of the request is taken from the host header
+        # (as it's not allowed in HTTP2) defaulting to the target host
+        if self.port in (80, 443): host_s = self.host
+        else: host_s = "%s:%d" % (self.host, self.port)
+        authority = headers.pop("host", host_s)
+
+        # determines if there's a payload to be sent after the headers, if
+        # that's not the case the stream is ended with the headers, note that
+        # a payload not provided here (eg: relay) is ended with the flush
+        length = headers.get("content-length", 0)
+        has_payload = data or not length in (0, "0") or\
+            "transfer-encoding" in headers
+
+        # creates the headers base list that is going to store the various
+        # header tuples representing the headers in canonical http2 form
+        # starting with the pseudo headers that describe the request
+        headers_b = []
+        headers_b.append((":method", method))
+        headers_b.append((":scheme", "https" if self.ssl else "http"))
+        headers_b.append((":authority", authority))
+        headers_b.append((":path", path))
+
+        # iterates over the complete set of raw header values to normalize
+        # them and add them to the currently defined base list, removing
+        # the connection specific ones (not allowed in HTTP2)
+        for key, value in headers.items():
+            if key in HOP_HEADERS: continue
+            if key == "te" and not value == "trailers": continue
+            if not type(value) == list: value = (value,)
+            for _value in value: headers_b.append((key, _value))
+
+        self.end_stream_l = not has_payload
+        count = self.connection.send_headers(
+            headers_b,
+            end_stream = not has_payload,
+            stream = self.identifier
+        )
+        if not data: return count
+
+        count += self.send_base(data, final = True)
+        return count
+
+    def send_base(
+        self,
+        data,
+        final = False,
+        delay = True,
+        force = False,
+        callback = None
+    ):
+        if not self.is_open(): return 0
+        if self.end_stream_l: return 0
+        data = netius.legacy.bytes(data) if data else b""
+        if final: self.end_stream_l = True
+        kwargs = dict(final = final, delay = delay, callback = callback)
+        with self.ctx_request(kwargs = kwargs):
+            return self.connection.send_plain(data, **kwargs)
+
+    def flush(self, force = False, callback = None):
+        if not self.end_stream_l:
+            return self.send_base(b"", final = True, callback = callback)
+        if callback: callback(self)
+        return 0
+
+    def set_encodings(self, encodings):
+        self.encodings = encodings
+
+    def set_headers(self, headers, normalize = True):
+        self.headers_r = headers
+        if normalize: self.normalize_headers()
+
+    def set_data(self, data):
+        self.data = data
+
+    def normalize_headers(self):
+        for key, value in netius.legacy.eager(self.headers_r.items()):
+            del self.headers_r[key]
+            key = netius.common.header_down(key)
+            self.headers_r[key] = value
+
+    def raw_data(self, data):
+        """
+        Tries to obtain the raw version of the provided data, taking
+        into account the possible content encoding present for compression
+        or any other kind of operation.
+
+        :type data: String
+        :param data: The data to be converted back to its original
+        raw value (probably through decompression).
+        :rtype: String
+        :return: The final raw value for the provided data.
+        """
+
+        encoding = self.parser.headers.get("content-encoding", None)
+        if not encoding: return data
+        if not self.gzip_c:
+            is_deflate = encoding == "deflate"
+            wbits = zlib.MAX_WBITS if is_deflate else zlib.MAX_WBITS | 16
+            self.gzip_c = zlib.decompressobj(wbits)
+        return self.gzip_c.decompress(data)
+
+    def enable_read(self):
+        self.renable = True
+        self.local_update(0)
+
+    def disable_read(self):
+        self.renable = False
+
+    def is_throttleable(self):
+        return True
+
+    def is_exhausted(self):
+        if self.pending_s > self.max_pending: return True
+        if not self._available: return True
+        return False
+
+    def is_restored(self):
+        if self.pending_s > self.min_pending: return False
+        if not self._available: return False
+        return True
+
+    def decode_headers(self, force = False, assert_h = True):
+        # every complete header block must be decoded (to keep the state of
+        # the decoder) but only the first final (non informational) block
+        # is used as the headers of the response, the others are discarded
+        if not self.end_headers: return
+        if not self.header_b: return
+        block = b"".join(self.header_b)
+        self.header_b = []
+        try: headers_l = self.owner.decoder.decode(block)
+        except netius.ParserError as exception:
+            raise netius.ParserError(
+                "Invalid header block (%s)" % exception.get_kwarg("message"),
+                error_code = netius.common.http2.COMPRESSION_ERROR
+            )
+        if not self.headers_l == None: return
+        if assert_h: self.assert_headers(headers_l)
+        status = int(dict(headers_l)[":status"])
+        if status < 200: return
+        self.headers_l = headers_l
+
+    def local_update(self, increment):
+        # the window update frame is withheld while the reading is disabled
+        # for the stream (throttling) so that the peer stops sending data
+        # for it, note that the connection window is still updated
+        self.window_l += increment
+        if self.end_stream: return
+        if not self.renable: return
+        if self.window_l >= self.window_t: return
+        self.connection.send_window_update(
+            increment = self.window_o - self.window_l,
+            stream = self.identifier
+        )
+        self.window_l = self.window_o
+
+    def assert_headers(self, headers_l = None):
+        if headers_l == None: headers_l = self.headers_l
+        pseudo = True
+        status = None
+        for name, value in headers_l:
+            is_pseudo = name.startswith(":")
+            if not is_pseudo: pseudo = False
+            if not name.lower() == name:
+                raise netius.ParserError(
+                    "Headers must be lower cased",
+                    stream = self.identifier,
+                    error_code = netius.common.http2.PROTOCOL_ERROR
+                )
+            if is_pseudo and not name == ":status":
+                raise netius.ParserError(
+                    "Invalid pseudo-header in response",
+                    stream = self.identifier,
+                    error_code = netius.common.http2.PROTOCOL_ERROR
+                )
+            if is_pseudo and not status == None:
+                raise netius.ParserError(
+                    "Duplicated pseudo-header value",
+                    stream = self.identifier,
+                    error_code = netius.common.http2.PROTOCOL_ERROR
+                )
+            if not pseudo and is_pseudo:
+                raise netius.ParserError(
+                    "Pseudo-header positioned after normal header",
+                    stream = self.identifier,
+                    error_code = netius.common.http2.PROTOCOL_ERROR
+                )
+            if name == "connection":
+                raise netius.ParserError(
+                    "Invalid header present",
+                    stream = self.identifier,
+                    error_code = netius.common.http2.PROTOCOL_ERROR
+                )
+            if is_pseudo: status = value
+
+        if not status or not status.isdigit() or not len(status) == 3:
+            raise netius.ParserError(
+                "Missing or invalid status pseudo-header in response",
+                stream = self.identifier,
+                error_code = netius.common.http2.PROTOCOL_ERROR
+            )
+
+    def on_headers(self):
+        self.trigger("headers", self, self.parser)
+        self.connection.owner.on_headers_http(self, self.parser)
+
+    def on_partial(self, data):
+        # empty data frames (eg: final frame with the end of stream flag)
+        # are not notified as they carry no contents for the response
+        if not data: return
+        self.trigger("partial", self, self.parser, data)
+        self.connection.owner.on_partial_http(self, self.parser, data)
+
+    def on_data(self):
+        self._release()
+        message = self.parser.get_message()
+        self.trigger("message", self, self.parser, message)
+        self.connection.owner.on_data_http(self, self.parser)
+        self.gzip_c = None
+
+    @property
+    def parser(self):
+        return self.response
+
+    @property
+    def is_headers(self):
+        return self.end_headers and not self.headers_l == None
+
+    def _calculate_headers(self):
+        netius.common.verify(self.is_headers)
+        netius.common.verify(self.headers == None)
+
+        headers_m = dict()
+
+        for header in self.headers_l:
+            key, value = header
+            if key == ":status": code = int(value); continue
+            exists = key in headers_m
+            if exists:
+                sequence = headers_m[key]
+                is_list = type(sequence) == list
+                if not is_list: sequence = [sequence]
+                sequence.append(value)
+                value = sequence
+            headers_m[key] = value
+
+        self.headers = headers_m
+
+        response = self.response
+        response.code = code
+        response.code_s = str(code)
+        response.status = netius.common.CODE_STRINGS.get(code, "Unknown")
+        response.status_s = response.status
+        response.headers = headers_m
+
+    def _calculate(self):
+        netius.common.HTTP2Stream._calculate(self)
+        self.response.content_l = self.content_l
+
+    def _release(self):
+        # in case the request has not been completely sent (eg: the response
+        # was received before its end) the peer is notified that no more data
+        # is going to be sent for the stream (cancel operation)
+        is_active = self.owner._has_stream(self.identifier)
+        is_partial = is_active and not self.end_stream_l
+        if is_partial: self.send_reset(error_code = netius.common.http2.CANCEL)
+
+        # marks the request as completely sent, discards any frames that are
+        # still pending for the stream and removes it from the parser (the
+        # stream in the parser's context is preserved, as it may be another)
+        self.end_stream_l = True
+        self.connection.discard_frames(self.identifier)
+        if not is_active: return
+        stream_o = self.owner.stream_o
+        self.owner._del_stream(self.identifier)
+        if not stream_o == self: self.owner.stream_o = stream_o
+
+    def _apply_base(self, headers, replace = False):
+        for key, value in http.BASE_HEADERS.items():
+            if not replace and key in headers: continue
+            headers[key] = value
+
+    def _apply_dynamic(self, headers):
+        data = self.data
+
+        if data and not "content-length" in headers:
+            headers["content-length"] = len(data)
+        if not "accept-encoding" in headers and self.encodings:
+            headers["accept-encoding"] = self.encodings
+
+    def _headers_normalize(self, headers):
+        for key, value in headers.items():
+            if not type(value) in (list, tuple): continue
+            headers[key] = ";".join(value)
+
+class HTTP2Connection(http2_s.HTTP2Connection):
+    """
+    Client side HTTP2 connection, reusing the HTTP2 parser and the frame
+    builders of the server connection, under which multiple requests are
+    multiplexed as streams (up to the limit defined by the peer).
+    """
+
+    def __init__(self, *args, **kwargs):
+        http2_s.HTTP2Connection.__init__(
+            self,
+            legacy = False,
+            *args,
+            **kwargs
+        )
+        self.preface = True
+        self.goaway = False
+        self.target = None
+        self.set_h2()
+
+    def open(self, *args, **kwargs):
+        # the parser has already been created in the construction of the
+        # connection (required for write ahead) so only the base opening
+        # of the connection is performed
+        netius.Connection.open(self, *args, **kwargs)
+
+    def send(self, data, delay = True, force = False, callback = None):
+        # the data of a connection that is still pending (not yet connected)
+        # is always queued for latter delivery (write ahead), so that the
+        # requests may be sent before the connection is established
+        force = force or self.status == netius.PENDING
+        return http2_s.HTTP2Connection.send(
+            self,
+            data,
+            delay = delay,
+            force = force,
+            callback = callback
+        )
+
+    def send_preface(self):
+        self.send(netius.common.HTTP2_PREFACE)
+        self.send_settings(settings = netius.legacy.items(self.settings))
+        self.send_delta()
+
+    def set_h2(self):
+        http2_s.HTTP2Connection.set_h2(self)
+        self.parser.client = True
+        self.parser.store = False
+        self.parser.bind("on_headers", self.on_headers)
+        self.parser.bind("on_partial", self.on_partial)
+
+    def set_settings(self, settings):
+        # the peer may change the initial window size for the streams, which
+        # must be applied (as a delta) to the window of the open streams and
+        # may unblock frames that were delayed (waiting for window)
+        window = self.settings_r[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE]
+        http2_s.HTTP2Connection.set_settings(self, settings)
+        delta = self.settings_r[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE] - window
+        if delta == 0: return
+        streams = netius.legacy.keys(self.parser.streams)
+        for stream in netius.legacy.values(self.parser.streams):
+            stream.remote_update(delta)
+        self.flush_frames(streams = streams)
+        self.flush_available(streams = streams)
+
+    def new_request(self):
+        # determines the identifier of the new stream (odd identifiers are
+        # used for client initiated streams) and creates the stream with the
+        # current remote settings of the peer
+        identifier = self.parser._max_stream + 2 if self.parser._max_stream else 1
+        stream = HTTP2Request(
+            owner = self.parser,
+            identifier = identifier,
+            store = self.parser.store,
+            file_limit = self.parser.file_limit,
+            window = self.settings_r[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE],
+            frame_size = self.settings_r[netius.common.http2.SETTINGS_MAX_FRAME_SIZE]
+        )
+        stream.open()
+
+        # registers the stream in the parser, restoring the stream in the
+        # parser's context (the request may be created while handling another)
+        stream_o = self.parser.stream_o
+        self.parser._set_stream(stream)
+        self.parser.stream_o = stream_o
+
+        return stream
+
+    def is_full(self):
+        if self.goaway: return True
+        if self.is_closed(): return True
+        if self.parser._max_stream + 2 > MAX_IDENTIFIER: return True
+        streams = len(self.parser.streams)
+        maximum = self.settings_r[netius.common.http2.SETTINGS_MAX_CONCURRENT_STREAMS]
+        return streams >= maximum
+
+    def is_connected(self):
+        return self.is_open() and not self.connecting
+
+    def on_data(self):
+        stream = self.parser.stream_o
+        stream.on_data()
+
+    def on_partial(self, data):
+        stream = self.parser.stream_o
+        stream.on_partial(data.tobytes())
+
+    def on_headers(self):
+        stream = self.parser.stream_o
+        stream.on_headers()
+
+    def on_data_h2(self, stream, contents):
+        # the data of a stream that has been closed locally is discarded
+        # by the parser, so only the connection window is updated for it
+        identifier = stream.identifier if stream else 0x00
+        self.increment_local(identifier, increment = len(contents) * -1)
+        self.owner.on_data_http2(self, self.parser, stream, contents)
+
+class HTTP2Client(http.HTTPClient):
+    """
+    HTTP client that sends its requests through HTTP2 connections, the
+    requests are multiplexed as streams over a small pool of connections
+    per target, opening a new connection only when the existing ones
+    reach the limit of concurrent streams defined by the peer.
+
+    The connection returned by the request methods is a stream that
+    exposes the same interface as the HTTP 1.1 client connection, the
+    peer is expected to support HTTP2 (prior knowledge for plain text
+    connections and ALPN for secure ones).
+    """
+
+    def __init__(
+        self,
+        settings = netius.common.HTTP2_SETTINGS_OPTIMAL,
+        *args,
+        **kwargs
+    ):
+        http.HTTPClient.__init__(self, *args, **kwargs)
+
+        # the server push is always disabled in the settings of the client
+        # connections, as the client has no use for the pushed streams
+        self.settings = dict(settings)
+        self.settings[netius.common.http2.SETTINGS_ENABLE_PUSH] = 0
+        self.pool = dict()
+
+    def info_dict(self, full = False):
+        info = http.HTTPClient.info_dict(self, full = full)
+        info.update(
+            pool = sum(len(value) for value in netius.legacy.values(self.pool))
+        )
+        return info
+
+    def get_protocols(self):
+        return ["h2"]
+
+    def method(self, *args, **kwargs):
+        # the streams are not reusable for new requests (as the connections
+        # would be) so the provided connection (if any) is closed and a new
+        # stream is going to be acquired for the request
+        connection = kwargs.pop("connection", None)
+        if connection: connection.close()
+        return http.HTTPClient.method(self, *args, **kwargs)
+
+    def acquire_c(
+        self,
+        host,
+        port,
+        ssl = False,
+        key_file = None,
+        cer_file = None,
+        callback = None
+    ):
+        # creates the tuple that is going to describe the connection and
+        # tries to find a connection in the pool that is still able to
+        # handle one more stream (concurrent streams limit)
+        connection_t = (host, port, ssl, key_file, cer_file)
+        connections = self.pool.get(connection_t, [])
+        available = [value for value in connections if not value.is_full()]
+
+        # in case there's an available connection it's re-used, otherwise
+        # a new connection is created and added to the pool, notice that
+        # the connection establishment is deferred to the next cycle
+        if available: connection = available[0]
+        else:
+            connection = self.connect(
+                host,
+                port,
+                ssl = ssl,
+                key_file = key_file,
+                cer_file = cer_file
+            )
+            connection.target = connection_t
+            connections.append(connection)
+            self.pool[connection_t] = connections
+
+        # creates the stream for the request in the connection, in case the
+        # connection is already established the stream is acquired, otherwise
+        # it's going to be acquired once the connection is established
+        stream = connection.new_request()
+        if connection.is_connected(): self.acquire(stream)
+        return stream
+
+    def on_connect(self, connection):
+        http.HTTPClient.on_connect(self, connection)
+        streams = netius.legacy.values(connection.parser.streams)
+        for stream in streams: self.on_acquire(stream)
+
+    def on_ssl(self, connection):
+        # in case the peer has selected a protocol (through ALPN) that is
+        # not HTTP2 it's not possible to use the connection for requests
+        protocol = connection.ssl_protocol()
+        if protocol and not protocol == "h2":
+            self.warning("Peer selected '%s' instead of HTTP2" % protocol)
+            connection.close()
+            return
+        http.HTTPClient.on_ssl(self, connection)
+
+    def on_exception(self, exception, connection):
+        if not isinstance(exception, netius.NetiusError):
+            return http.HTTPClient.on_exception(self, exception, connection)
+        try: self._handle_exception(exception, connection)
+        except: connection.close()
+
+    def on_connection_d(self, connection):
+        http.HTTPClient.on_connection_d(self, connection)
+        connections = self.pool.get(connection.target, [])
+        if connection in connections: connections.remove(connection)
+        if not connections and connection.target in self.pool:
+            del self.pool[connection.target]
+
+    def on_stream_d(self, stream):
+        http.HTTPClient.on_stream_d(self, stream)
+        self.trigger("close", self, stream)
+
+    def new_connection(self, socket, address, ssl = False):
+        connection = HTTP2Connection(
+            owner = self,
+            socket = socket,
+            address = address,
+            ssl = ssl,
+            settings = self.settings
+        )
+        connection.send_preface()
+        return connection
+
+    def on_header_http2(self, connection, parser, header):
+        pass
+
+    def on_payload_http2(self, connection, parser):
+        is_debug = self.logger and self.is_debug()
+        is_debug and self.debug(
+            "Received frame 0x%02x (%s) for stream %d with length %d bytes" %\
+            (parser.type, parser.type_s, parser.stream, parser.length)
+        )
+
+    def on_frame_http2(self, connection, parser):
+        pass
+
+    def on_data_http2(self, connection, parser, stream, contents):
+        pass
+
+    def on_headers_http2(self, connection, parser, stream):
+        pass
+
+    def on_rst_stream_http2(self, connection, parser, stream, error_code):
+        if not stream: return
+        self.debug("Stream %d reset with error 0x%02x" % (stream.identifier, error_code))
+        stream.end_stream = True
+        stream.end_stream_l = True
+        stream.close(reset = False)
+
+    def on_settings_http2(self, connection, parser, settings, ack):
+        if ack: return
+        self.debug("Received settings %s for connection" % str(settings))
+        connection.set_settings(dict(settings))
+        connection.send_settings(ack = True)
+
+    def on_ping_http2(self, connection, parser, opaque, ack):
+        if ack: return
+        connection.send_ping(opaque = opaque, ack = True)
+
+    def on_goaway_http2(self, connection, parser, last_stream, error_code, extra):
+        # logs the error (if any) and marks the connection as going away so
+        # that no more streams are created under it (a new one is used)
+        if not error_code == 0x00: self.warning(
+            "Received error 0x%02x with message '%s'" %\
+            (error_code, netius.legacy.str(extra))
+        )
+        connection.goaway = True
+
+        # the streams above the last stream processed by the peer are never
+        # going to be handled, so they're closed (no response is received)
+        streams = netius.legacy.values(parser.streams)
+        for stream in streams:
+            if stream.identifier <= last_stream: continue
+            stream.close(reset = False)
+
+    def on_window_update_http2(self, connection, parser, stream, increment):
+        self.debug("Window updated with increment %d bytes" % increment)
+
+    def on_continuation_http2(self, connection, parser, stream):
+        pass
+
+    def on_send_http2(self, connection, parser, type, flags, payload, stream):
+        is_debug = self.logger and self.is_debug()
+        is_debug and self.debug(
+            "Sent frame 0x%02x (%s) for stream %d with length %d bytes" %\
+            (type, parser.get_type_s(type), stream, len(payload))
+        )
+
+    def _handle_exception(self, exception, connection):
+        stream = exception.get_kwarg("stream")
+        error_code = exception.get_kwarg("error_code", 0x00)
+        message = exception.get_kwarg("message", "")
+        ignore = exception.get_kwarg("ignore", False)
+        self.warning(exception)
+        self.log_stack()
+        if ignore: return
+
+        # in case the error is specific to a (still open) stream only that
+        # stream is reset and closed, otherwise the complete connection is
+        # closed with the error being notified to the peer (go away frame)
+        _stream = connection.parser.streams.get(stream, None)
+        if _stream: return _stream.close_error(error_code = error_code)
+        return connection.error_connection(
+            error_code = error_code,
+            message = message
+        )
@@ -81,6 +81,10 @@ class MJPGClient(http.HTTPClient):
     def on_partial_http(self, connection, parser, data):
         http.HTTPClient.on_partial_http(self, connection, parser, data)
 
+        # converts the data into a bytes value in case it's a memory view
+        # (partial body of the parser) as the find operation is required
+        if type(data) == memoryview: data = data.tobytes()
+
         # tries to find the end of image (eoi) indicator in the current
         # received data, and in case it's not found add the (partial)
         # data to the current buffer, to be latter processed
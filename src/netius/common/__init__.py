@@ -34,6 +34,7 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+from . import address
 from . import asn
 from . import calc
 from . import dhcp
@@ -41,6 +42,7 @@ from . import dkim
 from . import ftp
 from . import geo
 from . import http
+from . import hpack
 from . import http2
 from . import mime
 from . import parser
@@ -57,6 +59,7 @@ from . import torrent
 from . import util
 from . import ws
 
+from .address import AddressMatcher
 from .asn import asn1_parse, asn1_length, asn1_gen, asn1_build
 from .calc import prime, is_prime, relatively_prime, gcd, egcd, modinv,\
     random_integer_interval, random_primality, jacobi_witness, jacobi, ceil_integer
@@ -68,12 +71,13 @@ from .dkim import dkim_sign, dkim_headers, dkim_body, dkim_fold, dkim_generate
 from .ftp import FTPParser
 from .geo import GeoResolver
 from .http import REQUEST, RESPONSE, PLAIN_ENCODING, CHUNKED_ENCODING, GZIP_ENCODING,\
-    DEFLATE_ENCODING, HTTP_09, HTTP_10, HTTP_11, VERSIONS_MAP, CODE_STRINGS, HTTPParser,\
-    HTTPResponse
+    DEFLATE_ENCODING, HTTP_09, HTTP_10, HTTP_11, VERSIONS_MAP, CODE_STRINGS, PyHTTPParser,\
+    NativeHTTPParser, HTTPParser, HTTPResponse
+from .hpack import HPACKTable, HPACKEncoder, HPACKDecoder
 from .http2 import DATA, HEADERS, PRIORITY, RST_STREAM, SETTINGS, PUSH_PROMISE,\
-    PING, GOAWAY, WINDOW_UPDATE, CONTINUATION, HTTP2_WINDOW, HTTP2_PREFACE,\
+    PING, GOAWAY, WINDOW_UPDATE, CONTINUATION, HTTP2_WINDOW, HTTP2_WEIGHT, HTTP2_PREFACE,\
     HTTP2_TUPLES, HTTP2_NAMES, HTTP2_SETTINGS, HTTP2_SETTINGS_OPTIMAL, HTTP2_SETTINGS_T,\
-    HTTP2_SETTINGS_OPTIMAL_T, HTTP2Parser, HTTP2Stream
+    HTTP2_SETTINGS_OPTIMAL_T, HTTP2Parser, HTTP2Stream, HTTP2Scheduler
 from .mime import rfc822_parse, rfc822_join, mime_register
 from .parser import Parser
 from .pop import POPParser
@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import struct
+import socket
+
+import netius
+
+MAPPED_PREFIX = "::ffff:"
+""" The prefix of the ipv4 mapped ipv6 addresses, these addresses
+are matched as ipv4 ones (eg: dual stack service sockets) """
+
+class AddressMatcher(object):
+    """
+    Compiled matcher for a sequence of ipv4 and ipv6 addresses and
+    networks (in the CIDR notation), built once and then used to
+    verify if an address is contained in any of them.
+
+    The networks are indexed by prefix length in hash sets of the
+    (shifted) network values so that a lookup costs one set check
+    per distinct prefix length, this is equivalent to a walk in a
+    prefix trie but without the (per bit) node overhead.
+    """
+
+    def __init__(self, allowed = ()):
+        self.lengths4 = dict()
+        self.lengths6 = dict()
+        self.names = set()
+        self.shifts4 = ()
+        self.shifts6 = ()
+        self.size = 0
+        for item in allowed: self.add(item)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, address):
+        return self.match(address, default = False)
+
+    @classmethod
+    def parse(cls, address):
+        """
+        Parses the provided address string into a tuple containing
+        the number of bits of the address (32 or 128) and its integer
+        value, in case the address is invalid an invalid value is
+        returned instead.
+
+        :type address: String
+        :param address: The ipv4 or ipv6 address string to be parsed.
+        :rtype: Tuple
+        :return: The tuple with the bits and the integer value of the
+        address or an invalid value in case it's not valid.
+        """
+
+        try:
+            if ":" in address:
+                if address.startswith(MAPPED_PREFIX) and "." in address:
+                    address = address[len(MAPPED_PREFIX):]
+                else:
+                    data = socket.inet_pton(socket.AF_INET6, address)
+                    high, low = struct.unpack("!QQ", data)
+                    return 128, (high << 64) + low
+            if not address.count(".") == 3: return None
+            data = socket.inet_aton(address)
+            return 32, struct.unpack("!I", data)[0]
+        except (socket.error, ValueError, TypeError):
+            return None
+
+    def add(self, item):
+        """
+        Adds a new address or network (in the CIDR notation) to the
+        matcher, note that items that are not valid addresses are
+        kept as names and are matched by (string) equality.
+
+        :type item: String
+        :param item: The address or network to be added to the matcher.
+        """
+
+        # splits the item into the address and the length of the prefix
+        # and parses the address, in case it's not valid the item is kept
+        # as a name to be matched by equality (legacy behaviour)
+        address, _sep, length = item.partition("/")
+        result = self.parse(address)
+        if not result:
+            if length: raise netius.DataError("Invalid network '%s'" % item)
+            self.names.add(item)
+            self.size += 1
+            return
+
+        # verifies that the prefix length is valid for the kind of address
+        # defaulting to the complete address length (single address)
+        bits, value = result
+        length = int(length) if length else bits
+        if length < 0 or length > bits:
+            raise netius.DataError("Invalid prefix length '%s'" % item)
+
+        # adds the network value (address shifted by the host bits) to the
+        # set associated with the prefix length, in case it's a new prefix
+        # length the ordered sequence of shifts (largest prefixes first)
+        # used for the lookup is re-built
+        shift = bits - length
+        lengths = self.lengths4 if bits == 32 else self.lengths6
+        networks = lengths.get(shift, None)
+        if networks == None:
+            networks = set()
+            lengths[shift] = networks
+            shifts = tuple(sorted(lengths.items(), key = lambda item: item[0]))
+            if bits == 32: self.shifts4 = shifts
+            else: self.shifts6 = shifts
+        networks.add(value >> shift)
+        self.size += 1
+
+    def match(self, address, default = True):
+        """
+        Verifies if the provided address is contained in any of the
+        addresses or networks of the matcher, in case the matcher is
+        empty the default value is returned.
+
+        :type address: String
+        :param address: The ipv4 or ipv6 address to be verified.
+        :type default: bool
+        :param default: The value to be returned for an empty matcher.
+        :rtype: bool
+        :return: If the address is contained in the matcher.
+        """
+
+        if not self.size: return default
+        if self.names and address in self.names: return True
+        result = self.parse(address)
+        if not result: return False
+        bits, value = result
+        shifts = self.shifts4 if bits == 32 else self.shifts6
+        for shift, networks in shifts:
+            if value >> shift in networks: return True
+        return False
@@ -0,0 +1,799 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import binascii
+import collections
+
+import netius
+
+TABLE_SIZE = 4096
+""" The default maximum size (in bytes) of the dynamic table
+as defined by the specification, this is the value assumed
+until a different one is negotiated by the peers """
+
+LIST_SIZE = 16384
+""" The default maximum size (in bytes) of a decoded header list,
+computed as the sum of the size of every entry (including the
+overhead) and matching the header list size setting advertised """
+
+ENTRY_OVERHEAD = 32
+""" The overhead (in bytes) added to the size of the name and
+value of an entry when computing the size of the dynamic table """
+
+LITERAL_CACHE = 1024
+""" The maximum number of string literals that are kept in each
+of the (global) caches, avoiding the re-encoding and re-decoding
+of values repeated across connections (eg: the server header) """
+
+LITERAL_LIMIT = 256
+""" The maximum size (in bytes) of a value for it to be considered
+a candidate to be stored in the literal cache """
+
+NEVER_INDEXED = (b"authorization", b"proxy-authorization", b"set-cookie")
+""" The set of header names that are considered to be sensitive
+and that should never be added to the dynamic table, preventing
+compression based attacks and table pollution """
+
+STATIC_TABLE = (
+    (b":authority", b""),
+    (b":method", b"GET"),
+    (b":method", b"POST"),
+    (b":path", b"/"),
+    (b":path", b"/index.html"),
+    (b":scheme", b"http"),
+    (b":scheme", b"https"),
+    (b":status", b"200"),
+    (b":status", b"204"),
+    (b":status", b"206"),
+    (b":status", b"304"),
+    (b":status", b"400"),
+    (b":status", b"404"),
+    (b":status", b"500"),
+    (b"accept-charset", b""),
+    (b"accept-encoding", b"gzip, deflate"),
+    (b"accept-language", b""),
+    (b"accept-ranges", b""),
+    (b"accept", b""),
+    (b"access-control-allow-origin", b""),
+    (b"age", b""),
+    (b"allow", b""),
+    (b"authorization", b""),
+    (b"cache-control", b""),
+    (b"content-disposition", b""),
+    (b"content-encoding", b""),
+    (b"content-language", b""),
+    (b"content-length", b""),
+    (b"content-location", b""),
+    (b"content-range", b""),
+    (b"content-type", b""),
+    (b"cookie", b""),
+    (b"date", b""),
+    (b"etag", b""),
+    (b"expect", b""),
+    (b"expires", b""),
+    (b"from", b""),
+    (b"host", b""),
+    (b"if-match", b""),
+    (b"if-modified-since", b""),
+    (b"if-none-match", b""),
+    (b"if-range", b""),
+    (b"if-unmodified-since", b""),
+    (b"last-modified", b""),
+    (b"link", b""),
+    (b"location", b""),
+    (b"max-forwards", b""),
+    (b"proxy-authenticate", b""),
+    (b"proxy-authorization", b""),
+    (b"range", b""),
+    (b"referer", b""),
+    (b"refresh", b""),
+    (b"retry-after", b""),
+    (b"server", b""),
+    (b"set-cookie", b""),
+    (b"strict-transport-security", b""),
+    (b"transfer-encoding", b""),
+    (b"user-agent", b""),
+    (b"vary", b""),
+    (b"via", b""),
+    (b"www-authenticate", b"")
+)
+""" The static table as defined in the appendix A of the
+RFC 7541, the index of each entry (starting at one) is
+the one to be used on the indexed representations """
+
+STATIC_SIZE = len(STATIC_TABLE)
+""" The number of entries in the static table, the dynamic
+table indexes start immediately after this value """
+
+HUFFMAN_CODES = (
+    (0x1ff8, 13), (0x7fffd8, 23), (0xfffffe2, 28), (0xfffffe3, 28),
+    (0xfffffe4, 28), (0xfffffe5, 28), (0xfffffe6, 28), (0xfffffe7, 28),
+    (0xfffffe8, 28), (0xffffea, 24), (0x3ffffffc, 30), (0xfffffe9, 28),
+    (0xfffffea, 28), (0x3ffffffd, 30), (0xfffffeb, 28), (0xfffffec, 28),
+    (0xfffffed, 28), (0xfffffee, 28), (0xfffffef, 28), (0xffffff0, 28),
+    (0xffffff1, 28), (0xffffff2, 28), (0x3ffffffe, 30), (0xffffff3, 28),
+    (0xffffff4, 28), (0xffffff5, 28), (0xffffff6, 28), (0xffffff7, 28),
+    (0xffffff8, 28), (0xffffff9, 28), (0xffffffa, 28), (0xffffffb, 28),
+    (0x14, 6), (0x3f8, 10), (0x3f9, 10), (0xffa, 12),
+    (0x1ff9, 13), (0x15, 6), (0xf8, 8), (0x7fa, 11),
+    (0x3fa, 10), (0x3fb, 10), (0xf9, 8), (0x7fb, 11),
+    (0xfa, 8), (0x16, 6), (0x17, 6), (0x18, 6),
+    (0x0, 5), (0x1, 5), (0x2, 5), (0x19, 6),
+    (0x1a, 6), (0x1b, 6), (0x1c, 6), (0x1d, 6),
+    (0x1e, 6), (0x1f, 6), (0x5c, 7), (0xfb, 8),
+    (0x7ffc, 15), (0x20, 6), (0xffb, 12), (0x3fc, 10),
+    (0x1ffa, 13), (0x21, 6), (0x5d, 7), (0x5e, 7),
+    (0x5f, 7), (0x60, 7), (0x61, 7), (0x62, 7),
+    (0x63, 7), (0x64, 7), (0x65, 7), (0x66, 7),
+    (0x67, 7), (0x68, 7), (0x69, 7), (0x6a, 7),
+    (0x6b, 7), (0x6c, 7), (0x6d, 7), (0x6e, 7),
+    (0x6f, 7), (0x70, 7), (0x71, 7), (0x72, 7),
+    (0xfc, 8), (0x73, 7), (0xfd, 8), (0x1ffb, 13),
+    (0x7fff0, 19), (0x1ffc, 13), (0x3ffc, 14), (0x22, 6),
+    (0x7ffd, 15), (0x3, 5), (0x23, 6), (0x4, 5),
+    (0x24, 6), (0x5, 5), (0x25, 6), (0x26, 6),
+    (0x27, 6), (0x6, 5), (0x74, 7), (0x75, 7),
+    (0x28, 6), (0x29, 6), (0x2a, 6), (0x7, 5),
+    (0x2b, 6), (0x76, 7), (0x2c, 6), (0x8, 5),
+    (0x9, 5), (0x2d, 6), (0x77, 7), (0x78, 7),
+    (0x79, 7), (0x7a, 7), (0x7b, 7), (0x7ffe, 15),
+    (0x7fc, 11), (0x3ffd, 14), (0x1ffd, 13), (0xffffffc, 28),
+    (0xfffe6, 20), (0x3fffd2, 22), (0xfffe7, 20), (0xfffe8, 20),
+    (0x3fffd3, 22), (0x3fffd4, 22), (0x3fffd5, 22), (0x7fffd9, 23),
+    (0x3fffd6, 22), (0x7fffda, 23), (0x7fffdb, 23), (0x7fffdc, 23),
+    (0x7fffdd, 23), (0x7fffde, 23), (0xffffeb, 24), (0x7fffdf, 23),
+    (0xffffec, 24), (0xffffed, 24), (0x3fffd7, 22), (0x7fffe0, 23),
+    (0xffffee, 24), (0x7fffe1, 23), (0x7fffe2, 23), (0x7fffe3, 23),
+    (0x7fffe4, 23), (0x1fffdc, 21), (0x3fffd8, 22), (0x7fffe5, 23),
+    (0x3fffd9, 22), (0x7fffe6, 23), (0x7fffe7, 23), (0xffffef, 24),
+    (0x3fffda, 22), (0x1fffdd, 21), (0xfffe9, 20), (0x3fffdb, 22),
+    (0x3fffdc, 22), (0x7fffe8, 23), (0x7fffe9, 23), (0x1fffde, 21),
+    (0x7fffea, 23), (0x3fffdd, 22), (0x3fffde, 22), (0xfffff0, 24),
+    (0x1fffdf, 21), (0x3fffdf, 22), (0x7fffeb, 23), (0x7fffec, 23),
+    (0x1fffe0, 21), (0x1fffe1, 21), (0x3fffe0, 22), (0x1fffe2, 21),
+    (0x7fffed, 23), (0x3fffe1, 22), (0x7fffee, 23), (0x7fffef, 23),
+    (0xfffea, 20), (0x3fffe2, 22), (0x3fffe3, 22), (0x3fffe4, 22),
+    (0x7ffff0, 23), (0x3fffe5, 22), (0x3fffe6, 22), (0x7ffff1, 23),
+    (0x3ffffe0, 26), (0x3ffffe1, 26), (0xfffeb, 20), (0x7fff1, 19),
+    (0x3fffe7, 22), (0x7ffff2, 23), (0x3fffe8, 22), (0x1ffffec, 25),
+    (0x3ffffe2, 26), (0x3ffffe3, 26), (0x3ffffe4, 26), (0x7ffffde, 27),
+    (0x7ffffdf, 27), (0x3ffffe5, 26), (0xfffff1, 24), (0x1ffffed, 25),
+    (0x7fff2, 19), (0x1fffe3, 21), (0x3ffffe6, 26), (0x7ffffe0, 27),
+    (0x7ffffe1, 27), (0x3ffffe7, 26), (0x7ffffe2, 27), (0xfffff2, 24),
+    (0x1fffe4, 21), (0x1fffe5, 21), (0x3ffffe8, 26), (0x3ffffe9, 26),
+    (0xffffffd, 28), (0x7ffffe3, 27), (0x7ffffe4, 27), (0x7ffffe5, 27),
+    (0xfffec, 20), (0xfffff3, 24), (0xfffed, 20), (0x1fffe6, 21),
+    (0x3fffe9, 22), (0x1fffe7, 21), (0x1fffe8, 21), (0x7ffff3, 23),
+    (0x3fffea, 22), (0x3fffeb, 22), (0x1ffffee, 25), (0x1ffffef, 25),
+    (0xfffff4, 24), (0xfffff5, 24), (0x3ffffea, 26), (0x7ffff4, 23),
+    (0x3ffffeb, 26), (0x7ffffe6, 27), (0x3ffffec, 26), (0x3ffffed, 26),
+    (0x7ffffe7, 27), (0x7ffffe8, 27), (0x7ffffe9, 27), (0x7ffffea, 27),
+    (0x7ffffeb, 27), (0xffffffe, 28), (0x7ffffec, 27), (0x7ffffed, 27),
+    (0x7ffffee, 27), (0x7ffffef, 27), (0x7fffff0, 27), (0x3ffffee, 26),
+    (0x3fffffff, 30)
+)
+""" The sequence of code and bit length tuples for each of
+the 256 byte symbols plus the end of string (EOS) symbol, as
+defined in the appendix B of the RFC 7541 """
+
+HUFFMAN_FAIL = -2
+""" The symbol value used in the decoding table to signal that
+the end of string symbol has been found (invalid sequence) """
+
+def encode_integer(value, prefix, flags = 0x00):
+    """
+    Encodes the provided integer value according to the prefixed
+    integer representation defined in section 5.1 of RFC 7541.
+
+    :type value: int
+    :param value: The integer value that is going to be encoded.
+    :type prefix: int
+    :param prefix: The number of bits (of the first byte) that are
+    available for the value, the remaining are used by the flags.
+    :type flags: int
+    :param flags: The flag bits to be set in the first byte.
+    :rtype: String
+    :return: The byte buffer containing the encoded integer.
+    """
+
+    mask = (1 << prefix) - 1
+    if value < mask: return netius.legacy.chr(flags | value)
+    result = bytearray((flags | mask,))
+    value -= mask
+    while value >= 0x80:
+        result.append((value & 0x7f) | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+def decode_integer(data, index, prefix):
+    """
+    Decodes a prefixed integer from the provided byte array starting
+    at the provided index (first byte of the representation).
+
+    :type data: bytearray
+    :param data: The byte array containing the encoded integer.
+    :type index: int
+    :param index: The offset of the first byte of the integer.
+    :type prefix: int
+    :param prefix: The number of bits of the first byte that are
+    used by the integer value.
+    :rtype: Tuple
+    :return: Tuple containing the decoded value and the index of the
+    byte immediately after the representation.
+    """
+
+    if index >= len(data): raise netius.ParserError("Truncated integer")
+    mask = (1 << prefix) - 1
+    value = data[index] & mask
+    index += 1
+    if value < mask: return value, index
+    shift = 0
+    while True:
+        if index >= len(data): raise netius.ParserError("Truncated integer")
+        if shift > 28: raise netius.ParserError("Integer overflow")
+        byte = data[index]
+        index += 1
+        value += (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80: break
+    return value, index
+
+def huffman_encode(data):
+    """
+    Encodes the provided byte string using the canonical huffman
+    code of the HPACK specification, padding the last byte with
+    the most significant bits of the end of string symbol.
+
+    :type data: String
+    :param data: The byte string to be encoded.
+    :rtype: String
+    :return: The huffman encoded version of the byte string.
+    """
+
+    # accumulates the codes of the complete set of bytes in a single
+    # (long) integer value, this is faster than handling the bits of
+    # each byte as the shift operations run in native code
+    value = 0
+    bits = 0
+    for byte in bytearray(data):
+        code, length = HUFFMAN_CODES[byte]
+        value = (value << length) | code
+        bits += length
+
+    # pads the final byte with ones (prefix of the end of string
+    # symbol) and converts the integer into its byte representation
+    padding = -bits % 8
+    value = (value << padding) | ((1 << padding) - 1)
+    size = (bits + padding) // 8
+    if not size: return b""
+    return binascii.unhexlify("%0*x" % (size * 2, value))
+
+def huffman_size(data):
+    """
+    Computes the number of bytes that the provided byte string
+    is going to use once huffman encoded.
+
+    :type data: String
+    :param data: The byte string to compute the encoded size.
+    :rtype: int
+    :return: The number of bytes of the huffman encoded value.
+    """
+
+    bits = sum(HUFFMAN_SIZES[byte] for byte in bytearray(data))
+    return (bits + 7) // 8
+
+def huffman_decode(data):
+    """
+    Decodes the provided huffman encoded byte string using the
+    (precomputed) state machine that consumes four bits at a time.
+
+    Any padding longer than seven bits, not matching the prefix of
+    the end of string symbol or any use of the end of string symbol
+    itself is considered to be an error.
+
+    :type data: String
+    :param data: The huffman encoded byte string.
+    :rtype: String
+    :return: The decoded byte string.
+    """
+
+    state = 0
+    table = HUFFMAN_DECODE
+    result = bytearray()
+    append = result.append
+    for byte in bytearray(data):
+        state, symbol = table[(state << 4) | (byte >> 4)]
+        if symbol >= 0: append(symbol)
+        elif symbol == HUFFMAN_FAIL: raise netius.ParserError("Invalid huffman sequence")
+        state, symbol = table[(state << 4) | (byte & 0x0f)]
+        if symbol >= 0: append(symbol)
+        elif symbol == HUFFMAN_FAIL: raise netius.ParserError("Invalid huffman sequence")
+    if not state in HUFFMAN_ACCEPT: raise netius.ParserError("Invalid huffman padding")
+    return bytes(result)
+
+def encode_string(data, huffman = True):
+    """
+    Encodes the provided byte string as a string literal, using the
+    huffman code whenever it results in a smaller representation.
+
+    The result for small values is stored in a global cache so that
+    repeated values (very common for response headers) are encoded
+    only once during the life-cycle of the process.
+
+    :type data: String
+    :param data: The byte string to be encoded as a literal.
+    :type huffman: bool
+    :param huffman: If the huffman code should be considered for
+    the encoding of the literal.
+    :rtype: String
+    :return: The string literal representation (length and value).
+    """
+
+    cacheable = huffman and len(data) <= LITERAL_LIMIT
+    if cacheable:
+        result = _literals.get(data, None)
+        if result: return result
+    size = huffman_size(data) if huffman else len(data)
+    if size < len(data):
+        result = encode_integer(size, 7, flags = 0x80) + huffman_encode(data)
+    else:
+        result = encode_integer(len(data), 7) + data
+    if not cacheable: return result
+    if len(_literals) >= LITERAL_CACHE: _literals.clear()
+    _literals[data] = result
+    return result
+
+def decode_string(data, index):
+    """
+    Decodes the string literal starting at the provided index of
+    the byte array, handling both raw and huffman encoded values.
+
+    :type data: bytearray
+    :param data: The byte array containing the literal.
+    :type index: int
+    :param index: The offset of the first byte of the literal.
+    :rtype: Tuple
+    :return: Tuple with the decoded byte string and the index of the
+    byte immediately after the literal.
+    """
+
+    if index >= len(data): raise netius.ParserError("Truncated string literal")
+    huffman = data[index] & 0x80
+    length, index = decode_integer(data, index, 7)
+    end = index + length
+    if end > len(data): raise netius.ParserError("Truncated string literal")
+    value = bytes(data[index:end])
+    if not huffman: return value, end
+
+    # huffman encoded values that are small enough are cached so that
+    # values repeated across connections (eg: user agent) are decoded
+    # only once, avoiding the (expensive) bit level operations
+    cacheable = length <= LITERAL_LIMIT
+    decoded = _decoded.get(value, None) if cacheable else None
+    if decoded: return decoded, end
+    decoded = huffman_decode(value)
+    if not cacheable: return decoded, end
+    if len(_decoded) >= LITERAL_CACHE: _decoded.clear()
+    _decoded[value] = decoded
+    return decoded, end
+
+class HPACKTable(object):
+    """
+    Dynamic table of header fields (FIFO) as defined in section 2.3.2
+    of the RFC 7541, the newest entry has the lowest index.
+
+    When used by the encoder the table also maintains maps with the
+    insertion identifier of each field and name, so that lookups run
+    in constant time (no table scans on the encoding hot path).
+    """
+
+    def __init__(self, max_size = TABLE_SIZE, lookup = False):
+        self.max_size = max_size
+        self.lookup = lookup
+        self.size = 0
+        self.inserted = 0
+        self.entries = collections.deque()
+        self.fields = dict()
+        self.names = dict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, index):
+        """
+        Retrieves the (name, value) byte string tuple for the provided
+        index of the address space composed by the static and dynamic
+        tables, raising a parser error for invalid indexes.
+
+        :type index: int
+        :param index: The (one based) index of the entry to retrieve.
+        :rtype: Tuple
+        :return: The name and value tuple for the entry.
+        """
+
+        if index == 0: raise netius.ParserError("Invalid zero index")
+        if index <= STATIC_SIZE: return STATIC_TABLE[index - 1]
+        offset = index - STATIC_SIZE - 1
+        if offset >= len(self.entries): raise netius.ParserError("Invalid table index")
+        return self.entries[offset]
+
+    def find(self, name, value):
+        """
+        Searches the dynamic table for the provided field, returning
+        the index of the exact field if found or the index of an entry
+        with the same name otherwise (zero if none is found).
+
+        :type name: String
+        :param name: The name of the header to be searched.
+        :type value: String
+        :param value: The value of the header to be searched.
+        :rtype: Tuple
+        :return: Tuple with the index and a flag indicating if the
+        match is exact (both name and value).
+        """
+
+        identifier = self.fields.get((name, value), None)
+        if identifier: return self.index(identifier), True
+        identifier = self.names.get(name, None)
+        if identifier: return self.index(identifier), False
+        return 0, False
+
+    def index(self, identifier):
+        return STATIC_SIZE + self.inserted - identifier + 1
+
+    def add(self, name, value):
+        size = len(name) + len(value) + ENTRY_OVERHEAD
+        if size > self.max_size: self.clear(); return
+        self.inserted += 1
+        self.size += size
+        self.entries.appendleft((name, value))
+        if self.lookup:
+            self.fields[(name, value)] = self.inserted
+            self.names[name] = self.inserted
+        self.evict()
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_size:
+            name, value = self.entries.pop()
+            self.size -= len(name) + len(value) + ENTRY_OVERHEAD
+            if not self.lookup: continue
+            identifier = self.inserted - len(self.entries)
+            if self.fields.get((name, value), None) == identifier:
+                del self.fields[(name, value)]
+            if self.names.get(name, None) == identifier:
+                del self.names[name]
+
+    def clear(self):
+        self.size = 0
+        self.entries.clear()
+        self.fields.clear()
+        self.names.clear()
+
+class HPACKEncoder(object):
+    """
+    HPACK encoder that keeps the state (dynamic table) for a single
+    connection, it should be re-used for every header block sent
+    through that connection.
+
+    Headers that exactly match a static table entry use precomputed
+    (single byte) representations and values that repeat across
+    connections re-use their cached string literal encoding.
+    """
+
+    def __init__(self, max_size = TABLE_SIZE, huffman = True):
+        self.huffman = huffman
+        self.table = HPACKTable(max_size = max_size, lookup = True)
+        self._resizes = []
+
+    def encode(self, headers):
+        """
+        Encodes the provided sequence of (name, value) tuples into a
+        header block, updating the dynamic table accordingly.
+
+        Both names and values may be provided as either byte or unicode
+        strings (encoded as UTF-8), integer values are also accepted.
+
+        :type headers: List
+        :param headers: The sequence of name and value tuples that are
+        going to be encoded in the header block.
+        :rtype: String
+        :return: The resulting header block (to be sent in headers and
+        continuation frames).
+        """
+
+        buffer = []
+        if self._resizes: self._flush_resizes(buffer)
+
+        for header in headers:
+            # tries to find the header in the map of precomputed static
+            # representations, this is the fastest path (no conversion)
+            encoded = STATIC_ENCODED.get(header, None)
+            if encoded:
+                buffer.append(encoded)
+                continue
+
+            name, value = header
+            name = _bytes(name)
+            value = _bytes(value)
+            encoded = STATIC_ENCODED.get((name, value), None)
+            if encoded:
+                buffer.append(encoded)
+                continue
+
+            # searches the dynamic table for the header, an exact match
+            # is represented by the index (most repeated headers)
+            index, exact = self.table.find(name, value)
+            if exact:
+                buffer.append(encode_integer(index, 7, flags = 0x80))
+                continue
+
+            # determines the (best) index to be used for the name, and
+            # the type of literal representation that is going to be used
+            # (sensitive or very large values are not indexed)
+            index = STATIC_NAMES.get(name, index)
+            size = len(name) + len(value) + ENTRY_OVERHEAD
+            if name in NEVER_INDEXED: prefix, flags, indexed = 4, 0x10, False
+            elif size > self.table.max_size // 2: prefix, flags, indexed = 4, 0x00, False
+            else: prefix, flags, indexed = 6, 0x40, True
+
+            buffer.append(encode_integer(index, prefix, flags = flags))
+            if not index: buffer.append(encode_string(name, huffman = self.huffman))
+            buffer.append(encode_string(value, huffman = self.huffman))
+            if indexed: self.table.add(name, value)
+
+        return b"".join(buffer)
+
+    def resize(self, max_size):
+        """
+        Changes the maximum size of the dynamic table, the change is
+        signaled to the peer at the start of the next header block.
+
+        This method should be called when a new value for the header
+        table size setting is received from the peer.
+
+        :type max_size: int
+        :param max_size: The new maximum size of the dynamic table.
+        """
+
+        if max_size == self.table.max_size and not self._resizes: return
+        self._resizes.append(max_size)
+
+    def _flush_resizes(self, buffer):
+        # in case there were multiple changes only the smallest one and
+        # the final one need to be signaled (as defined in section 4.2)
+        minimum = min(self._resizes)
+        final = self._resizes[-1]
+        self._resizes = []
+        if minimum < final:
+            buffer.append(encode_integer(minimum, 5, flags = 0x20))
+            self.table.resize(minimum)
+        buffer.append(encode_integer(final, 5, flags = 0x20))
+        self.table.resize(final)
+
+class HPACKDecoder(object):
+    """
+    HPACK decoder that keeps the state (dynamic table) for a single
+    connection, it should be used to decode every header block that
+    is received from the peer (in order).
+    """
+
+    def __init__(self, max_size = TABLE_SIZE, max_list = LIST_SIZE):
+        self.max_size = max_size
+        self.max_list = max_list
+        self.table = HPACKTable(max_size = max_size)
+
+    def decode(self, data, raw = False):
+        """
+        Decodes the provided header block into a list of (name, value)
+        tuples, updating the dynamic table accordingly.
+
+        The names and values are converted into native strings (using
+        the same encoding as the HTTP 1.1 parser) unless the raw flag
+        is set, in which case byte strings are returned.
+
+        The size of the decoded header list is accounted as the block
+        is being decoded and an error is raised as soon as it exceeds
+        the maximum one, as a small block may expand into a very large
+        list by referencing the same (large) entry of the table.
+
+        :type data: String
+        :param data: The complete header block to be decoded.
+        :type raw: bool
+        :param raw: If the byte strings should be returned instead of
+        the native (converted) ones.
+        :rtype: List
+        :return: The list of header tuples in the order of the block.
+        """
+
+        headers = []
+        data = bytearray(data)
+        data_l = len(data)
+        index = 0
+        size = 0
+
+        while index < data_l:
+            byte = data[index]
+
+            # indexed header field representation, both the name and the
+            # value come from one of the tables (most common case)
+            if byte & 0x80:
+                position, index = decode_integer(data, index, 7)
+                name, value = self.table.get(position)
+                size += len(name) + len(value) + ENTRY_OVERHEAD
+                if self.max_list and size > self.max_list:
+                    raise netius.ParserError("Header list too large")
+                headers.append((name, value))
+                continue
+
+            # dynamic table size update, that must happen before any
+            # header field and must not exceed the advertised size
+            if byte & 0xe0 == 0x20:
+                if headers: raise netius.ParserError("Unexpected table size update")
+                max_size, index = decode_integer(data, index, 5)
+                if max_size > self.max_size: raise netius.ParserError("Invalid table size update")
+                self.table.resize(max_size)
+                continue
+
+            # literal header field representation (with or without
+            # indexing), the name may come from one of the tables
+            indexed = byte & 0x40
+            prefix = 6 if indexed else 4
+            position, index = decode_integer(data, index, prefix)
+            if position: name = self.table.get(position)[0]
+            else: name, index = decode_string(data, index)
+            value, index = decode_string(data, index)
+            size += len(name) + len(value) + ENTRY_OVERHEAD
+            if self.max_list and size > self.max_list:
+                raise netius.ParserError("Header list too large")
+            headers.append((name, value))
+            if indexed: self.table.add(name, value)
+
+        if raw: return headers
+        return [(netius.legacy.str(name), netius.legacy.str(value)) for name, value in headers]
+
+    def resize(self, max_size):
+        """
+        Changes the maximum size of the dynamic table that is allowed
+        for the peer, this value should match the header table size
+        setting that has been advertised to the peer.
+
+        :type max_size: int
+        :param max_size: The new maximum size of the dynamic table.
+        """
+
+        self.max_size = max_size
+        if self.table.max_size > max_size: self.table.resize(max_size)
+
+def _bytes(value):
+    if netius.legacy.is_bytes(value): return value
+    if not netius.legacy.is_string(value, all = True): value = str(value)
+    return netius.legacy.bytes(value, encoding = "utf-8", force = True)
+
+def _build_encoded():
+    # builds the map with the precomputed (indexed) representation of
+    # the static table entries, keyed by both the byte and the native
+    # string versions of the header, so that no conversion is required
+    encoded = dict()
+    for index, (name, value) in enumerate(STATIC_TABLE):
+        if not value: continue
+        representation = encode_integer(index + 1, 7, flags = 0x80)
+        native = (netius.legacy.str(name), netius.legacy.str(value))
+        encoded[(name, value)] = representation
+        encoded[native] = representation
+    return encoded
+
+def _build_names():
+    names = dict()
+    for index, (name, _value) in enumerate(STATIC_TABLE):
+        names.setdefault(name, index + 1)
+    return names
+
+def _build_decode():
+    # builds the binary tree of the huffman code, where the internal
+    # nodes are lists of children and the leaves are represented by
+    # the negative value of the symbol (minus one)
+    nodes = [[0, 0]]
+    for symbol, (code, length) in enumerate(HUFFMAN_CODES):
+        node = nodes[0]
+        for shift in range(length - 1, -1, -1):
+            bit = (code >> shift) & 0x01
+            if shift == 0:
+                node[bit] = -1 - symbol
+                break
+            if not node[bit]:
+                node[bit] = len(nodes)
+                nodes.append([0, 0])
+            node = nodes[node[bit]]
+
+    # converts the tree into a state machine that consumes four bits
+    # at a time, where each state is an internal node of the tree and
+    # the transition yields the next state and the emitted symbol
+    table = []
+    for state in range(len(nodes)):
+        for nibble in range(16):
+            current = state
+            symbol = -1
+            for shift in (3, 2, 1, 0):
+                child = nodes[current][(nibble >> shift) & 0x01]
+                if child > 0:
+                    current = child
+                    continue
+                symbol = -1 - child
+                if symbol == 256: symbol = HUFFMAN_FAIL; break
+                current = 0
+            table.append((current, symbol))
+
+    # the accepting states are the ones reached from the root using
+    # at most seven one bits (valid padding at the end of the string)
+    accept = set((0,))
+    current = 0
+    for _index in range(7):
+        current = nodes[current][1]
+        accept.add(current)
+
+    return table, accept
+
+STATIC_ENCODED = _build_encoded()
+""" Map associating the header tuples that exist in the static
+table with their precomputed indexed representation """
+
+STATIC_NAMES = _build_names()
+""" Map associating each header name in the static table with
+the (lowest) index of an entry with such name """
+
+HUFFMAN_SIZES = [length for _code, length in HUFFMAN_CODES]
+""" The sequence of bit lengths of the huffman code for each
+of the byte symbols, used for fast size computation """
+
+HUFFMAN_DECODE, HUFFMAN_ACCEPT = _build_decode()
+""" The huffman decoding state machine table indexed by the
+state and the four bit input, and the set of accepting states """
+
+_literals = dict()
+""" The global cache of encoded string literals, indexed by
+the byte string value of the literal """
+
+_decoded = dict()
+""" The global cache of decoded huffman strings, indexed by
+the huffman encoded byte string """
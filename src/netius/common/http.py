@@ -44,6 +44,9 @@ import netius
 from . import util
 from . import parser
 
+try: import httptools
+except: httptools = None
+
 FILE_LIMIT = 5242880
 """ The limit value (in bytes) from which the back-end
 message storage mechanism will start using a file system
@@ -124,6 +127,7 @@ corresponding enumeration based values for each of them """
 CODE_STRINGS = {
     100 : "Continue",
     101 : "Switching Protocols",
+    103 : "Early Hints",
     200 : "OK",
     201 : "Created",
     202 : "Accepted",
@@ -167,7 +171,7 @@ CODE_STRINGS = {
 """ Dictionary associating the error code as integers
 with the official descriptive message for it """
 
-class HTTPParser(parser.Parser):
+class PyHTTPParser(parser.Parser):
     """
     Parser object for the http format, should be able to
     parse both request and response messages.
@@ -175,6 +179,10 @@ class HTTPParser(parser.Parser):
     The parser itself should be event driven an callback
     functions should be called upon partials information
     parsing. But the object itself is not thread safe.
+
+    This is the pure python implementation of the parser
+    and the one that is used as fallback in case no native
+    (compiled) implementation is available.
     """
 
     FIELDS = (
@@ -223,6 +231,17 @@ class HTTPParser(parser.Parser):
         self.build()
         self.reset(type = type, store = store, file_limit = file_limit)
 
+    @classmethod
+    def name(cls):
+        name = cls.__name__
+        name = name[:-10]
+        name = name.lower()
+        return name
+
+    @classmethod
+    def test(cls):
+        return True
+
     def build(self):
         """
         Builds the initial set of states ordered according to
@@ -281,7 +300,7 @@ class HTTPParser(parser.Parser):
         self.store = store
         self.file_limit = file_limit
         self.state = LINE_STATE
-        self.buffer = []
+        self.buffer = bytearray()
         self.headers = {}
         self.message = []
         self.method = None
@@ -481,13 +500,15 @@ class HTTPParser(parser.Parser):
         if self.state == FINISH_STATE: self.clear()
 
         # retrieves the size of the data that has been sent for parsing
-        # and saves it under the size original variable
+        # and starts the offset (parsed position) in the data at zero,
+        # note that the data is never sliced by this loop (avoids copies)
+        # as the offset is passed to the various parsing methods
         size = len(data)
-        size_o = size
+        offset = 0
 
         # iterates continuously to try to process all that
         # data that has been sent for processing
-        while size > 0:
+        while offset < size:
 
             # iterates while the current state is valid for
             # parsing as there are only parsing methods for
@@ -499,14 +520,13 @@ class HTTPParser(parser.Parser):
                 # of valid parsed bytes in case this value is
                 # zero the parsing iteration is broken
                 method = self.states[self.state - 1]
-                count = method(data)
+                count = method(data, offset)
                 if count == 0: break
 
-                # decrements the size of the data buffer by the
-                # size of the parsed bytes and then retrieves the
-                # sub part of the data buffer as the new data buffer
-                size -= count
-                data = data[count:]
+                # increments the offset of the data buffer by the
+                # size of the parsed bytes, so that the next state
+                # starts parsing from the new (offset) position
+                offset += count
 
                 # continues the loop as there should be still some
                 # data remaining to be parsed in the current buffer
@@ -526,26 +546,25 @@ class HTTPParser(parser.Parser):
 
         # in case not all of the data has been processed
         # must add it to the buffer so that it may be used
-        # latter in the next parsing of the message
-        if size > 0: self.buffer.append(data)
+        # latter in the next parsing of the message, note that
+        # a memoryview is used to avoid an extra copy of the data
+        if offset < size: self.buffer += memoryview(data)[offset:]
 
         # returns the number of read (processed) bytes of the
         # data that has been sent to the parser
-        return size_o - size
+        return offset
 
-    def _parse_line(self, data):
-        index = data.find(b"\n")
+    def _parse_line(self, data, offset):
+        index = data.find(b"\n", offset)
         if index == -1: return 0
 
-        self.buffer.append(data[:index])
-        self.line_s = b"".join(self.buffer)[:-1]
+        self.line_s = self._join(data, offset, index)[:-1]
         self.line_s = netius.legacy.str(self.line_s)
-        del self.buffer[:]
 
         # restores the final end of line sequence to the buffer, this
         # allows "simple requests" to be parsed properly in under the
         # next section of parsing headers (required for compliance)
-        self.buffer.append(b"\r\n")
+        self.buffer += b"\r\n"
 
         values = self.line_s.split(" ", 2)
         if not len(values) == 3:
@@ -569,35 +588,37 @@ class HTTPParser(parser.Parser):
         # about the end of the parsing of the status line and then
         # returns the count of the parsed bytes of the message
         self.trigger("on_line")
-        return index + 1
-
-    def _parse_headers(self, data):
-        # creates a temporary buffer with the contents of
-        # the current buffer plus the current data and then
-        # joins it to retrieve the current complete buffer
-        # string to be used in the finding of the end of
-        # header sequence (required for complete parsing)
-        buffer_t = self.buffer + [data]
-        buffer_s = b"".join(buffer_t)
-
-        # tries to find the end of headers sequence in case
-        # it's not found returns the zero value meaning that
-        # the no bytes have been processed (delays parsing)
-        index = buffer_s.find(b"\r\n\r\n")
-        if index == -1: return 0
-
-        # retrieves the partial headers string from the buffer
-        # string and then deletes the current buffer so that
-        # it may be reused for other partial parsings
-        self.headers_s = buffer_s[:index]
-        del self.buffer[:]
+        return index + 1 - offset
+
+    def _parse_headers(self, data, offset):
+        # retrieves the length of the partial headers buffer and in
+        # case it's not empty verifies if the end of headers sequence
+        # is split between the buffer and the data, only the last
+        # bytes of the buffer are used so that no join of the complete
+        # buffer is performed (avoids quadratic parsing times)
+        buffer_l = len(self.buffer)
+        index = None
+        if buffer_l:
+            tail_l = min(buffer_l, 3)
+            joint = bytes(self.buffer[-tail_l:]) + data[offset:offset + 3]
+            position = joint.find(b"\r\n\r\n")
+            if not position == -1: index = offset - tail_l + position
+
+        # tries to find the end of headers sequence in the data (starting
+        # at the current offset) in case it's not found returns the zero
+        # value meaning that no bytes have been processed (delays parsing)
+        if index == None:
+            index = data.find(b"\r\n\r\n", offset)
+            if index == -1: return 0
 
-        # calculates the base length as the difference between
-        # the buffer string and the length of the currently
-        # provided data value and then uses this value to calculate
-        # the base index for the process data count value
-        base_length = len(buffer_s) - len(data)
-        base_index = index - base_length
+        # retrieves the partial headers string from the buffer and
+        # the data, note that the end of headers sequence may start
+        # in the buffer and in that case only the buffer is used
+        if index < offset:
+            self.headers_s = bytes(self.buffer[:buffer_l + index - offset])
+            del self.buffer[:]
+        else:
+            self.headers_s = self._join(data, offset, index)
 
         # splits the complete set of lines that compromise
         # the headers and then iterates over each of them
@@ -616,30 +637,42 @@ class HTTPParser(parser.Parser):
             if not len(values) == 2:
                 raise netius.ParserError("Invalid header line")
 
-            # unpacks the values an normalizes them, lowering the
-            # case of the key and stripping the values of any extra
-            # whitespace like value that may exist in them
+            # unpacks the values and adds them to the current
+            # map of headers (normalizing them in the process)
             key, value = values
-            key = key.strip().lower()
-            key = netius.legacy.str(key)
-            value = value.strip()
-            value = netius.legacy.str(value)
-            exists = key in self.headers
-
-            # in case the header already exists this indicates that
-            # there are multiple definitions of the header and a sequence
-            # must be used in order to store the various headers
-            if exists:
-                sequence = self.headers[key]
-                is_list = type(sequence) == list
-                if not is_list: sequence = [sequence]
-                sequence.append(value)
-                value = sequence
-
-            # sets the final header value into the headers map so that
-            # it may be used latter for the serialization process
-            self.headers[key] = value
+            self._add_header(key, value)
 
+        # runs the final processing of the headers, that updates the
+        # state of the parser and notifies the listeners, returning
+        # the parsed amount of information (bytes) to the caller
+        self._end_headers()
+        return index + 4 - offset
+
+    def _add_header(self, key, value):
+        # normalizes the values, lowering the case of the key
+        # and stripping the values of any extra whitespace
+        # like value that may exist in them
+        key = key.strip().lower()
+        key = netius.legacy.str(key)
+        value = value.strip()
+        value = netius.legacy.str(value)
+        exists = key in self.headers
+
+        # in case the header already exists this indicates that
+        # there are multiple definitions of the header and a sequence
+        # must be used in order to store the various headers
+        if exists:
+            sequence = self.headers[key]
+            is_list = type(sequence) == list
+            if not is_list: sequence = [sequence]
+            sequence.append(value)
+            value = sequence
+
+        # sets the final header value into the headers map so that
+        # it may be used latter for the serialization process
+        self.headers[key] = value
+
+    def _end_headers(self):
         # retrieves the size of the contents from the populated
         # headers, this is not required by the specification and
         # the parser should be usable even without it
@@ -692,22 +725,33 @@ class HTTPParser(parser.Parser):
         else: self.state = MESSAGE_STATE
 
         # triggers the on headers event so that the listener object
-        # is notified about the parsing of the headers and than returns
-        # the parsed amount of information (bytes) to the caller
+        # is notified about the parsing of the headers (and data in
+        # case the message has no payload and is considered finished)
         self.trigger("on_headers")
         if has_finished: self.trigger("on_data")
-        return base_index + 4
 
-    def _parse_message(self, data):
-        if self.chunked: return self._parse_chunked(data)
-        else: return self._parse_normal(data)
-
-    def _parse_normal(self, data):
-        # retrieves the size of the data that has just been
-        # received and then in case the store flag is set
-        # stores the data in the proper buffer and increments
+    def _parse_message(self, data, offset):
+        if self.chunked: return self._parse_chunked(data, offset)
+        else: return self._parse_normal(data, offset)
+
+    def _parse_normal(self, data, offset):
+        # retrieves the size of the data that is pending to be parsed
+        # limiting it to the remaining length of the message (in case
+        # it's defined) so that pipelined data is not consumed
+        data_l = len(data) - offset
+        if not self.content_l == -1:
+            data_l = min(data_l, self.content_l - self.message_l)
+
+        # retrieves the (partial) data of the message, avoiding any copy
+        # as a memory view is used in case only part of the data belongs
+        # to the message (eg: headers in the same chunk), note that under
+        # python 2 the view is not used as most of the (standard) consumers
+        # of the data do not support memory views, then in case the store
+        # flag is set stores the data in the proper buffer and increments
         # the message length counter with the size of the data
-        data_l = len(data)
+        if not offset == 0 or not data_l == len(data):
+            data = memoryview(data)[offset:offset + data_l]
+            if not netius.legacy.PYTHON_3: data = data.tobytes()
         if self.store: self._store_data(data)
         self.message_l += data_l
 
@@ -734,7 +778,7 @@ class HTTPParser(parser.Parser):
         # of processed bytes by the current method
         return data_l
 
-    def _parse_chunked(self, data):
+    def _parse_chunked(self, data, offset):
         # starts the parsed byte counter with the initial zero
         # value this will be increment as bytes are parsed
         count = 0
@@ -747,7 +791,7 @@ class HTTPParser(parser.Parser):
             # calculates the size of the data that is going
             # to be parsed as that's required to check if
             # the end chunk state has been reached
-            data_l = len(data)
+            data_l = len(data) - offset
 
             # in case the required amount of data has not
             # been received returns the parsed bytes amount
@@ -795,19 +839,13 @@ class HTTPParser(parser.Parser):
         if is_start:
             # tries to find the separator of the initial value for
             # the chunk in case it's not found returns immediately
-            index = data.find(b"\n")
+            index = data.find(b"\n", offset)
             if index == -1: return 0
 
-            # some of the current data to the buffer and then re-joins
-            # it as the header value, then removes the complete set of
-            # contents from the buffer so that it may be re-used
-            self.buffer.append(data[:index])
-            header = b"".join(self.buffer)[:-1]
-            del self.buffer[:]
-
-            # sets the new data buffer as the partial buffer of the data
-            # except the extra newline character (not required)
-            data = data[index + 1:]
+            # joins the contents of the buffer with the current data as
+            # the header value, the buffer is emptied in the process so
+            # that it may be re-used (for the next partial parsing)
+            header = self._join(data, offset, index)[:-1]
 
             # splits the header value so that additional chunk information
             # is removed and then parsed the value as the original chunk
@@ -820,13 +858,15 @@ class HTTPParser(parser.Parser):
 
             # increments the counter of the parsed number of bytes from the
             # provided data by the index of the newline character position
-            # plus one byte respecting to the newline character
-            count += index + 1
+            # plus one byte respecting to the newline character and moves
+            # the offset to the start of the chunk contents
+            count += index + 1 - offset
+            offset = index + 1
 
         # retrieves the partial data that is valid according to the
         # calculated chunk length and then calculates the size of
         # "that" partial data string value
-        data = data[:self.chunk_l - 2]
+        data = data[offset:offset + self.chunk_l - 2]
         data_s = len(data)
 
         # adds the partial data to the message list and runs the store operation
@@ -848,6 +888,32 @@ class HTTPParser(parser.Parser):
         count += data_s
         return count
 
+    def _join(self, data, start, end):
+        """
+        Retrieves the bytes value that results from the concatenation
+        of the partial buffer with the provided range of the data,
+        emptying the buffer as part of the operation.
+
+        This is the only place where the buffered (partial) data is
+        joined and it's only used for complete values (eg: lines).
+
+        :type data: String
+        :param data: The data buffer that contains the final part
+        of the value that is going to be retrieved.
+        :type start: int
+        :param start: The start index of the value in the data.
+        :type end: int
+        :param end: The end index (exclusive) of the value in the data.
+        :rtype: String
+        :return: The complete value as a bytes sequence.
+        """
+
+        if not self.buffer: return data[start:end]
+        self.buffer += memoryview(data)[start:end]
+        value = bytes(self.buffer)
+        del self.buffer[:]
+        return value
+
     def _parse_query(self, query):
         # runs the "default" parsing of the query string from the system
         # and then decodes the complete set of parameters properly
@@ -874,6 +940,205 @@ class HTTPParser(parser.Parser):
 
         return _params
 
+class NativeHTTPParser(PyHTTPParser):
+    """
+    Native (compiled) version of the http parser that uses the
+    httptools library (binding to the http-parser C library)
+    for the parsing of the message, the events and attributes
+    of this parser are the same as the pure python one.
+
+    The heavy lifting (tokenization of the status line and of
+    the headers and the chunked decoding) is performed by the
+    native code, only the final normalization of the values is
+    performed in python (shared with the pure implementation).
+    """
+
+    @classmethod
+    def test(cls):
+        return not httptools == None
+
+    def build(self):
+        PyHTTPParser.build(self)
+
+        self.native = None
+        self.parsing = False
+        self.upgraded = False
+
+    def destroy(self):
+        PyHTTPParser.destroy(self)
+
+        self.native = None
+        self.upgraded = False
+
+    def reset(self, type = REQUEST, store = False, file_limit = FILE_LIMIT):
+        PyHTTPParser.reset(
+            self,
+            type = type,
+            store = store,
+            file_limit = file_limit
+        )
+
+        # in case the reset is not being performed as part of a parse
+        # operation (eg: new message in pipelining) the native parser
+        # is unset so that a new one is created for the next parse
+        if self.parsing: return
+        self.native = None
+        self.upgraded = False
+
+    def parse(self, data):
+        parser.Parser.parse(self, data)
+
+        # in case the connection has already been upgraded (eg: websocket
+        # or connect tunnel) the data is no longer http and so nothing is
+        # parsed, it's up to the owner to handle the data from now on
+        if self.upgraded: return 0
+
+        # in case the current state of the parser is finished, must
+        # reset the state to the start position as the parser is
+        # re-starting (probably a new data sequence)
+        if self.state == FINISH_STATE: self.clear()
+
+        # retrieves the size of the data and starts the offset of the
+        # parsing operation that is going to be used to control the
+        # parsing loop (required for upgrade operations)
+        size = len(data)
+        offset = 0
+
+        # iterates continuously feeding the data to the native parser,
+        # note that in case an upgrade is detected the native parser stops
+        # at the end of the upgrade message and so does the parsing, the
+        # remaining data belongs to the upgraded protocol (not http)
+        while offset < size:
+            native = self._native()
+            self.parsing = True
+            try:
+                native.feed_data(data[offset:] if offset else data)
+                offset = size
+            except httptools.HttpParserUpgrade as exception:
+                offset += exception.args[0]
+                self.upgraded = True
+                break
+            except httptools.HttpParserError as exception:
+                # in case the native parser has been unset meanwhile the
+                # previous message was set to close the connection and so
+                # the extra data is ignored (as it's considered invalid)
+                if not native == self.native: offset = size; break
+                raise netius.ParserError(str(exception))
+            finally:
+                self.parsing = False
+
+        # returns the number of processed bytes to the caller method
+        # that should be the complete size of the data unless an upgrade
+        # took place, in which case it's the offset of the upgraded data
+        return offset
+
+    def on_message_begin(self):
+        # in case a new message is starting and the previous one is
+        # already finished (pipelining) resets the parser
+        if self.state == FINISH_STATE: self.clear()
+
+    def on_url(self, url):
+        self.buffer += url
+
+    def on_status(self, status):
+        self.buffer += status
+
+    def on_header(self, name, value):
+        # in case the headers have already been processed the
+        # header is a trailer of a chunked message and is ignored
+        # (the same behavior as the one of the pure parser)
+        if not self.state == LINE_STATE: return
+        self._add_header(name, value)
+
+    def on_headers_complete(self):
+        # retrieves the version of the http protocol from the native
+        # parser and populates the values of the status line, taking
+        # into account the type of the message (request or response)
+        native = self.native
+        self.version_s = "HTTP/" + native.get_http_version()
+        self.version = VERSIONS_MAP.get(self.version_s, HTTP_10)
+        if self.type == REQUEST:
+            self.method_s = netius.legacy.str(native.get_method())
+            self.path_s = netius.legacy.str(bytes(self.buffer))
+            self.method = self.method_s.lower()
+            self.line_s = "%s %s %s" % (self.method_s, self.path_s, self.version_s)
+        elif self.type == RESPONSE:
+            self.code = native.get_status_code()
+            self.code_s = str(self.code)
+            self.status_s = netius.legacy.str(bytes(self.buffer))
+            self.status = self.status_s
+            self.line_s = "%s %s %s" % (self.version_s, self.code_s, self.status_s)
+        del self.buffer[:]
+
+        # updates the state to the headers one and triggers the
+        # line event (as the pure parser does) and then runs the
+        # final processing of the headers (shared implementation)
+        self.state = HEADERS_STATE
+        self.trigger("on_line")
+        self._end_headers()
+
+    def on_body(self, body):
+        # in case the message is not chunked the data is handled
+        # as the one of a normal message (store and count) note
+        # that the end of message is handled by the native parser
+        if not self.chunked:
+            if self.store: self._store_data(body)
+            self.message_l += len(body)
+            self.trigger("on_partial", body)
+            return
+
+        # adds the partial data to the message list (used for the chunk
+        # indexes) and runs the store operation in case it's required
+        self.message.append(body)
+        if self.store: self._store_data(body, memory = False)
+        self.chunk_d += len(body)
+        self.trigger("on_partial", body)
+
+    def on_chunk_header(self):
+        self.chunk_d = 0
+        self.chunk_s = len(self.message)
+
+    def on_chunk_complete(self):
+        # in case no data has been received for the chunk this is
+        # the last chunk and there's nothing to be done (the end of
+        # the message is handled by the message complete handler)
+        if self.chunk_d == 0: return
+
+        # calculates the end of chunk index and triggers the chunk
+        # event, then in case the message is not meant to be stored
+        # in memory deletes the contents of the message buffer
+        self.chunk_e = len(self.message)
+        self.trigger("on_chunk", (self.chunk_s, self.chunk_e))
+        if not self.store or self.message_f: del self.message[:]
+
+    def on_message_complete(self):
+        # in case the message is not meant to be kept alive (by
+        # the native parser rules) unsets the native parser so that
+        # a new one is created for any further parsing operation
+        if not self.native.should_keep_alive(): self.native = None
+
+        # in case the message has already been finished (eg: no
+        # payload) there's nothing remaining to be done
+        if self.state == FINISH_STATE: return
+
+        # updates the current state to the finish state and then
+        # triggers the on data event (indicating the end of the
+        # parsing of the message)
+        self.state = FINISH_STATE
+        self.trigger("on_data")
+
+        # in case the message is chunked and is not meant to be stored
+        # in memory deletes the contents of the message buffer
+        if self.chunked and (not self.store or self.message_f):
+            del self.message[:]
+
+    def _native(self):
+        if self.native: return self.native
+        if self.type == REQUEST: native_c = httptools.HttpRequestParser
+        else: native_c = httptools.HttpResponseParser
+        self.native = native_c(self)
+        return self.native
+
 class HTTPResponse(object):
 
     def __init__(self, data = None, code = 200, status = None, headers = None):
@@ -896,3 +1161,7 @@ class HTTPResponse(object):
 
     def info(self):
         return self.headers
+
+is_native = netius.conf("HTTP_NATIVE", True, cast = bool)
+if is_native and NativeHTTPParser.test(): HTTPParser = NativeHTTPParser
+else: HTTPParser = PyHTTPParser
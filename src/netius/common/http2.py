@@ -37,14 +37,17 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import heapq
 import struct
 import tempfile
 import contextlib
+import collections
 
 import netius
 
 from . import http
 from . import util
+from . import hpack
 from . import parser
 
 HEADER_SIZE = 9
@@ -108,6 +111,10 @@ HTTP2_FRAME_SIZE = 16384
 """ The base default value for the maximum size allowed
 from the frame, this includes the header value """
 
+HTTP2_WEIGHT = 16
+""" The default (effective) weight of a stream, to be used
+for the streams for which no priority has been defined """
+
 HTTP2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
 """ The preface string to be sent by the client upon
 the establishment of the connection """
@@ -191,10 +198,13 @@ class HTTP2Parser(parser.Parser):
         self,
         owner,
         store = False,
-        file_limit = http.FILE_LIMIT
+        file_limit = http.FILE_LIMIT,
+        client = False
     ):
         parser.Parser.__init__(self, owner)
 
+        self.client = client
+
         self.build()
         self.reset(
             store = store,
@@ -232,7 +242,10 @@ class HTTP2Parser(parser.Parser):
         )
 
         self.streams = {}
+        self.header_d = []
         self._max_stream = 0
+        self._max_push = 0
+        self._pushing = 0
         self._encoder = None
         self._decoder = None
 
@@ -256,7 +269,10 @@ class HTTP2Parser(parser.Parser):
         self.state_l = 0
         self.parsers = ()
         self.streams = {}
+        self.header_d = []
         self._max_stream = 0
+        self._max_push = 0
+        self._pushing = 0
         self._encoder = None
         self._decoder = None
 
@@ -321,6 +337,11 @@ class HTTP2Parser(parser.Parser):
         state of the parser accordingly and returning the
         number of processed bytes from it.
 
+        The data is handled through a memory view so that frames are
+        parsed and their payloads (eg: DATA contents) are passed to the
+        handlers without any copy, meaning that the provided buffer must
+        not be changed after the call (it may still be referenced).
+
         :type data: String
         :param data: The string containing the data to be parsed
         in the current parse operation.
@@ -336,14 +357,20 @@ class HTTP2Parser(parser.Parser):
         # re-starting (probably a new data sequence)
         if self.state == FINISH_STATE: self.clear()
 
+        # wraps the provided data into a memory view so that the slicing
+        # operations for the various frames are zero copy (only views)
+        data = memoryview(data)
+
         # retrieves the size of the data that has been sent for parsing
         # and saves it under the size original variable
         size = len(data)
         size_o = size
 
         # iterates continuously to try to process all that
-        # data that has been sent for processing
-        while size > 0:
+        # data that has been sent for processing, note that the
+        # payload of an empty frame (zero length) must be processed
+        # even if there's no more data (eg: final empty data frame)
+        while size > 0 or (self.state == PAYLOAD_STATE and self.length == 0):
 
             if self.state <= self.state_l:
                 method = self.states[self.state - 1]
@@ -418,7 +445,8 @@ class HTTP2Parser(parser.Parser):
                 "Stream cannot depend on itself",
                 error_code = PROTOCOL_ERROR
             )
-        if len(self.streams) >= self.owner.settings[SETTINGS_MAX_CONCURRENT_STREAMS]:
+        if len(self.streams) - self._pushing >=\
+            self.owner.settings[SETTINGS_MAX_CONCURRENT_STREAMS]:
             raise netius.ParserError(
                 "Too many streams (greater than SETTINGS_MAX_CONCURRENT_STREAMS)",
                 stream = self.stream,
@@ -431,7 +459,7 @@ class HTTP2Parser(parser.Parser):
                 "Stream cannot be set to 0x00 for DATA",
                 error_code = PROTOCOL_ERROR
             )
-        if not stream.end_headers:
+        if not stream.is_headers:
             raise netius.ParserError(
                 "Not ready to receive DATA open",
                 stream = self.stream,
@@ -458,6 +486,20 @@ class HTTP2Parser(parser.Parser):
                 error_code = PROTOCOL_ERROR
             )
 
+    def assert_response(self, stream, end_stream):
+        if stream.end_stream:
+            raise netius.ParserError(
+                "Not ready to receive HEADERS half closed (remote)",
+                stream = self.stream,
+                error_code = STREAM_CLOSED
+            )
+        if stream.is_headers and not end_stream:
+            raise netius.ParserError(
+                "Trailer HEADERS without END_STREAM flag",
+                stream = self.stream,
+                error_code = PROTOCOL_ERROR
+            )
+
     def assert_priority(self, stream, dependency):
         if self.stream == 0x00:
             raise netius.ParserError(
@@ -481,7 +523,7 @@ class HTTP2Parser(parser.Parser):
                 "Stream cannot be set to 0x00 for RST_STREAM",
                 error_code = PROTOCOL_ERROR
             )
-        if self.stream > self._max_stream:
+        if self.stream > self._max_id(self.stream):
             raise netius.ParserError(
                 "Stream has not been created for RST_STREAM",
                 error_code = PROTOCOL_ERROR
@@ -589,9 +631,9 @@ class HTTP2Parser(parser.Parser):
         if len(data) + self.buffer_size < HEADER_SIZE: return -1
 
         size = HEADER_SIZE - self.buffer_size
-        data = self.buffer_data + data[:size]
+        if self.buffer: data = self._join_buffer(data[:size])
 
-        header = struct.unpack("!BHBBI", data)
+        header = struct.unpack_from("!BHBBI", data)
         extra, self.length, self.type, self.flags, self.stream = header
         self.length += extra << 16
 
@@ -605,8 +647,12 @@ class HTTP2Parser(parser.Parser):
     def _parse_payload(self, data):
         if len(data) + self.buffer_size < self.length: return -1
 
+        # retrieves the view of the frame payload, this only implies a copy
+        # in case the frame has been received over multiple data chunks
+        # (partial frame is buffered) otherwise it's a simple view slice
         size = self.length - self.buffer_size
-        data = self.buffer_data + data[:size]
+        if self.buffer: data = self._join_buffer(data[:size])
+        else: data = data[:size]
 
         valid_type = self.type < len(self.parsers)
         if not valid_type: self._invalid_type()
@@ -632,11 +678,18 @@ class HTTP2Parser(parser.Parser):
         padded_l = 0
 
         if padded:
-            padded_l, = struct.unpack("!B", data[index:index + 1])
+            padded_l, = struct.unpack_from("!B", data, index)
             index += 1
 
         contents = data[index:data_l - padded_l]
 
+        # in case the parser is running on the client side the data may
+        # refer to a stream that has been closed (reset) locally and that
+        # the peer was not yet aware of, such data is discarded
+        if self.client and self._is_discarded(self.stream):
+            self.trigger("on_data_h2", None, contents)
+            return
+
         stream = self._get_stream(self.stream)
         self.assert_data(stream, end_stream)
 
@@ -663,18 +716,28 @@ class HTTP2Parser(parser.Parser):
         exclusive = 0
 
         if padded:
-            padded_l, = struct.unpack("!B", data[index:index + 1])
+            padded_l, = struct.unpack_from("!B", data, index)
             index += 1
 
         if priority:
-            dependency, weight = struct.unpack("!IB", data[index:index + 5])
+            dependency, weight = struct.unpack_from("!IB", data, index)
             exclusive = True if dependency & 0x80000000 else False
             dependency = dependency & 0x7fffffff
             index += 5
 
         # retrieves the (headers) fragment part of the payload, this is
-        # going to be used as the basis for the header decoding
-        fragment = data[index:data_l - padded_l]
+        # going to be used as the basis for the header decoding, notice
+        # that a copy is created as the fragment may be kept in the stream
+        fragment = data[index:data_l - padded_l].tobytes()
+
+        # in case the parser is running on the client side the frame
+        # carries a response (or trailer) block for a stream that has
+        # been created locally, so a different workflow is followed
+        if self.client: return self._parse_response(
+            fragment,
+            end_stream,
+            end_headers
+        )
 
         # retrieves the value of the window initial size from the owner
         # connection this is the value to be set in the new stream and
@@ -693,9 +756,10 @@ class HTTP2Parser(parser.Parser):
             # various elements in the currently opened stream accordingly
             self.assert_headers(stream, end_stream)
             stream.extend_headers(fragment)
-            if dependency: stream.dependency = dependency
-            if weight: stream.weight = weight
-            if exclusive: stream.exclusive = exclusive
+            if priority: stream.dependency = dependency
+            if priority: stream.weight = weight
+            if priority: stream.exclusive = exclusive
+            if priority: stream.priority = True
             if end_headers: stream.end_headers = end_headers
             if end_stream: stream.end_stream = end_stream
         else:
@@ -709,6 +773,7 @@ class HTTP2Parser(parser.Parser):
                 dependency = dependency,
                 weight = weight,
                 exclusive = exclusive,
+                priority = True if priority else False,
                 end_headers = end_headers,
                 end_stream = end_stream,
                 store = self.store,
@@ -734,6 +799,10 @@ class HTTP2Parser(parser.Parser):
         # be latter retrieved for proper event propagation
         self._set_stream(stream)
 
+        # in case the exclusive flag is set the stream becomes the sole
+        # child of its parent, adopting the previous children of it
+        if exclusive: self._set_exclusive(stream)
+
         self.trigger("on_headers_h2", stream)
 
         if stream.end_headers: stream._calculate()
@@ -742,11 +811,16 @@ class HTTP2Parser(parser.Parser):
 
     def _parse_priority(self, data):
         dependency, weight = struct.unpack("!IB", data)
+        exclusive = True if dependency & 0x80000000 else False
+        dependency = dependency & 0x7fffffff
         stream = self._get_stream(self.stream, strict = False)
         if stream:
             stream.dependency = dependency
             stream.weight = weight
+            stream.exclusive = exclusive
+            stream.priority = True
         self.assert_priority(stream, dependency)
+        if stream and exclusive: self._set_exclusive(stream)
         self.trigger("on_priority", stream, dependency, weight)
 
     def _parse_rst_stream(self, data):
@@ -763,8 +837,7 @@ class HTTP2Parser(parser.Parser):
 
         for index in netius.legacy.xrange(count):
             base = index * SETTING_SIZE
-            part = data[base:base + SETTING_SIZE]
-            setting = struct.unpack("!HI", part)
+            setting = struct.unpack_from("!HI", data, base)
             settings.append(setting)
 
         self.assert_settings(settings, ack)
@@ -781,12 +854,12 @@ class HTTP2Parser(parser.Parser):
         padded_l = 0
 
         if padded:
-            padded_l, = struct.unpack("!B", data[index:index + 1])
+            padded_l, = struct.unpack_from("!B", data, index)
             index += 1
 
-        promised_stream, = struct.unpack("!I", data[index:index + 4])
+        promised_stream, = struct.unpack_from("!I", data, index)
 
-        fragment = data[index:data_l - padded_l]
+        fragment = data[index:data_l - padded_l].tobytes()
 
         self.assert_push_promise(promised_stream)
 
@@ -795,11 +868,11 @@ class HTTP2Parser(parser.Parser):
     def _parse_ping(self, data):
         ack = self.flags & 0x01
         self.assert_ping()
-        self.trigger("on_ping", data, ack)
+        self.trigger("on_ping", data.tobytes(), ack)
 
     def _parse_goaway(self, data):
-        last_stream, error_code = struct.unpack("!II", data[:8])
-        extra = data[8:]
+        last_stream, error_code = struct.unpack_from("!II", data)
+        extra = data[8:].tobytes()
         self.assert_goaway()
         self.trigger("on_goaway", last_stream, error_code, extra)
 
@@ -817,13 +890,23 @@ class HTTP2Parser(parser.Parser):
     def _parse_continuation(self, data):
         end_headers = True if self.flags & 0x04 else False
 
+        if self.client and self._is_discarded(self.stream):
+            self.end_headers = end_headers
+            self._discard_headers(data.tobytes(), end_headers)
+            return
+
         stream = self._get_stream(self.stream)
         self.assert_continuation(stream)
 
-        stream.extend_headers(data)
+        stream.extend_headers(data.tobytes())
         stream.end_headers = end_headers
         self.end_headers = end_headers
 
+        if self.client:
+            self.trigger("on_continuation", stream)
+            self._process_response(stream)
+            return
+
         stream.decode_headers()
 
         self.trigger("on_continuation", stream)
@@ -833,6 +916,63 @@ class HTTP2Parser(parser.Parser):
         if stream.end_headers and stream.end_stream:
             self.trigger("on_data")
 
+    def _parse_response(self, fragment, end_stream, end_headers):
+        # in case the stream has already been closed locally (eg: reset)
+        # the header block is discarded, as no one is waiting for it
+        if self._is_discarded(self.stream):
+            self.end_headers = end_headers
+            self._discard_headers(fragment, end_headers)
+            return
+
+        # retrieves the stream for which the response is being received,
+        # this stream must have been created by the client (request) as
+        # the remote peer is not allowed to open streams by itself
+        stream = self._get_stream(self.stream)
+        self.assert_response(stream, end_stream)
+
+        stream.extend_headers(fragment)
+        stream.end_headers = end_headers
+        if end_stream: stream.end_stream = end_stream
+        self.end_headers = end_headers
+
+        self.trigger("on_headers_h2", stream)
+
+        self._process_response(stream)
+
+    def _process_response(self, stream):
+        # only complete header blocks are processed, the first final (non
+        # informational) block defines the headers of the response, any
+        # other block (eg: 100 Continue or trailers) is decoded and ignored
+        if not stream.end_headers: return
+        is_headers = stream.is_headers
+        stream.decode_headers()
+
+        if stream.end_stream and not stream.is_headers:
+            raise netius.ParserError(
+                "Stream ended without final response headers",
+                stream = self.stream,
+                error_code = PROTOCOL_ERROR
+            )
+
+        if not is_headers and stream.is_headers:
+            stream._calculate()
+            self.trigger("on_headers")
+        if stream.is_ready: self.trigger("on_data")
+
+    def _discard_headers(self, fragment, end_headers):
+        # the header block of a stream that has been closed locally must
+        # still be decoded (and then discarded) so that the state of the
+        # decoder remains in sync with the encoder of the peer
+        self.header_d.append(fragment)
+        if not end_headers: return
+        block = b"".join(self.header_d)
+        self.header_d = []
+        self.decoder.decode(block)
+
+    def _is_discarded(self, stream):
+        if stream in self.streams: return False
+        return stream % 2 == 1 and 0 < stream <= self._max_stream
+
     def _has_stream(self, stream):
         return stream in self.streams
 
@@ -849,13 +989,14 @@ class HTTP2Parser(parser.Parser):
         if stream == 0: return default
         if strict: closed_s = True; unopened_s = True; exists_s = True
         exists = stream in self.streams
-        if closed_s and not exists and stream <= self._max_stream:
+        max_id = self._max_id(stream)
+        if closed_s and not exists and stream <= max_id:
             raise netius.ParserError(
                 "Invalid or closed stream '%d'" % stream,
                 stream = self.stream,
                 error_code = STREAM_CLOSED
             )
-        if unopened_s and not exists and stream > self._max_stream:
+        if unopened_s and not exists and stream > max_id:
             raise netius.ParserError(
                 "Invalid or unopened stream '%d'" % stream,
                 stream = self.stream,
@@ -875,38 +1016,69 @@ class HTTP2Parser(parser.Parser):
         self.stream_o = stream
         self._max_stream = max(self._max_stream, stream.identifier)
 
+    def _set_push(self, stream):
+        # registers the (server initiated) pushed stream, notice that
+        # neither the current stream object nor the maximum (client)
+        # stream identifier are touched as the stream was not received
+        self.streams[stream.identifier] = stream
+        self._max_push = max(self._max_push, stream.identifier)
+        self._pushing += 1
+
+    def _set_exclusive(self, stream):
+        # moves the (other) streams that depend on the same parent as
+        # the exclusive stream to depend on it instead, as defined by
+        # the exclusive flag of the priority (dependency re-parenting)
+        for other in netius.legacy.values(self.streams):
+            if other == stream: continue
+            if not other.dependency == stream.dependency: continue
+            other.dependency = stream.identifier
+
     def _del_stream(self, stream):
         if not stream in self.streams: return
         del self.streams[stream]
+        if stream % 2 == 0: self._pushing -= 1
         self.stream_o = None
 
+    def _max_id(self, stream):
+        # the identifiers of the streams initiated by the client are odd
+        # and the ones of the streams pushed by the server are even, each
+        # of the sides has its own (independent) sequence of identifiers
+        return self._max_stream if stream % 2 == 1 else self._max_push
+
     def _invalid_type(self):
         ignore = False if self.last_type == HEADERS else True
         if ignore: raise netius.ParserError("Invalid frame type", ignore = True)
         raise netius.ParserError("Invalid frame type", error_code = PROTOCOL_ERROR)
 
+    def _join_buffer(self, data):
+        # joins the buffered (partial) chunks with the provided data into
+        # a single (new) byte array, this is the only copy of the frame
+        # data and only happens for frames split across multiple chunks
+        buffer = bytearray()
+        for chunk in self.buffer: buffer += chunk
+        buffer += data
+        del self.buffer[:]
+        return memoryview(buffer)
+
     @property
     def buffer_size(self):
         return sum(len(data) for data in self.buffer)
 
-    @property
-    def buffer_data(self, empty = True):
-        data = b"".join(self.buffer)
-        if empty: del self.buffer[:]
-        return data
-
     @property
     def encoder(self):
         if self._encoder: return self._encoder
-        import hpack
-        self._encoder = hpack.hpack.Encoder()
+        self._encoder = hpack.HPACKEncoder()
         return self._encoder
 
     @property
     def decoder(self):
         if self._decoder: return self._decoder
-        import hpack
-        self._decoder = hpack.hpack.Decoder()
+        self._decoder = hpack.HPACKDecoder(
+            max_list = self.owner.settings.get(
+                SETTINGS_MAX_HEADER_LIST_SIZE,
+                hpack.LIST_SIZE
+            )
+        )
         return self._decoder
 
 class HTTP2Stream(netius.Stream):
@@ -930,6 +1102,7 @@ class HTTP2Stream(netius.Stream):
         dependency = 0x00,
         weight = 1,
         exclusive = False,
+        priority = False,
         end_headers = False,
         end_stream = False,
         end_stream_l = False,
@@ -946,6 +1119,7 @@ class HTTP2Stream(netius.Stream):
         self.dependency = dependency
         self.weight = weight
         self.exclusive = exclusive
+        self.priority = priority
         self.end_headers = end_headers
         self.end_stream = end_stream
         self.end_stream_l = end_stream_l
@@ -1026,6 +1200,10 @@ class HTTP2Stream(netius.Stream):
         # instructions are correctly processed/handled
         netius.Stream.close(self)
 
+        # discards the frames of the stream that are still pending (delayed)
+        # in the connection as they're never going to be sent
+        self.connection.discard_frames(self.identifier)
+
         # verifies if a stream structure exists in the parser for
         # the provided identifier and if that's not the case returns
         # immediately otherwise removes it from the parent
@@ -1043,6 +1221,7 @@ class HTTP2Stream(netius.Stream):
             dependency = self.dependency,
             weight = self.weight,
             exclusive = self.exclusive,
+            priority = self.priority,
             end_headers = self.end_headers,
             end_stream = self.end_stream,
             end_stream_l = self.end_stream_l,
@@ -1148,7 +1327,12 @@ class HTTP2Stream(netius.Stream):
         if not self.header_b: return
         is_joinable = len(self.header_b) > 1
         block = b"".join(self.header_b) if is_joinable else self.header_b[0]
-        self.headers_l = self.owner.decoder.decode(block)
+        try: self.headers_l = self.owner.decoder.decode(block)
+        except netius.ParserError as exception:
+            raise netius.ParserError(
+                "Invalid header block (%s)" % exception.get_kwarg("message"),
+                error_code = COMPRESSION_ERROR
+            )
         self.header_b = []
         if assert_h: self.assert_headers()
 
@@ -1368,6 +1552,21 @@ class HTTP2Stream(netius.Stream):
         with self.ctx_request(args, kwargs):
             return self.connection.send_rst_stream(*args, **kwargs)
 
+    def send_hints(self, *args, **kwargs):
+        if not self.is_open(): return 0
+        with self.ctx_request(args, kwargs):
+            return self.connection.send_hints(*args, **kwargs)
+
+    def push(self, *args, **kwargs):
+        if not self.is_open(): return None
+        with self.ctx_request(args, kwargs):
+            return self.connection.push(*args, **kwargs)
+
+    def preload(self, *args, **kwargs):
+        if not self.is_open(): return 0
+        with self.ctx_request(args, kwargs):
+            return self.connection.preload(*args, **kwargs)
+
     def assert_headers(self):
         pseudo = True
         pseudos = dict()
@@ -1585,3 +1784,170 @@ class HTTP2Stream(netius.Stream):
             callback(self)
 
         return inner
+
+class HTTP2Scheduler(object):
+    """
+    Weighted fair scheduler for the delayed (blocked) frames of the
+    streams of an HTTP 2 connection, each stream has its own queue of
+    frames and the selection of the next stream to be flushed uses a
+    virtual time, that advances for each frame by its size divided by
+    the weight of the stream (bandwidth shared according to weights).
+
+    The dependencies between streams are honoured by having a stream
+    wait for its parent while the parent has pending frames that may
+    be sent, so that the parent is flushed before its children.
+
+    Streams that are blocked by their own (stream) window are removed
+    from scheduling until they are unblocked, so that the flushing
+    operations only touch the streams that are able to send frames.
+
+    :see: https://tools.ietf.org/html/rfc7540#section-5.3
+    """
+
+    def __init__(self):
+        self.queues = dict()
+        self.weights = dict()
+        self.dependencies = dict()
+        self.times = dict()
+        self.waiting = dict()
+        self.blocked = set()
+        self.scheduled = set()
+        self.heap = []
+        self.time = 0.0
+        self.count = 0
+        self._index = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, stream, frame, weight = HTTP2_WEIGHT, dependency = 0x00):
+        """
+        Adds the provided frame to the queue of the stream, in case
+        this is the first pending frame of the stream, the stream is
+        scheduled starting at the current virtual time.
+
+        :type stream: int
+        :param stream: The identifier of the stream of the frame.
+        :type frame: Object
+        :param frame: The frame structure that is going to be queued.
+        :type weight: int
+        :param weight: The (effective) weight of the stream (1 to 256).
+        :type dependency: int
+        :param dependency: The identifier of the stream on which the
+        stream depends (its parent), zero for the root.
+        """
+
+        self.weights[stream] = weight
+        self.dependencies[stream] = dependency
+        self.count += 1
+        queue = self.queues.get(stream, None)
+        if queue: queue.append(frame); return
+        self.queues[stream] = collections.deque((frame,))
+        self.times[stream] = self.time
+        self.schedule(stream)
+
+    def next(self):
+        """
+        Retrieves (and un-schedules) the stream with the lowest virtual
+        time that is ready to have its frames sent, the stream must be
+        re-scheduled (eg: pop operation) to be selected again.
+
+        :rtype: int
+        :return: The identifier of the next stream to be flushed or an
+        invalid value in case there's no stream ready.
+        """
+
+        while self.heap:
+            time, _index, stream = heapq.heappop(self.heap)
+            self.scheduled.discard(stream)
+            if not stream in self.queues: continue
+            if stream in self.blocked: continue
+            if self._wait(stream): continue
+            if time > self.time: self.time = time
+            return stream
+        return None
+
+    def peek(self, stream):
+        return self.queues[stream][0]
+
+    def pop(self, stream, size = 0):
+        """
+        Removes the first frame from the queue of the stream, advancing
+        the virtual time of the stream by the size of the frame (by its
+        weight) and re-scheduling the stream in case there are frames.
+
+        :type stream: int
+        :param stream: The identifier of the stream to pop the frame.
+        :type size: int
+        :param size: The size of the frame that has been sent.
+        :rtype: Object
+        :return: The frame that has been removed from the queue.
+        """
+
+        queue = self.queues[stream]
+        frame = queue.popleft()
+        self.count -= 1
+        self.times[stream] += float(size) / self.weights[stream]
+        if queue: self.schedule(stream)
+        else: self._remove(stream)
+        return frame
+
+    def schedule(self, stream):
+        if stream in self.scheduled: return
+        if not stream in self.queues: return
+        self._index += 1
+        self.scheduled.add(stream)
+        heapq.heappush(self.heap, (self.times[stream], self._index, stream))
+
+    def block(self, stream):
+        self.blocked.add(stream)
+        self._release(stream)
+
+    def unblock(self, stream):
+        if not stream in self.blocked: return
+        self.blocked.discard(stream)
+        self.schedule(stream)
+
+    def discard(self, stream):
+        queue = self.queues.get(stream, None)
+        if not queue: return 0
+        count = len(queue)
+        self.count -= count
+        self._remove(stream)
+        return count
+
+    def _remove(self, stream):
+        del self.queues[stream]
+        del self.weights[stream]
+        del self.dependencies[stream]
+        del self.times[stream]
+        self.blocked.discard(stream)
+        self._release(stream)
+
+    def _release(self, stream):
+        children = self.waiting.pop(stream, None)
+        if not children: return
+        for child in children: self.schedule(child)
+
+    def _wait(self, stream):
+        # in case the parent of the stream has no pending frames or is
+        # blocked (no progress possible) the stream does not have to wait
+        dependency = self.dependencies[stream]
+        if not dependency in self.queues: return False
+        if dependency in self.blocked: return False
+
+        # walks up the chain of (pending) parents making sure that there's
+        # no dependency cycle, that would otherwise block the streams
+        parent = dependency
+        count = len(self.queues)
+        while parent in self.queues and count > 0:
+            if parent == stream: return False
+            parent = self.dependencies[parent]
+            count -= 1
+
+        # adds the stream to the list of streams waiting for the parent
+        # to be flushed, they are re-scheduled once the parent is removed
+        children = self.waiting.get(dependency, None)
+        if children == None: children = self.waiting[dependency] = []
+        children.append(stream)
+        return True
@@ -89,6 +89,7 @@ def header_up(name):
 
 def assert_ip4(address, allowed, default = True):
     if not allowed: return default
+    if hasattr(allowed, "match"): return allowed.match(address, default = default)
     for item in allowed:
         is_subnet = "/" in item
         if is_subnet: valid = in_subnet_ip4(address, item)
@@ -67,13 +67,31 @@ class FileServer(netius.servers.HTTP2Server):
 
     Current implementation supports byte ranges so that partial retrieval
     of a file is possible.
+
+    For plain (non compressed and non secure) HTTP 1.1 responses the file
+    contents are sent using the zero copy (sendfile) approach, if available.
+
+    The resources linked by a file (eg: stylesheets of a page) may be
+    configured per path so that they are pushed (HTTP 2) or hinted using
+    103 Early Hints (HTTP 1.1) to the client together with the file.
     """
 
-    def __init__(self, base_path = "", cors = False, cache = 0, *args, **kwargs):
+    def __init__(
+        self,
+        base_path = "",
+        cors = False,
+        cache = 0,
+        sendfile = True,
+        push = None,
+        *args,
+        **kwargs
+    ):
         netius.servers.HTTP2Server.__init__(self, *args, **kwargs)
         self.base_path = base_path
         self.cors = cors
         self.cache = 0
+        self.sendfile = sendfile
+        self.push = push or dict()
 
     def on_connection_d(self, connection):
         netius.servers.HTTP2Server.on_connection_d(self, connection)
@@ -98,12 +116,17 @@ class FileServer(netius.servers.HTTP2Server):
         if self.env: self.base_path = self.get_env("BASE_PATH", self.base_path)
         if self.env: self.cors = self.get_env("CORS", self.cors, cast = bool)
         if self.env: self.cache = self.get_env("CACHE", self.cache, cast = int)
+        if self.env: self.sendfile = self.get_env("SENDFILE", self.sendfile, cast = bool)
+        if self.env: self.push = self.get_env("PUSH", self.push, cast = dict)
+        if not hasattr(os, "sendfile"): self.sendfile = False
         self.base_path = os.path.abspath(self.base_path)
         self.cache_d = datetime.timedelta(seconds = self.cache)
         self.base_path = netius.legacy.u(self.base_path, force = True)
         self.info("Defining '%s' as the root of the file server ..." % (self.base_path or "."))
         if self.cors: self.info("Cross origin resource sharing is enabled")
         if self.cache: self.info("Resource cache set with %d seconds" % self.cache)
+        if self.sendfile: self.info("Zero copy (sendfile) file sending is enabled")
+        if self.push: self.info("Resource push set for %d path(s)" % len(self.push))
 
     def on_data_http(self, connection, parser):
         netius.servers.HTTP2Server.on_data_http(self, connection, parser)
@@ -403,6 +426,10 @@ class FileServer(netius.servers.HTTP2Server):
         # current data to be sent is partial or not
         code = 206 if is_partial else 200
 
+        # in case this is a complete response the resources linked with the
+        # path are pushed (or hinted) to the client before the response
+        if not is_partial: self._file_preload(connection, parser)
+
         # sends the initial part of the file response containing the headers
         # and the description of the file (includes size) the callback to this
         # operation is the initial sending of the file contents so that the
@@ -462,7 +489,21 @@ class FileServer(netius.servers.HTTP2Server):
         try: self.on_data_http(connection, parser)
         finally: parser.destroy()
 
+    def _file_preload(self, connection, parser):
+        # retrieves the (request) path and uses it to determine the set
+        # of resources that are linked with it, in case there are none
+        # returns immediately as there's nothing to be preloaded
+        if not self.push: return
+        path = parser.get_path(normalize = True)
+        paths = self.push.get(path, None)
+        if not paths: return
+
+        # preloads the resources on the connection, that should either
+        # push them (HTTP 2) or send the early hints (HTTP 1.1)
+        connection.preload(paths)
+
     def _file_send(self, connection):
+        if self._is_sendfile(connection): self._file_sendfile(connection); return
         file = connection.file
         range = connection.range
         is_larger = BUFFER_SIZE > connection.bytes_p
@@ -478,6 +519,21 @@ class FileServer(netius.servers.HTTP2Server):
             callback = callback
         )
 
+    def _file_sendfile(self, connection):
+        # sends the complete (remaining) range of the file using the zero
+        # copy approach, the sending is driven by the write readiness of
+        # the connection and the file is finished once completely sent
+        file = connection.file
+        range = connection.range
+        count = connection.bytes_p
+        connection.bytes_p = 0
+        connection.send_file(
+            file,
+            offset = range[0],
+            count = count,
+            callback = self._file_finish
+        )
+
     def _file_finish(self, connection):
         connection.file.close()
         connection.file = None
@@ -495,6 +551,18 @@ class FileServer(netius.servers.HTTP2Server):
         if connection.parser.keep_alive: return
         connection.close(flush = True)
 
+    def _is_sendfile(self, connection):
+        # the zero copy approach is only possible for HTTP 1.1 (legacy)
+        # connections for which there's no transformation of the data
+        # to be performed, meaning no encryption and no (chunked or
+        # compressed) encoding, otherwise the data must be read
+        if not self.sendfile: return False
+        if not hasattr(connection, "legacy"): return False
+        if not connection.legacy: return False
+        if connection.ssl: return False
+        if not connection.is_plain(): return False
+        return True
+
     def _sorter_build(self, path):
 
         def sorter(item):
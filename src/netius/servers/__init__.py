@@ -62,4 +62,4 @@ from .socks import SOCKSConnection, SOCKSServer
 from .tftp import TFTPRequest, TFTPServer
 from .torrent import Pieces, TorrentTask, TorrentServer
 from .ws import WSConnection, WSServer
-from .wsgi import WSGIServer
+from .wsgi import WSGIInput, WSGIConnection, WSGIServer
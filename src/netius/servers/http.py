@@ -67,8 +67,36 @@ ENCODING_MAP = dict(
 the corresponding integer value for each of them this is used
 in the initial construction of the server """
 
+PRELOAD_TYPES = dict(
+    css = "style",
+    js = "script",
+    mjs = "script",
+    woff = "font",
+    woff2 = "font",
+    ttf = "font",
+    otf = "font",
+    png = "image",
+    jpg = "image",
+    jpeg = "image",
+    gif = "image",
+    svg = "image",
+    webp = "image",
+    ico = "image"
+)
+""" The map associating the extension of a resource with the
+destination (as) value to be used in the preload links, this
+is required by the clients for the matching of the resources """
+
 class HTTPConnection(netius.Connection):
 
+    __slots__ = (
+        "encoding",
+        "current",
+        "parser",
+        "legacy",
+        "gzip_m"
+    )
+
     def __init__(self, encoding = PLAIN_ENCODING, *args, **kwargs):
         netius.Connection.__init__(self, *args, **kwargs)
         self.encoding = encoding
@@ -360,6 +388,65 @@ class HTTPConnection(netius.Connection):
             callback = callback
         )
 
+    def send_hints(
+        self,
+        links,
+        stream = None,
+        delay = True,
+        callback = None
+    ):
+        """
+        Sends an informational (103 Early Hints) response with the
+        provided link header values, so that the client may start
+        loading the linked resources before the final response.
+
+        Clients older than HTTP 1.1 do not understand informational
+        responses and so nothing is sent to them.
+
+        :type links: List
+        :param links: The sequence of link header values to be sent
+        to the client, eg: ``</style.css>; rel=preload; as=style``.
+        :type stream: int
+        :param stream: The identifier of the stream for which the hints
+        are going to be sent (only relevant for HTTP 2).
+        :type delay: bool
+        :param delay: If the sending of the data should be delayed.
+        :type callback: Function
+        :param callback: The function to be called once the hints are
+        sent to the client.
+        :rtype: int
+        :return: The number of bytes sent for the hints.
+        """
+
+        if not links: return 0
+        if self.parser_ctx.version < netius.common.HTTP_11: return 0
+        return self.send_header(
+            headers = dict(link = list(links)),
+            code = 103,
+            stream = stream,
+            delay = delay,
+            callback = callback
+        )
+
+    def preload(self, paths, stream = None):
+        """
+        Announces the resources with the provided paths to the client
+        so that they are loaded (in parallel) while the current request
+        is being handled, under HTTP 1.1 this is done using hints.
+
+        :type paths: List
+        :param paths: The sequence of (absolute) paths of the resources
+        to be preloaded by the client.
+        :type stream: int
+        :param stream: The identifier of the stream that triggered the
+        loading of the resources (only relevant for HTTP 2).
+        :rtype: int
+        :return: The number of bytes sent for the announcement.
+        """
+
+        links = [self._preload_link(path) for path in paths]
+        return self.send_hints(links, stream = stream)
+
     def send_part(
         self,
         data,
@@ -458,6 +545,17 @@ class HTTPConnection(netius.Connection):
     def on_data(self):
         self.owner.on_data_http(self.connection_ctx, self.parser_ctx)
 
+    def _preload_link(self, path):
+        # determines the extension of the resource (ignoring any query
+        # string) and uses it to find the proper destination value of
+        # the link, note that fonts are always fetched in cors mode
+        base = path.split("?", 1)[0]
+        _base, extension = base.rsplit(".", 1) if "." in base else (base, "")
+        type = PRELOAD_TYPES.get(extension.lower(), None)
+        if not type: return "<%s>; rel=preload" % path
+        if type == "font": return "<%s>; rel=preload; as=font; crossorigin" % path
+        return "<%s>; rel=preload; as=%s" % (path, type)
+
     @contextlib.contextmanager
     def ctx_request(self, args = None, kwargs = None):
         yield
@@ -43,8 +43,31 @@ import netius.common
 
 from . import http
 
+PUSH_HEADERS = (
+    "accept-encoding",
+    "accept-language",
+    "user-agent",
+    "cookie"
+)
+""" The names of the headers of the original request that are
+copied into the (synthetic) requests of the pushed resources, so
+that the responses are negotiated as they would for the client """
+
 class HTTP2Connection(http.HTTPConnection):
 
+    __slots__ = (
+        "settings",
+        "settings_r",
+        "window",
+        "window_o",
+        "window_l",
+        "window_t",
+        "preface",
+        "preface_b",
+        "frames",
+        "unavailable"
+    )
+
     def __init__(
         self,
         legacy = True,
@@ -56,15 +79,15 @@ class HTTP2Connection(http.HTTPConnection):
     ):
         http.HTTPConnection.__init__(self, *args, **kwargs)
         self.legacy = legacy
-        self.settings = dict(settings)
-        self.settings_r = dict(settings_r)
+        self.settings = settings
+        self.settings_r = settings_r
         self.window = window
         self.window_o = self.settings[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE]
         self.window_l = self.window_o
         self.window_t = self.window_o // 2
         self.preface = False
         self.preface_b = b""
-        self.frames = []
+        self.frames = None
         self.unavailable = {}
 
     def open(self, *args, **kwargs):
@@ -79,7 +102,7 @@ class HTTP2Connection(http.HTTPConnection):
             window_o = self.window_o,
             window_l = self.window_l,
             window_t = self.window_t,
-            frames = len(self.frames)
+            frames = len(self.frames) if self.frames else 0
         )
         return info
 
@@ -549,6 +572,26 @@ class HTTP2Connection(http.HTTPConnection):
             callback = callback
         )
 
+    def send_push_promise(
+        self,
+        headers = [],
+        promised_stream = None,
+        stream = None,
+        delay = True,
+        callback = None
+    ):
+        flags = 0x04
+        payload = struct.pack("!I", promised_stream)
+        payload += self.parser.encoder.encode(headers)
+        return self.send_frame(
+            type = netius.common.PUSH_PROMISE,
+            flags = flags,
+            payload = payload,
+            stream = stream,
+            delay = delay,
+            callback = callback
+        )
+
     def send_rst_stream(
         self,
         error_code = 0x00,
@@ -649,7 +692,9 @@ class HTTP2Connection(http.HTTPConnection):
     def send_delta(self):
         delta = self.window_l -\
             netius.common.HTTP2_SETTINGS[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE]
-        if delta == 0: return
+        # the connection window may only be increased (the window update
+        # increment must be positive) so a smaller window is not announced
+        if delta <= 0: return
         self.send_window_update(increment = delta, stream = 0x00)
 
     def delay_frame(self, *args, **kwargs):
@@ -657,27 +702,39 @@ class HTTP2Connection(http.HTTPConnection):
         # the frame is meant to be sent, and then uses this same value
         # to try to retrieve the target stream of the frame
         stream = kwargs["stream"]
-        stream = self.parser._get_stream(stream)
-
-        # adds the frame structure (tuple) as the structure describing
-        # the frame to be delayed, then increments the frame counter in
-        # the stream so that it represent a proper value
-        self.frames.append((args, kwargs))
-        stream.frames += 1
+        _stream = self.parser._get_stream(stream)
+
+        # creates the scheduler of the delayed frames in case it does
+        # not exist yet (only required for blocked connections), this
+        # avoids the extra structures for most of the connections
+        if self.frames == None: self.frames = netius.common.HTTP2Scheduler()
+
+        # adds the frame structure (tuple) to the queue of the stream in
+        # the scheduler, taking into account the priority of the stream
+        # (the raw weight is offset by one, default if none was received)
+        # then increments the frame counter in the stream accordingly
+        self.frames.push(
+            stream,
+            (args, kwargs),
+            weight = _stream.weight + 1 if _stream.priority else netius.common.HTTP2_WEIGHT,
+            dependency = _stream.dependency
+        )
+        _stream.frames += 1
 
         # returns a zero value indicating that no bytes have been sent
         # "immediately" by this method
         return 0
 
-    def flush_frames(self, all = True):
+    def flush_frames(self, all = True, streams = None):
         """
         Runs the flush operation on the delayed/pending frames, meaning
         that the window/availability tests are going to be run, checking
         if the various streams and connection are ready for sending the
         frames.
 
-        In case the all flag is active the complete set of frames are going
-        to be tested for sending, this operation implies more resource usage.
+        The frames are flushed according to the weighted fair scheduler
+        of the connection (honouring the priority of the streams), the
+        streams blocked by their own window are skipped until unblocked.
 
         This method should be called after a window update frame is
         received so that the pending frames may be sent.
@@ -686,75 +743,67 @@ class HTTP2Connection(http.HTTPConnection):
         :param all: If the complete set of frames should be tested, or
         if instead at the first testing fail the control flow should be
         returned immediately.
+        :type streams: List
+        :param streams: The identifiers of the streams that have been
+        unblocked (stream window update) and that should be re-scheduled.
         :rtype: bool
         :return: If all the pending frames have been successfully flushed.
         """
 
-        # starts the values for both the offset value to be used in the
-        # pop operation and the dictionary to be used in the storage of
-        # the bitset of streams marked as started in the iteration
-        offset = 0
-        starved = dict() if all else None
-
-        # iterates over the complete set of frames pending to to be sent
-        # (delayed) trying to send each of them until one fails and the
-        # flushing operation is delayed until further requesting
-        while offset < len(self.frames):
-            # retrieves the reference to the current frame tuple to
-            # be sent and retrieves the stream and payload from it
-            frame = self.frames[offset]
-            args, kwargs = frame
-            stream = kwargs["stream"]
-            payload = kwargs["payload"]
-            payload_l = len(payload)
-
-            # verifies that the stream is currently place in the list of
-            # stream that are considered unavailable as this is a state
-            # required for proper execution
-            netius.common.verify(stream in self.unavailable)
-
-            # verifies if the stream associated with the frame to be
-            # sent is in the started map and if that's the case continue
-            # the current loop immediately (cannot flush frame)
-            if starved and stream in starved:
-                offset += 1
-                continue
+        # in case there are no frames pending to be sent, there's nothing
+        # to be done and the flush operation is considered successful
+        scheduler = self.frames
+        if not scheduler: return True
+
+        # re-schedules the streams that have (possibly) been unblocked by
+        # a window update, so that they are considered for flushing
+        if streams:
+            for stream in streams: scheduler.unblock(stream)
+
+        # starts the list of streams that have been deferred because the
+        # connection window is not large enough for their next frame
+        deferred = []
+
+        while True:
+            # retrieves the next stream to be flushed from the scheduler
+            # in case there's none, there's nothing more to be flushed
+            stream = scheduler.next()
+            if stream == None: break
 
             # retrieves the reference to the stream object from the
             # identifier of the stream, this may an invalid/unset value
             _stream = self.parser._get_stream(stream, strict = False)
 
             # verifies if the current stream to be flushed is still
-            # open and if that's not the case removes the frame from
-            # the frames queue and skips the current iteration
+            # open and if that's not the case discards its frames
             if not _stream or not _stream.is_open():
-                self.frames.pop(offset)
-                if _stream: _stream.frames -= 1
+                count = scheduler.discard(stream)
+                if _stream: _stream.frames -= count
+                continue
+
+            # retrieves the next frame of the stream and its payload size
+            # that is going to be used for the availability verification
+            args, kwargs = scheduler.peek(stream)
+            payload_l = len(kwargs["payload"])
+
+            # in case the stream window is not large enough for the frame
+            # the stream is blocked until a window update is received for it
+            if _stream.window < payload_l:
+                scheduler.block(stream)
+                if not all: break
                 continue
 
-            # makes sure that the stream is currently marked as not available
-            # this should be the state for every stream that has pending frames
-            netius.common.verify(not _stream._available)
-
-            # verifies if there's available "space" in the stream flow
-            # to send the current payload and in case there's not breaks
-            # the current loop as there's nothing else to be done, delays
-            # pending frames for a new flush operation, note that the
-            # return value is invalid (meaning that the stream may not
-            # be available), a special failover operation exists if the
-            # all flush operation is enabled in which the stream is marked
-            # as starved and the current iteration is skipped trying to
-            # flush frames from different streams
-            available = self.available_stream(stream, payload_l, strict = False)
-            if not available and not all: return False
-            if not available and all:
-                starved[stream] = True
-                offset += 1
+            # in case the connection window is not large enough for the
+            # frame the stream is deferred (re-scheduled after the loop),
+            # and in case the window is exhausted the flush is stopped
+            if self.window < payload_l:
+                deferred.append(stream)
+                if not all or self.window == 0: break
                 continue
 
-            # removes the frame from both of the frame queues (both global
+            # removes the frame from both of the frame queues (both scheduler
             # and stream) so that it is no longer going to be used for flush
-            self.frames.pop(offset)
+            scheduler.pop(stream, size = payload_l)
             _stream.frames -= 1
 
             # decrements the current stream window by the size of the payload
@@ -762,11 +811,15 @@ class HTTP2Connection(http.HTTPConnection):
             self.increment_remote(stream, payload_l * -1, all = True)
             self.send_frame(*args, **kwargs)
 
+        # re-schedules the streams that have been deferred (connection window
+        # not large enough), they are going to be flushed on the next update
+        for stream in deferred: scheduler.schedule(stream)
+
         # returns the final result with a valid value meaning that all of the
         # flush operations have been successful (no frames pending in connection)
-        return True if offset == 0 else False
+        return True if len(scheduler) == 0 else False
 
-    def flush_available(self):
+    def flush_available(self, streams = None):
         """
         Runs the (became) available flush operation that tries to determine
         all the streams that were under the "blocked" state and became
@@ -774,17 +827,185 @@ class HTTP2Connection(http.HTTPConnection):
 
         This operation must be performed after any of the blocking constraints
         is changed (eg: connection window, stream window, etc.).
+
+        :type streams: List
+        :param streams: The identifiers of the streams whose (stream) window
+        has been changed, in case it's not provided the connection window is
+        considered changed and every stream not blocked by its own window
+        is tested.
         """
 
+        # in case the streams are provided (stream window update) only
+        # these streams may have been unblocked and so tested
+        if streams:
+            for stream in streams: self.try_available(stream)
+            return
+
         # iterates over the complete set of streams (identifiers) that are
         # currently under the unavailable/blocked state, to try to determine
-        # if they became unblocked by the "current operation"
+        # if they became unblocked by the "current operation", skipping the
+        # ones that are blocked in the scheduler (by their own window)
+        blocked = self.frames.blocked if self.frames else ()
         for stream in netius.legacy.keys(self.unavailable):
+            if stream in blocked: continue
             self.try_available(stream)
 
+    def push(self, path, headers = None, stream = None):
+        """
+        Pushes the resource with the provided path to the client in the
+        context of the (client initiated) stream, the resource is promised
+        to the client and then handled as a normal request of a new stream.
+
+        The push is not performed in case the client has disabled it or
+        in case the limit of concurrent (pushed) streams is reached.
+
+        :type path: String
+        :param path: The (absolute) path of the resource to be pushed.
+        :type headers: Dictionary
+        :param headers: The extra headers to be set in the request that
+        is going to be promised (and handled) for the resource.
+        :type stream: int
+        :param stream: The identifier of the stream that triggered the
+        push, in case it's not provided the current stream is used.
+        :rtype: HTTP2Stream
+        :return: The stream created for the pushed resource or an invalid
+        value in case it was not possible to push the resource.
+        """
+
+        # in case the connection is not running under http 2 or the client
+        # has disabled the server push there's nothing to be done
+        if self.legacy: return None
+        if not self.settings_r[netius.common.http2.SETTINGS_ENABLE_PUSH]: return None
+
+        # retrieves the stream that triggered the push (parent stream) and
+        # verifies that it's still open and that it has been initiated by
+        # the client (pushed streams cannot trigger pushes)
+        stream = stream or (self.parser.stream_o and self.parser.stream_o.identifier)
+        if not stream or stream % 2 == 0: return None
+        parent = self.parser._get_stream(stream, strict = False)
+        if not parent or not parent.is_open(): return None
+
+        # verifies if the number of pushed streams currently open does not
+        # exceed the maximum number of concurrent streams of the client
+        concurrent = self.settings_r[netius.common.http2.SETTINGS_MAX_CONCURRENT_STREAMS]
+        if self.parser._pushing >= concurrent: return None
+
+        # retrieves the scheme and the authority of the original request so
+        # that the promised request is created for the same origin
+        pseudos = dict((key, value) for key, value in parent.headers_l if key[0] == ":")
+        scheme = pseudos.get(":scheme", "https" if self.ssl else "http")
+        authority = pseudos.get(":authority", None) or parent.headers.get("host", None)
+
+        # builds the complete set of headers for the promised request, taking
+        # into account the headers of the original request that affect the
+        # negotiation of the response and the extra ones provided
+        headers_l = [
+            (":method", "GET"),
+            (":scheme", scheme),
+            (":path", path)
+        ]
+        if authority: headers_l.append((":authority", authority))
+        for name in PUSH_HEADERS:
+            value = parent.headers.get(name, None)
+            if value == None: continue
+            if not type(value) == list: value = (value,)
+            for _value in value: headers_l.append((name, _value))
+        if headers:
+            for key, value in headers.items():
+                headers_l.append((netius.common.header_down(key), value))
+
+        # determines the identifier of the promised stream (even values are
+        # reserved for the server) and sends the promise to the client under
+        # the original stream, this must happen before any reference to it
+        identifier = self.parser._max_push + 2
+        self.send_push_promise(
+            headers = headers_l,
+            promised_stream = identifier,
+            stream = stream
+        )
+
+        # creates the stream that represents the promised request, this
+        # stream is (from the start) half closed on the client side as all
+        # of its (request) headers and data are known at this stage
+        pushed = netius.common.HTTP2Stream(
+            owner = self.parser,
+            identifier = identifier,
+            dependency = stream,
+            end_headers = True,
+            end_stream = True,
+            store = self.parser.store,
+            file_limit = self.parser.file_limit,
+            window = self.settings_r[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE],
+            frame_size = self.settings_r[netius.common.http2.SETTINGS_MAX_FRAME_SIZE]
+        )
+        pushed.headers_l = headers_l
+        pushed.open()
+        pushed._calculate()
+        self.parser._set_push(pushed)
+
+        # schedules the handling of the promised request for the next tick
+        # so that the response to the original request is the first one
+        # to be sent (the client is waiting for it)
+        def handle():
+            if not pushed.is_open(): return
+            stream_o = self.parser.stream_o
+            self.parser.stream_o = pushed
+            try: self.on_data()
+            except BaseException as exception:
+                self.owner.on_exception(exception, self)
+            finally:
+                if self.parser: self.parser.stream_o = stream_o
+
+        self.owner.delay(handle, immediately = True)
+        return pushed
+
+    def preload(self, paths, stream = None):
+        # in case the legacy mode is enabled the preload operation is
+        # forwarded to the upper layers (early hints are used)
+        if self.legacy: return http.HTTPConnection.preload(
+            self,
+            paths,
+            stream = stream
+        )
+
+        # retrieves the identifier of the stream that is preloading the
+        # resources, pushed streams (even) are not allowed to preload
+        stream = stream or (self.parser.stream_o and self.parser.stream_o.identifier)
+        if not stream or stream % 2 == 0: return 0
+
+        # tries to push each of the resources to the client and for the
+        # ones that could not be pushed (eg: push is disabled) the early
+        # hints strategy is used instead, so that no resource is lost
+        paths = [path for path in paths if not self.push(path, stream = stream)]
+        if not paths: return 0
+        return http.HTTPConnection.preload(self, paths, stream = stream)
+
+    def discard_frames(self, stream):
+        """
+        Discards the complete set of frames pending (delayed) for the
+        stream with the provided identifier, should be called when the
+        stream is closed, as its frames are not going to be sent.
+
+        :type stream: int
+        :param stream: The identifier of the stream to discard frames.
+        """
+
+        if not self.frames: return
+        self.frames.discard(stream)
+
     def set_settings(self, settings):
+        # the (remote) settings are shared with the defaults until they're
+        # changed by the peer, so a copy is created before the update (this
+        # is a rare operation) avoiding one map per connection
+        self.settings_r = dict(self.settings_r)
         self.settings_r.update(settings)
 
+        # in case the peer has changed the size of the header table that
+        # it's willing to keep for the decoding of the headers the encoder
+        # must be resized accordingly (and the change signaled)
+        size = settings.get(netius.common.http2.SETTINGS_HEADER_TABLE_SIZE, None)
+        if not size == None: self.parser.encoder.resize(min(size, netius.common.hpack.TABLE_SIZE))
+
     def close_stream(self, stream, final = False, flush = False, reset = False):
         if not self.parser._has_stream(stream): return
         stream = self.parser._get_stream(stream)
@@ -1006,9 +1227,11 @@ class HTTP2Connection(http.HTTPConnection):
         self.owner.on_goaway_http2(self, self.parser, last_stream, error_code, extra)
 
     def on_window_update(self, stream, increment):
-        self.increment_remote(stream and stream.identifier, increment)
-        self.flush_frames()
-        self.flush_available()
+        identifier = stream and stream.identifier
+        streams = (identifier,) if identifier else None
+        self.increment_remote(identifier, increment)
+        self.flush_frames(streams = streams)
+        self.flush_available(streams = streams)
         self.owner.on_window_update_http2(self, self.parser, stream, increment)
 
     def on_continuation(self, stream):
@@ -1181,12 +1404,6 @@ class HTTP2Server(http.HTTPServer):
         is_debug and self._log_send(connection, parser, type, flags, payload, stream)
 
     def _has_h2(self):
-        if not self._has_hpack(): return False
-        return True
-
-    def _has_hpack(self):
-        try: import hpack #@UnusedImport
-        except: return False
         return True
 
     def _handle_exception(self, exception, connection):
@@ -1289,9 +1506,21 @@ class HTTP2Server(http.HTTPServer):
         error_code, = struct.unpack("!I", payload)
         self.debug("Frame RST_STREAM with error code %d" % error_code)
 
+    def _log_frame_push_promise(self, parser, flags, payload, stream, out):
+        flags_l = self._flags_l(
+            flags,
+            (
+                ("END_HEADERS", 0x04),
+                ("PADDED", 0x08)
+            )
+        )
+        self._log_frame_flags("PUSH_PROMISE", *flags_l)
+        promised_stream, = struct.unpack("!I", payload[:4])
+        self.debug("Frame PUSH_PROMISE with promised stream %d" % promised_stream)
+
     def _log_frame_goaway(self, parser, flags, payload, stream, out):
         last_stream, error_code = struct.unpack("!II", payload[:8])
-        extra = payload[8:]
+        extra = netius.legacy.bytes(payload[8:])
         self.debug(
             "Frame GOAWAY with last stream %d, error code %d and message %s" %\
             (last_stream, error_code, extra)
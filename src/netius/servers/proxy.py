@@ -97,6 +97,7 @@ class ProxyServer(http2.HTTP2Server):
         dynamic = True,
         throttle = True,
         trust_origin = False,
+        upstream_h2 = False,
         max_pending = MAX_PENDING,
         *args,
         **kwargs
@@ -111,25 +112,13 @@ class ProxyServer(http2.HTTP2Server):
         self.dynamic = dynamic
         self.throttle = throttle
         self.trust_origin = trust_origin
+        self.upstream_h2 = upstream_h2
         self.max_pending = max_pending
         self.min_pending = int(max_pending * MIN_RATIO)
         self.conn_map = {}
+        self.client_args = (args, kwargs)
 
-        self.http_client = netius.clients.HTTPClient(
-            thread = False,
-            auto_release = False,
-            receive_buffer = max_pending,
-            send_buffer = max_pending,
-            *args,
-            **kwargs
-        )
-        self.http_client.bind("headers", self._on_prx_headers)
-        self.http_client.bind("message", self._on_prx_message)
-        self.http_client.bind("partial", self._on_prx_partial)
-        self.http_client.bind("connect", self._on_prx_connect)
-        self.http_client.bind("acquire", self._on_prx_acquire)
-        self.http_client.bind("close", self._on_prx_close)
-        self.http_client.bind("error", self._on_prx_error)
+        self.http_client = None
 
         self.raw_client = netius.clients.RawClient(
             thread = False,
@@ -144,9 +133,10 @@ class ProxyServer(http2.HTTP2Server):
 
         self.container = netius.Container(*args, **kwargs)
         self.container.add_base(self)
-        self.container.add_base(self.http_client)
         self.container.add_base(self.raw_client)
 
+        self._set_client()
+
     def start(self):
         # starts the container this should trigger the start of the
         # event loop in the container and the proper listening of all
@@ -171,6 +161,7 @@ class ProxyServer(http2.HTTP2Server):
         info.update(
             dynamic = self.dynamic,
             throttle = self.throttle,
+            upstream_h2 = self.upstream_h2,
             max_pending = self.max_pending,
             min_pending = self.min_pending,
             http_client = self.http_client.info_dict(full = full),
@@ -191,9 +182,16 @@ class ProxyServer(http2.HTTP2Server):
         # tries to retrieve the reference to the tunnel connection
         # currently set in the connection in case it does not exists
         # (initial handshake or http client proxy) runs the parse
-        # step on the data and then returns immediately
+        # step on the data and then returns immediately, note that
+        # the data after the tunnel request (if any) is written ahead
+        # to the tunnel connection as it's not part of the http message
         tunnel_c = hasattr(connection, "tunnel_c") and connection.tunnel_c
-        if not tunnel_c: connection.parse(data); return
+        if not tunnel_c:
+            count = connection.parse(data)
+            tunnel_c = hasattr(connection, "tunnel_c") and connection.tunnel_c
+            if tunnel_c and count < len(data):
+                tunnel_c.send(data[count:], force = True)
+            return
 
         # verifies that the current size of the pending buffer is greater
         # than the maximum size for the pending buffer the read operations
@@ -236,10 +234,13 @@ class ProxyServer(http2.HTTP2Server):
         if self.env: self.dynamic = self.get_env("DYNAMIC", self.dynamic, cast = bool)
         if self.env: self.throttle = self.get_env("THROTTLE", self.throttle, cast = bool)
         if self.env: self.trust_origin = self.get_env("TRUST_ORIGIN", self.trust_origin, cast = bool)
+        if self.env: self.upstream_h2 = self.get_env("UPSTREAM_H2", self.upstream_h2, cast = bool)
+        self._set_client()
         if self.dynamic: self.info("Using dynamic encoding (no content re-encoding) in proxy ...")
         if self.throttle: self.info("Throttling connections in proxy ...")
         else: self.info("Not throttling connections in proxy ...")
         if self.trust_origin: self.info("Origin is considered \"trustable\" by proxy")
+        if self.upstream_h2: self.info("Using HTTP2 for upstream connections in proxy ...")
 
     def on_data_http(self, connection, parser):
         http2.HTTP2Server.on_data_http(self, connection, parser)
@@ -290,6 +291,38 @@ class ProxyServer(http2.HTTP2Server):
             min_pending = self.min_pending
         )
 
+    def _set_client(self):
+        # determines the class of the client to be used for the upstream
+        # (back-end) connections, in case the HTTP2 upstream is requested
+        # the requests are multiplexed as streams over a few connections
+        if self.upstream_h2: client_c = netius.clients.HTTP2Client
+        else: client_c = netius.clients.HTTPClient
+
+        # in case the current client is already of the requested class
+        # there's nothing to be done, otherwise the previous client (if
+        # any) is replaced in the container, this happens before the
+        # container is started so no back-end connections exist
+        if self.http_client.__class__ == client_c: return
+        if self.http_client: self.container.remove_base(self.http_client)
+
+        args, kwargs = self.client_args
+        self.http_client = client_c(
+            thread = False,
+            auto_release = False,
+            receive_buffer = self.max_pending,
+            send_buffer = self.max_pending,
+            *args,
+            **kwargs
+        )
+        self.http_client.bind("headers", self._on_prx_headers)
+        self.http_client.bind("message", self._on_prx_message)
+        self.http_client.bind("partial", self._on_prx_partial)
+        self.http_client.bind("connect", self._on_prx_connect)
+        self.http_client.bind("acquire", self._on_prx_acquire)
+        self.http_client.bind("close", self._on_prx_close)
+        self.http_client.bind("error", self._on_prx_error)
+        self.container.add_base(self.http_client)
+
     def _throttle(self, _connection):
         if not _connection.is_restored(): return
         connection = self.conn_map[_connection]
@@ -331,6 +364,11 @@ class ProxyServer(http2.HTTP2Server):
         status_s = parser.status_s
         version_s = parser.version_s
 
+        # the version of the response is only relayed for HTTP 1.x back-ends
+        # as an HTTP2 response is sent to the client as an HTTP 1.1 one (the
+        # front-end connection defines its own version for HTTP2 clients)
+        if parser.version == netius.common.http2.HTTP_20: version_s = "HTTP/1.1"
+
         # creates a new dictionary from the provided one, so that no overlap
         # in values occurs (would destroy the original data)
         headers = dict(headers)
@@ -458,9 +496,16 @@ class ProxyServer(http2.HTTP2Server):
         connection = self.conn_map.get(_connection, None)
         if not connection: return
 
+        # verifies if the back-end is an HTTP2 stream that has been
+        # closed before any response was received for it, this is the
+        # case for back-ends that do not support HTTP2 (no preface)
+        is_h2 = isinstance(_connection, netius.clients.HTTP2Request)
+        is_unanswered = is_h2 and _connection.parser.code == None
+
         # in case the connection is under the waiting state
-        # the forbidden response is set to the client otherwise
-        # the front-end connection is closed immediately
+        # the forbidden response is set to the client, in case
+        # no response was received the bad gateway one is sent
+        # otherwise the front-end connection is closed immediately
         if _connection.waiting: connection.send_response(
             data = "Forbidden",
             headers = dict(
@@ -471,6 +516,16 @@ class ProxyServer(http2.HTTP2Server):
             apply = True,
             callback = self._prx_close
         )
+        elif is_unanswered: connection.send_response(
+            data = "Bad Gateway",
+            headers = dict(
+                connection = "close"
+            ),
+            code = 502,
+            code_s = "Bad Gateway",
+            apply = True,
+            callback = self._prx_close
+        )
         else: connection.close(flush = True)
 
         # removes the waiting state from the connection and
@@ -38,6 +38,9 @@ __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
 import sys
+import time
+import threading
+import collections
 
 import netius
 
@@ -54,6 +57,188 @@ COMPRESSED_LIMIT = 1048576
 content, this should ensure proper resource usage avoiding extreme
 high levels of resource usage for compression of large files """
 
+THREADED_WORKERS = 10
+""" The default number of worker threads that are going to be
+used for the execution of the application under the threaded
+mode, this value limits the number of concurrent app calls """
+
+THREADED_PENDING = 256
+""" The default maximum number of work items that may be waiting
+in the queue of the worker pool, new requests received while this
+limit is reached are rejected (service unavailable) """
+
+INPUT_LIMIT = 1048576
+""" The default maximum number of bytes of the request payload
+that are buffered for a streamed input before the reading from
+the connection is paused (until the application consumes it) """
+
+class WSGIInput(object):
+    """
+    Streamed input (file like) object for the request payload, the
+    chunks of data are pushed as they are received by the event loop
+    thread and read (blocking) by the application, that is running in
+    a worker thread, avoiding the buffering of the complete payload.
+
+    The amount of buffered data is bounded by a limit from which the
+    pause flag is set, so that the reading of the connection is paused
+    until the application consumes (at least half of) the data.
+    """
+
+    def __init__(self, limit = INPUT_LIMIT, callback = None):
+        self.limit = limit
+        self.callback = callback
+        self.chunks = collections.deque()
+        self.size = 0
+        self.wanted = 0
+        self.paused = False
+        self.finished = False
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line: break
+            yield line
+
+    def read(self, size = -1):
+        with self.condition:
+            self._wait(size)
+            return self._pop(size)
+
+    def readline(self, size = -1):
+        with self.condition:
+            self._wait(size, line = True)
+            index = self._index()
+            count = index + 1 if index >= 0 else self.size
+            if size >= 0: count = min(count, size)
+            return self._pop(count)
+
+    def readlines(self, hint = -1):
+        lines = []
+        count = 0
+        while True:
+            line = self.readline()
+            if not line: break
+            lines.append(line)
+            count += len(line)
+            if hint > 0 and count >= hint: break
+        return lines
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.chunks.clear()
+            self.size = 0
+            self.condition.notify_all()
+            if self.paused: self._resume()
+
+    def push(self, data):
+        """
+        Adds the provided chunk of data to the input, should be called
+        from the event loop thread as the data is received.
+
+        :type data: String
+        :param data: The chunk of (payload) data that has been received.
+        :rtype: bool
+        :return: If the input has been paused, meaning that the reading
+        from the connection should be paused until the input is resumed.
+        """
+
+        # the chunk is converted into a bytes value in case it's a memory
+        # view as the line based operations (find) are not available on it
+        if type(data) == memoryview: data = data.tobytes()
+
+        with self.condition:
+            if self.closed: return False
+            self.chunks.append(data)
+            self.size += len(data)
+            self.condition.notify_all()
+            if self.size < self.limit or self.size <= self.wanted: return False
+            self.paused = True
+            return True
+
+    def finish(self):
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def _wait(self, size, line = False):
+        # sets the amount of data wanted by the reader (so that the input
+        # is not paused before it's available) and waits until either the
+        # wanted data (or line) is available or no more data is expected
+        self.wanted = size if size >= 0 else sys.maxsize
+        try:
+            while not self.finished and not self.closed:
+                if self.size >= self.wanted: break
+                if line and self._index() >= 0: break
+                if self.paused: self._resume()
+                self.condition.wait()
+        finally:
+            self.wanted = 0
+
+    def _pop(self, size):
+        # in case the complete set of buffered data is requested the
+        # chunks are joined, otherwise the chunks are removed until the
+        # requested size is reached (the last one is split if required)
+        if size < 0 or size >= self.size:
+            data = b"".join(self.chunks)
+            self.chunks.clear()
+        else:
+            buffer = []
+            pending = size
+            while pending > 0:
+                chunk = self.chunks.popleft()
+                if len(chunk) > pending:
+                    self.chunks.appendleft(chunk[pending:])
+                    chunk = chunk[:pending]
+                buffer.append(chunk)
+                pending -= len(chunk)
+            data = b"".join(buffer)
+
+        # updates the size of the buffered data and in case the input
+        # is paused and the data has been consumed resumes it, note that
+        # only half of the limit is used to avoid constant pausing
+        self.size -= len(data)
+        if self.paused and self.size <= self.limit // 2: self._resume()
+        return data
+
+    def _index(self):
+        offset = 0
+        for chunk in self.chunks:
+            index = chunk.find(b"\n")
+            if index >= 0: return offset + index
+            offset += len(chunk)
+        return -1
+
+    def _resume(self):
+        self.paused = False
+        if self.callback: self.callback()
+
+class WSGIConnection(http2.HTTP2Connection):
+
+    __slots__ = (
+        "input",
+    )
+
+    def __init__(self, *args, **kwargs):
+        http2.HTTP2Connection.__init__(self, *args, **kwargs)
+        self.input = None
+
+    def open(self, *args, **kwargs):
+        http2.HTTP2Connection.open(self, *args, **kwargs)
+        if not self.legacy: return
+        if not self.owner.streaming: return
+        self.parser.store = False
+        self.parser.bind("on_headers", self.on_headers)
+        self.parser.bind("on_partial", self.on_partial)
+
+    def on_headers(self):
+        self.owner.on_headers_http(self.connection_ctx, self.parser_ctx)
+
+    def on_partial(self, data):
+        self.owner.on_partial_http(self.connection_ctx, self.parser_ctx, data)
+
 class WSGIServer(http2.HTTP2Server):
     """
     Base class for the creation of a wsgi compliant server
@@ -61,28 +246,142 @@ class WSGIServer(http2.HTTP2Server):
     object as reference and a mount point.
     """
 
-    def __init__(self, app, mount = "", decode = True, *args, **kwargs):
+    def __init__(
+        self,
+        app,
+        mount = "",
+        decode = True,
+        threaded = False,
+        workers = THREADED_WORKERS,
+        max_pending = THREADED_PENDING,
+        streaming = False,
+        input_limit = INPUT_LIMIT,
+        *args,
+        **kwargs
+    ):
         http2.HTTP2Server.__init__(self, *args, **kwargs)
         self.app = app
         self.mount = mount
         self.mount_l = len(mount)
         self.decode = decode
+        self.threaded = threaded
+        self.workers = workers
+        self.max_pending = max_pending
+        self.streaming = streaming
+        self.input_limit = input_limit
+        self._executed = 0
+        self._rejected = 0
+        self._wait = 0.0
+        self._wait_max = 0.0
+
+    def info_dict(self, full = False):
+        info = http2.HTTP2Server.info_dict(self, full = full)
+        info.update(
+            mount = self.mount,
+            threaded = self.threaded,
+            streaming = self.streaming
+        )
+        if self.threaded: info.update(
+            workers = self.workers,
+            max_pending = self.max_pending,
+            queue = len(self.tpool.queue) if self.tpool else 0,
+            executed = self._executed,
+            rejected = self._rejected,
+            wait_avg = self._wait / self._executed if self._executed else 0.0,
+            wait_max = self._wait_max
+        )
+        return info
+
+    def on_serve(self):
+        http2.HTTP2Server.on_serve(self)
+        if self.env: self.threaded = self.get_env("WSGI_THREADED", self.threaded, cast = bool)
+        if self.env: self.workers = self.get_env("WSGI_WORKERS", self.workers, cast = int)
+        if self.env: self.max_pending = self.get_env("WSGI_PENDING", self.max_pending, cast = int)
+        if self.env: self.streaming = self.get_env("WSGI_STREAMING", self.streaming, cast = bool)
+        if self.env: self.input_limit = self.get_env("WSGI_INPUT_LIMIT", self.input_limit, cast = int)
+        if self.streaming and not self.threaded:
+            self.warning("Streaming input requires threaded mode, disabling it ...")
+            self.streaming = False
+        if not self.threaded: return
+        self.info("Starting WSGI server with %d worker threads ..." % self.workers)
+        self.tstart(count = self.workers)
+
+    def new_connection(self, socket, address, ssl = False):
+        return WSGIConnection(
+            owner = self,
+            socket = socket,
+            address = address,
+            ssl = ssl,
+            encoding = self.encoding,
+            legacy = self.legacy,
+            settings = self.settings
+        )
 
     def on_connection_d(self, connection):
         http2.HTTP2Server.on_connection_d(self, connection)
 
+        # runs the extra release queue operation for the connection so that
+        # the (possible) associated queue is properly release (no leaks)
+        self._release_queue(connection)
+
+        # closes the (possible) streamed input that is still being received
+        # so that a worker thread blocked reading from it is unblocked
+        self._release_input(connection)
+
+        # in case the connection is still being handled by a worker thread
+        # the release of its structures (iterator and environ) is deferred
+        # until the worker finishes as they are still in use by it
+        if self._executing(connection): return
+
         # tries to run the releasing operation on the current connection
         # so that the proper destruction of objects is performed avoiding
         # leaving any extra memory leak (would create problems)
         self._release(connection)
 
-        # runs the extra release queue operation for the connection so that
-        # the (possible) associated queue is properly release (no leaks)
-        self._release_queue(connection)
-
     def on_data_http(self, connection, parser):
+        # in case there's a streamed input associated with the connection
+        # the request has already been handled (at headers time) and the
+        # only remaining operation is the marking of the input as finished
+        input = hasattr(connection, "input") and connection.input
+        if input:
+            connection.input = None
+            input.finish()
+            return
+
         http2.HTTP2Server.on_data_http(self, connection, parser)
 
+        # handles the request using a buffer with the complete message
+        # as the input, note that a copy of it is used as the parser may
+        # be re-used for the next (pipelined) request
+        input = parser.get_message_b(copy = True)
+        self.on_request(connection, parser, input)
+
+    def on_headers_http(self, connection, parser):
+        # in case the request has no payload there's nothing to be streamed
+        # and the request is handled once the (empty) message is complete
+        if not parser.chunked and parser.content_l <= 0: return
+
+        http2.HTTP2Server.on_data_http(self, connection, parser)
+
+        # creates the streamed input that is going to be filled with the
+        # payload as it's received and handles the request with it, so
+        # that the application is called without waiting for the payload
+        input = WSGIInput(
+            limit = self.input_limit,
+            callback = lambda: self._resume(connection)
+        )
+        connection.input = input
+        self.on_request(connection, parser, input)
+
+    def on_partial_http(self, connection, parser, data):
+        # pushes the data into the streamed input and in case the input
+        # has reached its limit pauses the reading from the connection
+        # until the application consumes (part of) the buffered data
+        input = connection.input
+        if not input: return
+        if input.push(data): connection.disable_read()
+
+    def on_request(self, connection, parser, input):
         # retrieves the path for the current request and then retrieves
         # the query string part for it also, after that computes the
         # path info value as the substring of the path without the mount
@@ -122,18 +421,23 @@ class WSGIServer(http2.HTTP2Server):
         )
 
         # updates the environment map with all the structures referring
-        # to the wsgi specifications note that the message is retrieved
-        # as a buffer to be able to handle the file specific operations
+        # to the wsgi specifications note that the input is either a buffer
+        # with the complete message or a stream of the message payload
         environ["wsgi.version"] = (1, 0)
         environ["wsgi.url_scheme"] = scheme
-        environ["wsgi.input"] = parser.get_message_b(copy = True)
+        environ["wsgi.input"] = input
         environ["wsgi.errors"] = sys.stderr
-        environ["wsgi.multithread"] = False
+        environ["wsgi.multithread"] = self.threaded
         environ["wsgi.multiprocess"] = False
         environ["wsgi.run_once"] = False
         environ["wsgi.server_name"] = netius.NAME
         environ["wsgi.server_version"] = netius.VERSION
 
+        # sets the netius specific extension that allows the application
+        # to preload resources linked with the response, these resources
+        # are either pushed (HTTP 2) or hinted (HTTP 1.1) to the client
+        environ["netius.preload"] = lambda paths: self._preload(connection, paths)
+
         # iterates over all the header values that have been received
         # to set them in the environment map to be used by the wsgi
         # infra-structure, not that their name is capitalized as defined
@@ -146,8 +450,11 @@ class WSGIServer(http2.HTTP2Server):
         # verifies if the connection already has an iterator associated with
         # it, if that's the case the connection is already in use and the current
         # request processing must be delayed for future processing, this is
-        # typically associated with http pipelining
-        if hasattr(connection, "iterator") and connection.iterator:
+        # typically associated with http pipelining, note that a connection
+        # with work pending in the worker pool is also considered to be in use
+        is_used = hasattr(connection, "iterator") and connection.iterator
+        is_used = is_used or self._executing(connection)
+        if is_used:
             if not hasattr(connection, "queue"): connection.queue = []
             connection.queue.append(environ)
             return
@@ -157,6 +464,11 @@ class WSGIServer(http2.HTTP2Server):
         self.on_environ(connection, environ)
 
     def on_environ(self, connection, environ):
+        # in case the threaded mode is enabled the application is meant
+        # to be called from a worker thread, so that a slow (blocking)
+        # application does not stall the complete event loop
+        if self.threaded: return self.on_environ_t(connection, environ)
+
         # method created as a clojure that handles the starting of
         # response as defined in the wsgi standards
         def start_response(status, headers):
@@ -178,6 +490,42 @@ class WSGIServer(http2.HTTP2Server):
         # connection associated (recursive approach)
         self._send_part(connection)
 
+    def on_environ_t(self, connection, environ):
+        # verifies if the queue of the worker pool has already reached the
+        # maximum number of pending items, if that's the case the request is
+        # rejected so that the amount of pending work remains bounded, note
+        # that the pool may not be started yet (started on first execution)
+        pending = len(self.tpool.queue) if self.tpool else 0
+        if pending >= self.max_pending:
+            self._reject(connection, environ)
+            return
+
+        # method created as a clojure that handles the starting of
+        # response as defined in the wsgi standards, as this is called
+        # from the worker thread the status and headers are only stored
+        # and are latter sent from the event loop thread (not thread safe)
+        def start_response(status, headers):
+            connection.response = (status, headers)
+
+        # creates the clojure that is going to be executed in the worker
+        # thread, running the app logic and creating the iterator
+        def call():
+            sequence = self.app(environ, start_response)
+            return iter(sequence)
+
+        # sets the environment map in the connection for latter retrieval
+        # and schedules the app call in the worker pool, the resulting
+        # iterator is then handled in the event loop thread
+        connection.environ = environ
+        connection.response = None
+        self._texecute(connection, call, callback = self._on_iterator)
+
+    def _on_iterator(self, connection, iterator):
+        # sets the iterator (created in the worker thread) in the connection
+        # and triggers the start of the connection iterator flushing operation
+        connection.iterator = iterator
+        self._send_part(connection)
+
     def _next_queue(self, connection):
         # verifies if the current connection already contains a reference to
         # the queue structure that handles the queueing/pipelining of requests
@@ -267,15 +615,33 @@ class WSGIServer(http2.HTTP2Server):
         )
 
     def _send_part(self, connection):
+        # extracts both the iterator from the connection object so that
+        # it may be used for the current set of operations
+        iterator = connection.iterator
+
+        # in case the threaded mode is enabled the retrieval of the next
+        # value from the iterator (that may block) is performed in the
+        # worker pool and the resulting value handled in the event loop
+        if self.threaded:
+            self._texecute(
+                connection,
+                self._next,
+                args = (iterator,),
+                callback = self._send_data
+            )
+            return
+
+        # retrieves the next value from the iterator and sends it through
+        # the connection, in the same (event loop) thread
+        result = self._next(iterator)
+        self._send_data(connection, result)
+
+    def _next(self, iterator):
         # unsets the is final flag and invalidates the data object to the
         # original unset value, these are the default values
         is_final = False
         data = None
 
-        # extracts both the iterator from the connection object so that
-        # it may be used for the current set of operations
-        iterator = connection.iterator
-
         # tries to retrieve data from the current iterator and in
         # case the stop iteration is received sets the is final flag
         # so that no more data is sent through the connection
@@ -286,6 +652,19 @@ class WSGIServer(http2.HTTP2Server):
         # by the underlying server infra-structure
         if data: data = netius.legacy.bytes(data)
 
+        # returns a tuple containing both the data and the final flag
+        # so that it may be used for the sending of the data
+        return (data, is_final)
+
+    def _send_data(self, connection, result):
+        # unpacks the result of the iterator step into the data and the
+        # final flag, that control the sending of data to the connection
+        data, is_final = result
+
+        # flushes any pending response start (status and headers) that
+        # may have been set by the application from a worker thread
+        self._flush_response(connection)
+
         # verifies if the current value in iteration is a future element
         # and if that's the case creates the proper callback to be used
         # for the handling on the end of the iteration
@@ -321,6 +700,18 @@ class WSGIServer(http2.HTTP2Server):
             callback = self._send_part
         )
 
+    def _flush_response(self, connection):
+        # tries to retrieve the pending response (status and headers) for
+        # the connection and in case there's none returns immediately
+        response = hasattr(connection, "response") and connection.response
+        if not response: return
+
+        # unsets the pending response and runs the start response operation
+        # (sending the headers) from the current (event loop) thread
+        connection.response = None
+        status, headers = response
+        self._start_response(connection, status, headers)
+
     def _final(self, connection):
         # retrieves the parser of the current connection and then determines
         # if the current connection is meant to be kept alive
@@ -341,6 +732,119 @@ class WSGIServer(http2.HTTP2Server):
     def _close(self, connection):
         connection.close(flush = True)
 
+    def _reject(self, connection, environ):
+        # increments the number of rejected requests and prints a warning
+        # message about the rejection (the worker pool is exhausted)
+        self._rejected += 1
+        self.warning("Rejecting request, worker pool queue is full")
+
+        # sets the environ in the connection so that it's properly released
+        # on close and sends the service unavailable response to the client
+        # closing the connection after the sending of the response
+        connection.environ = environ
+        connection.send_response(
+            data = "Service Unavailable",
+            headers = dict(
+                connection = "close"
+            ),
+            code = 503,
+            code_s = "Service Unavailable",
+            apply = True,
+            callback = self._close
+        )
+
+    def _resume(self, connection):
+        # creates the handler that re-enables the reading from the
+        # connection, to be called in the event loop thread as the
+        # resume operation is typically triggered from a worker thread
+        def handler():
+            self.tpool.denotify()
+            connection.enable_read()
+
+        self.delay_s(handler)
+        self.tpool.notify()
+
+    def _executing(self, connection):
+        return hasattr(connection, "executing") and connection.executing
+
+    def _preload(self, connection, paths):
+        # in case the application is running in the event loop thread
+        # the preload operation is performed immediately
+        if not self.threaded: return connection.preload(paths)
+
+        # creates the handler that is going to run the preload operation
+        # in the event loop thread (the connection is not thread safe),
+        # this is scheduled before the response as it's called first
+        def handler():
+            self.tpool.denotify()
+            if not connection.is_open(): return
+            connection.preload(paths)
+
+        self.delay_s(handler)
+        self.tpool.notify()
+
+    def _texecute(self, connection, callable, args = (), callback = None):
+        # marks the connection as executing (in the worker pool) so that no
+        # other work is scheduled for it, preserving the order of operations,
+        # and stores the submission time to measure the waiting time
+        connection.executing = True
+        submitted = time.time()
+
+        # makes sure that the worker pool is started, as the server may
+        # not have been started through the serve operation (eg: embedded)
+        self.tensure(count = self.workers)
+
+        def execute():
+            # runs the callable in the current (worker) thread capturing
+            # both the result and any exception that may be raised
+            started = time.time()
+            try: result, error = callable(*args), None
+            except BaseException as exception: result, error = None, exception
+
+            # creates the handler that is going to be called in the event loop
+            # thread and notifies the task pool event so that the event loop
+            # gets unblocked and processes the result on its own thread
+            def handler():
+                self.tpool.denotify()
+                self._tdone(
+                    connection,
+                    result,
+                    error,
+                    started - submitted,
+                    callback = callback
+                )
+
+            self.delay_s(handler)
+            self.tpool.notify()
+
+        self.tpool.execute(execute)
+
+    def _tdone(self, connection, result, error, wait, callback = None):
+        # unsets the executing flag and updates the statistics of the
+        # worker pool with the time the work has been waiting in queue
+        connection.executing = False
+        self._executed += 1
+        self._wait += wait
+        self._wait_max = max(self._wait_max, wait)
+
+        # in case the connection has been closed meanwhile its release
+        # (that has been deferred) is performed and no more work is done
+        if not connection.status == netius.OPEN:
+            self._release(connection)
+            return
+
+        # in case an exception has been raised in the worker thread it's
+        # re-raised in the current thread and handled as expected
+        if error:
+            try: raise error
+            except BaseException as exception:
+                self.on_exception(exception, connection)
+            return
+
+        # calls the callback with the result of the execution, this
+        # is going to continue the handling in the event loop thread
+        if callback: callback(connection, result)
+
     def _release(self, connection):
         self._release_iterator(connection)
         self._release_environ(connection)
@@ -385,6 +889,14 @@ class WSGIServer(http2.HTTP2Server):
         # current memory structures associated with the parser
         connection.parser.close()
 
+    def _release_input(self, connection):
+        # tries to retrieve the streamed input that is still being
+        # received for the connection and closes it (unblocking readers)
+        input = hasattr(connection, "input") and connection.input
+        if not input: return
+        connection.input = None
+        input.close()
+
     def _release_queue(self, connection):
         # tries to retrieve a possible defined queue for the provided
         # connection in case it does not exist returns immediately as
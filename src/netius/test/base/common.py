@@ -0,0 +1,173 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import sys
+import time
+import signal
+import threading
+import unittest
+
+import netius
+
+DRAIN = """
+import sys, time, signal
+def handler(signum, frame): time.sleep(0.5); sys.exit(0)
+signal.signal(signal.SIGTERM, handler)
+time.sleep(30)
+"""
+
+class SupervisedBase(netius.Base):
+
+    def __init__(self, *args, **kwargs):
+        netius.Base.__init__(self, *args, **kwargs)
+        self.released = []
+        self.acquired = []
+
+    def _release(self, index):
+        netius.Base._release(self, index)
+        self.released.append((index, time.time()))
+
+    def _acquire(self, index):
+        netius.Base._acquire(self, index)
+        self.acquired.append((index, time.time()))
+
+    def _spawn(self, index):
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0: os.execv(sys.executable, [sys.executable, "-c", DRAIN])
+        os.close(wfd)
+        self._register(pid, index, rfd)
+        time.sleep(0.2)
+        return pid
+
+class SupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        if not hasattr(os, "fork"): self.skipTest("No fork support")
+        if not hasattr(signal, "SIGHUP"): self.skipTest("No hangup signal")
+
+    def test_restart(self):
+        base = SupervisedBase()
+        for index in range(2): base._spawn(index)
+        previous = list(base._childs)
+
+        try:
+            start = time.time()
+            self.assertEqual(base._restart(), False)
+            self.assertEqual(time.time() - start < 0.45, True)
+            self.assertEqual(len(base._childs), 3)
+            self.assertEqual(base._draining, [previous[0]])
+            self.assertEqual(base._replacing, [previous[1]])
+
+            self.assertEqual(base._replace(), False)
+            self.assertEqual(len(base._childs), 3)
+
+            result = []
+            thread = threading.Thread(target = lambda: result.append(base._supervise()))
+            thread.daemon = True
+            thread.start()
+
+            for _index in range(100):
+                replaced = not set(base._childs) & set(previous)
+                if replaced and not base._draining: break
+                time.sleep(0.05)
+
+            base._signals.append(signal.SIGTERM)
+            thread.join(5.0)
+
+            self.assertEqual(result, [False])
+            self.assertEqual(base._draining, [])
+            self.assertEqual(len(base._childs), 2)
+            self.assertEqual(set(base._childs) & set(previous), set())
+            self.assertEqual(
+                sorted(worker["index"] for worker in base._workers.values()),
+                [0, 1]
+            )
+        finally:
+            for pid in list(base._childs): base._join(pid)
+
+    def test_respawn(self):
+        base = SupervisedBase()
+        base._spawn(0)
+
+        result = []
+        thread = threading.Thread(target = lambda: result.append(base._supervise()))
+        thread.daemon = True
+        thread.start()
+
+        try:
+            for count in range(1, 3):
+                previous = list(base._childs)
+                base._kill(previous[0], signal.SIGKILL)
+
+                for _index in range(100):
+                    if len(base.acquired) == count and base._childs: break
+                    time.sleep(0.05)
+
+                self.assertEqual(len(base._childs), 1)
+                self.assertNotEqual(base._childs, previous)
+                self.assertEqual(len(base.released), count)
+                self.assertEqual(len(base.acquired), count)
+
+                (index, released), (_index, acquired) = base.released[-1], base.acquired[-1]
+                self.assertEqual(index, 0)
+                self.assertEqual(acquired - released >= 0.45 * 2 ** (count - 1), True)
+
+            base._signals.append(signal.SIGTERM)
+            thread.join(5.0)
+
+            self.assertEqual(result, [False])
+        finally:
+            for pid in list(base._childs): base._join(pid)
+
+    def test_no_respawn(self):
+        base = SupervisedBase(respawn = False)
+        for index in range(2): base._spawn(index)
+
+        try:
+            base._kill(base._childs[1], signal.SIGKILL)
+            base._kill(base._childs[0], signal.SIGKILL)
+
+            self.assertEqual(base._supervise(), False)
+            self.assertEqual(base._childs, [])
+            self.assertEqual(sorted(index for index, _time in base.released), [0, 1])
+            self.assertEqual(base.acquired, [])
+        finally:
+            for pid in list(base._childs): base._join(pid)
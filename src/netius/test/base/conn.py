@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import errno
+import socket
+import tempfile
+import threading
+import collections
+import unittest
+
+import netius
+
+class MockSocket(object):
+
+    def __init__(self, limit = None, block = False):
+        self.limit = limit
+        self.block = block
+        self.data = b""
+        self.calls = []
+
+    def send(self, data):
+        return self._write("send", [data])
+
+    def _write(self, name, buffers):
+        if self.block and self.calls: raise socket.error(errno.EWOULDBLOCK)
+        data = b"".join(bytes(bytearray(data)) for data in buffers)
+        if not self.limit == None: data = data[:self.limit]
+        self.data += data
+        self.calls.append((name, len(buffers)))
+        return len(data)
+
+class VectoredSocket(MockSocket):
+
+    def sendmsg(self, buffers):
+        return self._write("sendmsg", buffers)
+
+class ConnectionTest(unittest.TestCase):
+
+    def test_vectored(self):
+        socket = VectoredSocket()
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc"))
+        connection._send()
+        self.assertEqual(socket.data, b"abbccc")
+        self.assertEqual(socket.calls, [("sendmsg", 3)])
+        self.assertEqual(values, [b"a", b"bb", b"ccc"])
+        self.assertEqual(connection.pending, None)
+        self.assertEqual(connection.pending_s, 0)
+
+    def test_coalesced(self):
+        socket = MockSocket()
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc"))
+        connection._send()
+        self.assertEqual(socket.data, b"abbccc")
+        self.assertEqual(socket.calls, [("send", 1)])
+        self.assertEqual(values, [b"a", b"bb", b"ccc"])
+
+    def test_budget(self):
+        socket = VectoredSocket()
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc", b"dddd"))
+        connection.send_buffers = 3
+        connection._send()
+        self.assertEqual(socket.data, b"abbcccdddd")
+        self.assertEqual(socket.calls, [("sendmsg", 3), ("send", 1)])
+
+        socket = VectoredSocket()
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc", b"dddd"))
+        connection.send_size = 3
+        connection._send()
+        self.assertEqual(socket.data, b"abbcccdddd")
+        self.assertEqual(socket.calls, [("sendmsg", 2), ("send", 1), ("send", 1)])
+        self.assertEqual(values, [b"a", b"bb", b"ccc", b"dddd"])
+
+    def test_partial(self):
+        socket = VectoredSocket(limit = 4)
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc"))
+        connection._send()
+        self.assertEqual(socket.data, b"abbccc")
+        self.assertEqual(socket.calls, [("sendmsg", 3), ("send", 1)])
+        self.assertEqual(values, [b"a", b"bb", b"ccc"])
+        self.assertEqual(connection.pending_s, 0)
+
+    def test_blocking(self):
+        socket = VectoredSocket(limit = 4, block = True)
+        connection, values = self._connection(socket, (b"a", b"bb", b"ccc"))
+        connection.owner = netius.Base()
+        self.assertRaises(Exception, connection._send)
+        self.assertEqual(socket.data, b"abbc")
+        self.assertEqual(values, [b"a", b"bb"])
+        self.assertEqual(len(connection.pending), 1)
+        self.assertEqual(connection.pending_s, 2)
+
+        data, _callback = connection.pending[0]
+        self.assertEqual(type(data), memoryview)
+        self.assertEqual(data.tobytes(), b"cc")
+
+        socket.block = False
+        connection._send()
+        self.assertEqual(socket.data, b"abbccc")
+        self.assertEqual(values, [b"a", b"bb", b"ccc"])
+        self.assertEqual(connection.pending_s, 0)
+
+    def test_close(self):
+        socket = VectoredSocket()
+        connection, values = self._connection(socket, (b"a", None, b"bb"))
+        connection._send()
+        self.assertEqual(socket.data, b"abb")
+        self.assertEqual(socket.calls, [("send", 1), ("send", 1)])
+        self.assertEqual(values, [b"a", None, b"bb"])
+
+    def test_handoff(self):
+        socket = VectoredSocket()
+        connection, _values = self._connection(socket, ())
+        connection.owner = netius.Base()
+        connection.status = netius.OPEN
+        connection.wready = True
+        connection._flush_write = connection._send
+        connection.send(b"a")
+        connection.send(b"bb")
+        self.assertEqual(
+            list(connection.owner._handoff),
+            [(connection, b"a", 1), (connection, b"bb", 2)]
+        )
+        self.assertEqual(len(connection.pending), 0)
+        self.assertEqual(len(connection.owner._delayed_n), 1)
+
+        connection.owner.tid = threading.current_thread().ident
+        connection.send(b"ccc", delay = False)
+        self.assertEqual(socket.data, b"abbccc")
+        self.assertEqual(list(connection.owner._handoff), [])
+        self.assertEqual(connection.pending_s, 0)
+
+        connection.send(b"dddd", delay = False)
+        self.assertEqual(socket.data, b"abbcccdddd")
+        self.assertEqual(connection.owner._handoff_d, False)
+
+    def test_send_file(self):
+        if not hasattr(os, "sendfile"): self.skipTest("No sendfile support")
+
+        contents = os.urandom(1048576)
+        file = tempfile.TemporaryFile()
+        file.write(contents)
+        file.flush()
+
+        first, second = socket.socketpair()
+        first.setblocking(0)
+        values = []
+
+        try:
+            connection, _values = self._connection(first, ())
+            connection.owner = netius.Base()
+            connection.owner.tid = threading.current_thread().ident
+            connection.status = netius.OPEN
+            connection.ensure_write = lambda: None
+            connection.remove_write = lambda: None
+            connection.send(b"header", delay = True)
+            connection.send_file(
+                file,
+                offset = 1024,
+                count = 1046528,
+                delay = True,
+                callback = lambda connection: values.append("file")
+            )
+            connection.send(b"trailer", delay = True)
+            self.assertEqual(connection.pending_s, 1046541)
+
+            data = b""
+            while len(data) < 1046541:
+                try: connection._send()
+                except socket.error as error:
+                    self.assertEqual(error.args[0], errno.EAGAIN)
+                data += second.recv(1048576)
+
+            self.assertEqual(data[:6], b"header")
+            self.assertEqual(data[6:-7], contents[1024:-1024])
+            self.assertEqual(data[-7:], b"trailer")
+            self.assertEqual(values, ["file"])
+            self.assertEqual(connection.pending, None)
+            self.assertEqual(connection.pending_s, 0)
+        finally:
+            first.close()
+            second.close()
+            file.close()
+
+    def _connection(self, socket, buffers):
+        values = []
+        connection = netius.Connection(socket = socket)
+        connection.pending = collections.deque()
+        for data in buffers:
+            callback = lambda connection, data = data: values.append(data)
+            connection.pending.append((data, callback))
+            connection.pending_s += len(data) if data else 0
+        return connection, values
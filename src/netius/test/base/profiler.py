@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import threading
+import unittest
+
+import netius
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_sampler(self):
+        running = [True]
+
+        def busy():
+            while running[0]: sum(range(1000))
+
+        thread = threading.Thread(target = busy)
+        thread.start()
+        try:
+            sampler = netius.Sampler(thread.ident, rate = 200)
+            sampler.run(duration = 0.2)
+        finally:
+            running[0] = False
+            thread.join()
+
+        self.assertEqual(sampler.samples > 10, True)
+        self.assertEqual(sampler.elapsed >= 0.2, True)
+        lines = sampler.collapsed().split("\n")
+        self.assertEqual(len(lines), len(sampler.stacks))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertEqual(int(count) > 0, True)
+        self.assertEqual(stack.split(";")[-1].startswith(__name__ + ":busy:"), True)
+        info = sampler.info_dict(full = True)
+        self.assertEqual(info["samples"], sampler.samples)
+
+    def test_finished(self):
+        thread = threading.Thread(target = lambda: None)
+        thread.start()
+        thread.join()
+        sampler = netius.Sampler(thread.ident)
+        start = time.time()
+        sampler.run(duration = 5.0)
+        self.assertEqual(time.time() - start < 1.0, True)
+        self.assertEqual(sampler.samples, 0)
+        self.assertEqual(sampler.collapsed(), "")
+
+    def test_current(self):
+        sampler = netius.Sampler(threading.current_thread().ident)
+        self.assertRaises(netius.NetiusError, sampler.run)
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import unittest
+
+import netius
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_order(self):
+        for scheduler_c in (netius.HeapScheduler, netius.WheelScheduler):
+            scheduler = scheduler_c()
+            values = []
+            current = time.time()
+            scheduler.add(lambda: values.append("next"), 0, 1)
+            scheduler.add(lambda: values.append("timed"), current - 1.0, 1)
+            scheduler.add(lambda: values.append("future"), current + 60.0, 1)
+            scheduler.add(lambda: values.append("immediate"), -1, 1)
+            scheduler.run(current, 1)
+            self.assertEqual(values, ["immediate", "timed"])
+            scheduler.run(current, 2)
+            self.assertEqual(values, ["immediate", "timed", "next"])
+            scheduler.run(current + 61.0, 3)
+            self.assertEqual(values, ["immediate", "timed", "next", "future"])
+            self.assertEqual(scheduler.pending, 0)
+            self.assertEqual(scheduler.is_empty(), True)
+
+    def test_verify(self):
+        for scheduler_c in (netius.HeapScheduler, netius.WheelScheduler):
+            scheduler = scheduler_c()
+            values = []
+            callable = lambda: values.append(1)
+            first = scheduler.add(callable, -1, 1, verify = True)
+            second = scheduler.add(callable, -1, 1, verify = True)
+            self.assertEqual(first, second)
+            self.assertEqual(scheduler.pending, 1)
+            scheduler.run(time.time(), 1)
+            self.assertEqual(values, [1])
+            scheduler.add(callable, -1, 1, verify = True)
+            scheduler.run(time.time(), 1)
+            self.assertEqual(values, [1, 1])
+
+    def test_cancel(self):
+        for scheduler_c in (netius.HeapScheduler, netius.WheelScheduler):
+            scheduler = scheduler_c()
+            values = []
+            current = time.time()
+            handle = scheduler.add(lambda: values.append(1), current + 1.0, 1)
+            scheduler.add(lambda: values.append(2), current + 2.0, 1)
+            scheduler.cancel(handle)
+            self.assertEqual(handle.is_pending(), False)
+            self.assertEqual(scheduler.pending, 1)
+            scheduler.run(current + 3.0, 1)
+            self.assertEqual(values, [2])
+            self.assertEqual(scheduler.is_empty(), True)
+
+    def test_reschedule(self):
+        for scheduler_c in (netius.HeapScheduler, netius.WheelScheduler):
+            scheduler = scheduler_c()
+            values = []
+            current = time.time()
+            handle = scheduler.add(lambda: values.append(1), current + 1.0, 1)
+            scheduler.reschedule(handle, current + 5.0)
+            scheduler.reschedule(handle, current + 10.0)
+            scheduler.run(current + 6.0, 1)
+            self.assertEqual(values, [])
+            self.assertEqual(handle.is_pending(), True)
+            self.assertEqual(len(scheduler.handles()), 1)
+            scheduler.run(current + 11.0, 1)
+            self.assertEqual(values, [1])
+            self.assertEqual(handle.is_pending(), False)
+            self.assertEqual(handle.callable, None)
+            self.assertEqual(handle.scheduler, None)
+            self.assertEqual(handle.reschedule(1.0), False)
+            self.assertEqual(scheduler.pending, 0)
+
+    def test_handle(self):
+        scheduler = netius.WheelScheduler()
+        values = []
+        handle = scheduler.add(lambda: values.append(1), -1, 1)
+        self.assertEqual(handle.reschedule(0.0), True)
+        scheduler.run(time.time() - 1.0, 1)
+        self.assertEqual(values, [])
+        handle.cancel()
+        handle.cancel()
+        scheduler.run(time.time() + 1.0, 1)
+        self.assertEqual(values, [])
+        self.assertEqual(scheduler.pending, 0)
+        self.assertEqual(scheduler.is_empty(), True)
+
+    def test_wheel(self):
+        scheduler = netius.WheelScheduler(resolution = 0.01)
+        values = []
+        current = time.time()
+        timeouts = (0.05, 2.0, 30.0, 700.0, 3600.0, 200000.0)
+        for timeout in reversed(timeouts):
+            callable = lambda timeout = timeout: values.append(timeout)
+            scheduler.add(callable, current + timeout, 1)
+        for index, timeout in enumerate(timeouts):
+            scheduler.run(current + timeout - 0.02, 1)
+            self.assertEqual(values, list(timeouts[:index]))
+            scheduler.run(current + timeout + 0.02, 1)
+            self.assertEqual(values, list(timeouts[:index + 1]))
+        self.assertEqual(scheduler.count, 0)
+
+    def test_compact(self):
+        scheduler = netius.HeapScheduler()
+        values = []
+        current = time.time()
+        handles = [
+            scheduler.add(lambda index = index: values.append(index), current + 60.0 + index, 1)\
+            for index in range(4)
+        ]
+        for _index in range(netius.COMPACT_MIN):
+            for handle in handles: handle.reschedule(120.0)
+        self.assertEqual(len(scheduler.heap) <= netius.COMPACT_MIN * 2 + len(handles), True)
+        self.assertEqual(scheduler.stale, len(scheduler.heap) - len(handles))
+        self.assertEqual(len(scheduler.handles()), len(handles))
+        handles[0].cancel()
+        scheduler.run(current + 60.0, 1)
+        self.assertEqual(values, [])
+        scheduler.run(time.time() + 121.0, 1)
+        self.assertEqual(values, [1, 2, 3])
+        self.assertEqual(scheduler.stale, 0)
+        self.assertEqual(scheduler.heap, [])
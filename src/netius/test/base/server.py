@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import socket
+import unittest
+import threading
+
+import netius
+import netius.common
+
+class EchoServer(netius.StreamServer):
+
+    def on_data(self, connection, data):
+        netius.StreamServer.on_data(self, connection, data)
+        connection.send(data)
+
+class StreamServerTest(unittest.TestCase):
+
+    def test_accept_budget(self):
+        server = netius.StreamServer(accept_budget = 4)
+        server.poll = server.poll_c()
+        server.poll.open()
+
+        service = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        service.bind(("127.0.0.1", 0))
+        service.listen(32)
+        service.setblocking(0)
+        server.socket = service
+
+        clients = [socket.create_connection(service.getsockname()) for _index in range(10)]
+
+        try:
+            server.on_read_s(service)
+            self.assertEqual(len(server.connections), 4)
+            self.assertEqual(server.accept_exhausted_c, 1)
+
+            server.ticks()
+            self.assertEqual(len(server.connections), 8)
+
+            server.ticks()
+            self.assertEqual(len(server.connections), 10)
+            self.assertEqual(server.accept_exhausted_c, 2)
+
+            info = server.accept_dict()
+            self.assertEqual(info["count"], 10)
+            self.assertEqual(info["batches"], 3)
+            self.assertEqual(info["max_batch"], 4)
+
+            connection = server.connections[0]
+            self.assertEqual(connection.socket.gettimeout(), 0.0)
+        finally:
+            for connection in list(server.connections): connection.close()
+            for client in clients: client.close()
+            service.close()
+            server.poll.close()
+
+    def test_release(self):
+        server = netius.StreamServer()
+        address = ("127.0.0.1", 0)
+        server.socket = server._socket_listen(address, netius.TCP_TYPE, False)
+        address = server.socket.getsockname()
+        second = server._socket_listen(address, netius.TCP_TYPE, False)
+        server._sockets = [server.socket, second]
+        server._listen = (address, netius.TCP_TYPE, False, dict())
+
+        try:
+            server._release(1)
+            self.assertEqual(server._sockets[1], None)
+            self.assertRaises(Exception, second.getsockname)
+
+            server._child_index = 1
+            server._sockets, sockets = list(server._sockets), server._sockets
+            server._socket_child()
+            self.assertEqual(server._sockets, [sockets[0]])
+            server._sockets = sockets
+
+            server._acquire(1)
+            self.assertNotEqual(server._sockets[1], None)
+            self.assertEqual(server._sockets[1].getsockname(), address)
+
+            server._release(0)
+            server._acquire(0)
+            self.assertEqual(server.socket, server._sockets[0])
+            self.assertEqual(server.socket.getsockname(), address)
+        finally:
+            server.cleanup()
+
+    def test_loops(self):
+        server = EchoServer(loops = 3, cache = dict())
+        thread = threading.Thread(target = lambda: server.serve(port = 0))
+        thread.daemon = True
+        thread.start()
+
+        for _index in range(100):
+            if server._loops: break
+            time.sleep(0.05)
+
+        clients = []
+
+        try:
+            for index in range(6):
+                client = socket.create_connection(("127.0.0.1", server.port))
+                client.settimeout(5.0)
+                client.sendall(b"hello")
+                self.assertEqual(client.recv(5), b"hello")
+                clients.append(client)
+
+            info = server.loops_dict()
+            self.assertEqual(info["count"], 3)
+            self.assertEqual(info["dispatch"], True)
+            self.assertEqual(info["connections"], [2, 2, 2])
+
+            for loop in server._loops:
+                self.assertEqual(loop.loops, 1)
+                self.assertEqual(loop.port, server.port)
+                self.assertEqual(loop._kwargs["cache"] is server._kwargs["cache"], True)
+                self.assertNotEqual(loop.tid, server.tid)
+        finally:
+            for client in clients: client.close()
+            server.stop()
+            thread.join(5.0)
+
+        self.assertEqual(thread.is_alive(), False)
+        self.assertEqual(server._loops, [])
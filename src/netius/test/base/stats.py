@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import socket
+import unittest
+import threading
+import functools
+
+import netius
+
+class SlowServer(netius.StreamServer):
+
+    def on_data(self, connection, data):
+        netius.StreamServer.on_data(self, connection, data)
+        time.sleep(0.1)
+        connection.send(data)
+
+class StatsTest(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = netius.Histogram()
+        for _index in range(98): histogram.add(0.001)
+        histogram.add(0.5)
+        histogram.add(2.0)
+        info = histogram.info_dict(full = True)
+        self.assertEqual(info["count"], 100)
+        self.assertEqual(info["max"], 2000.0)
+        self.assertEqual(info["p50"] >= 1.0, True)
+        self.assertEqual(info["p50"] < 2.0, True)
+        self.assertEqual(info["p99"] >= 500.0, True)
+        self.assertEqual(info["p999"], 2000.0)
+        self.assertEqual(sum(count for _upper, count in info["buckets"]), 100)
+        self.assertEqual(netius.Histogram().info_dict()["p99"], 0.0)
+
+    def test_qualname(self):
+        stats = netius.LoopStats()
+        self.assertEqual(netius.qualname(stats.tick).endswith("LoopStats.tick"), True)
+        self.assertEqual(netius.qualname(netius.qualname), "netius.base.stats.qualname")
+        partial = functools.partial(netius.qualname, None)
+        self.assertEqual(netius.qualname(partial), "netius.base.stats.qualname")
+
+    def test_call(self):
+        stats = netius.LoopStats(threshold = 0.05)
+        values = []
+        stats.call(lambda: values.append(1), target = time.time() - 1.0)
+        stats.call(lambda: time.sleep(0.1))
+        stats.call(lambda: values.append(2), target = 0)
+        self.assertEqual(values, [1, 2])
+        self.assertEqual(stats.lag.count, 1)
+        self.assertEqual(stats.lag.max >= 1.0, True)
+        self.assertEqual(stats.delays.count, 3)
+        self.assertEqual(stats.slow_c, 1)
+        self.assertEqual(stats.slow[0]["name"].endswith("<lambda>"), True)
+        stats.reset()
+        self.assertEqual(stats.slow_c, 0)
+        self.assertEqual(stats.info_dict()["delays"]["count"], 0)
+
+    def test_scheduler(self):
+        stats = netius.LoopStats()
+        scheduler = netius.WheelScheduler()
+        scheduler.instrument(stats)
+        values = []
+        scheduler.add(lambda: values.append(1), time.time() - 1.0, 1)
+        scheduler.run(time.time(), 1)
+        scheduler.instrument(None)
+        scheduler.add(lambda: values.append(2), -1, 1)
+        scheduler.run(time.time(), 2)
+        self.assertEqual(values, [1, 2])
+        self.assertEqual(stats.delays.count, 1)
+        self.assertEqual(stats.lag.count, 1)
+
+    def test_slow_handler(self):
+        server = SlowServer(instrument = True, slow_callback = 0.05)
+        thread = threading.Thread(target = lambda: server.serve(port = 0))
+        thread.daemon = True
+        thread.start()
+
+        for _index in range(100):
+            if server.port and server._running: break
+            time.sleep(0.05)
+
+        try:
+            client = socket.create_connection(("127.0.0.1", server.port))
+            client.settimeout(5.0)
+            client.sendall(b"hello")
+            self.assertEqual(client.recv(5), b"hello")
+            client.close()
+
+            for _index in range(100):
+                if server.stats.slow_c: break
+                time.sleep(0.05)
+
+            names = [slow["name"] for slow in server.stats.slow]
+            self.assertEqual(len(names), 1)
+            self.assertEqual(names[0].startswith("netius.base.server."), True)
+            self.assertEqual(".on_read (connection " in names[0], True)
+        finally:
+            server.stop()
+            thread.join(5.0)
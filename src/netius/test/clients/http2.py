@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import threading
+import unittest
+
+import netius.common
+import netius.clients
+import netius.servers
+
+class HTTP2ClientTest(unittest.TestCase):
+
+    class Client(netius.clients.HTTP2Client):
+
+        def __init__(self, *args, **kwargs):
+            netius.clients.HTTP2Client.__init__(self, *args, **kwargs)
+            self.sent = []
+
+        def on_send_http2(self, connection, parser, type, flags, payload, stream):
+            netius.clients.HTTP2Client.on_send_http2(
+                self,
+                connection,
+                parser,
+                type,
+                flags,
+                payload,
+                stream
+            )
+            self.sent.append((type, stream))
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+
+        def app(environ, start_response):
+            path = environ["PATH_INFO"]
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            if path == "/large": return [b"x" * 262144]
+            return [path.encode("utf-8")]
+
+        self.server = netius.servers.WSGIServer(app = app, legacy = False)
+        self.thread = threading.Thread(target = lambda: self.server.serve(port = 0))
+        self.thread.daemon = True
+        self.thread.start()
+        for _index in range(100):
+            if self.server.port and self.server._running: break
+            time.sleep(0.05)
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        self.server.stop()
+        self.thread.join(5.0)
+
+    def request(self, client, path, on_result):
+        client.method(
+            "GET",
+            "http://127.0.0.1:%d%s" % (self.server.port, path),
+            on_result = on_result
+        )
+
+    def run_client(self, client):
+        client.delay(client.stop, timeout = 5.0)
+        client.start()
+
+    def pooled(self, client):
+        return sum(len(value) for value in client.pool.values())
+
+    def test_multiplex(self):
+        client = self.Client(thread = False)
+        results = []
+        pooled = []
+
+        def on_result(connection, parser, request):
+            results.append((connection, request))
+            if not len(results) == 3: return
+            pooled.append(self.pooled(client))
+            client.stop()
+
+        try:
+            for path in ("/a", "/b", "/c"): self.request(client, path, on_result)
+            self.run_client(client)
+
+            self.assertEqual(len(results), 3)
+            self.assertEqual(
+                sorted(request["data"] for _connection, request in results),
+                [b"/a", b"/b", b"/c"]
+            )
+            self.assertEqual(
+                sorted(connection.identifier for connection, _request in results),
+                [1, 3, 5]
+            )
+            connections = set(id(connection.connection) for connection, _request in results)
+            self.assertEqual(len(connections), 1)
+            self.assertEqual(pooled, [1])
+        finally:
+            client.destroy()
+
+    def test_window_update(self):
+        settings = dict(netius.common.HTTP2_SETTINGS_OPTIMAL)
+        settings[netius.common.http2.SETTINGS_INITIAL_WINDOW_SIZE] = 16384
+        client = self.Client(thread = False, settings = settings)
+        results = []
+
+        def on_result(connection, parser, request):
+            results.append((connection, request))
+            client.stop()
+
+        try:
+            self.request(client, "/large", on_result)
+            self.run_client(client)
+
+            self.assertEqual(len(results), 1)
+            connection, request = results[0]
+            self.assertEqual(request["code"], 200)
+            self.assertEqual(len(request["data"]), 262144)
+
+            updates = [
+                stream for type, stream in client.sent if type == netius.common.WINDOW_UPDATE
+            ]
+            self.assertEqual(connection.identifier in updates, True)
+        finally:
+            client.destroy()
+
+    def test_reconnect(self):
+        client = self.Client(thread = False)
+        results = []
+        pooled = []
+
+        def reconnect():
+            first = results[0][0].connection
+            first.close()
+            pooled.append(self.pooled(client))
+            self.request(client, "/b", on_result)
+
+        def on_result(connection, parser, request):
+            results.append((connection, request))
+            if len(results) == 1: client.delay(reconnect, immediately = True)
+            else: pooled.append(self.pooled(client)); client.stop()
+
+        try:
+            self.request(client, "/a", on_result)
+            self.run_client(client)
+
+            self.assertEqual(len(results), 2)
+            self.assertEqual(results[0][1]["data"], b"/a")
+            self.assertEqual(results[1][1]["data"], b"/b")
+            self.assertEqual(results[1][0].identifier, 1)
+            self.assertNotEqual(results[1][0].connection, results[0][0].connection)
+            self.assertEqual(pooled, [0, 1])
+        finally:
+            client.destroy()
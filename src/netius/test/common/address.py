@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import unittest
+
+import netius.common
+
+class AddressMatcherTest(unittest.TestCase):
+
+    def test_ip4(self):
+        matcher = netius.common.AddressMatcher(
+            ("127.0.0.1", "192.168.0.1", "172.16.0.0/16", "10.1.2.3/8")
+        )
+
+        result = matcher.match("127.0.0.1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("192.168.0.2")
+        self.assertEqual(result, False)
+
+        result = matcher.match("172.16.1.1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("172.17.0.1")
+        self.assertEqual(result, False)
+
+        result = matcher.match("10.200.0.1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("::ffff:172.16.0.1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("invalid")
+        self.assertEqual(result, False)
+
+    def test_ip6(self):
+        matcher = netius.common.AddressMatcher(("::1", "2001:db8::/32"))
+
+        result = matcher.match("::1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("::2")
+        self.assertEqual(result, False)
+
+        result = matcher.match("2001:db8:ffff::1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("2001:db9::1")
+        self.assertEqual(result, False)
+
+        result = matcher.match("127.0.0.1")
+        self.assertEqual(result, False)
+
+    def test_default(self):
+        matcher = netius.common.AddressMatcher()
+
+        result = matcher.match("127.0.0.1")
+        self.assertEqual(result, True)
+
+        result = matcher.match("127.0.0.1", default = False)
+        self.assertEqual(result, False)
+
+        result = netius.common.assert_ip4("127.0.0.1", matcher, default = False)
+        self.assertEqual(result, False)
+
+    def test_invalid(self):
+        self.assertRaises(
+            netius.DataError,
+            lambda: netius.common.AddressMatcher(("127.0.0.1/33",))
+        )
+        self.assertRaises(
+            netius.DataError,
+            lambda: netius.common.AddressMatcher(("localhost/8",))
+        )
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import unittest
+
+import netius.common
+
+class HPACKTest(unittest.TestCase):
+
+    def test_integer(self):
+        self.assertEqual(netius.common.hpack.encode_integer(10, 5), b"\x0a")
+        self.assertEqual(netius.common.hpack.encode_integer(1337, 5), b"\x1f\x9a\x0a")
+        self.assertEqual(netius.common.hpack.encode_integer(42, 8), b"\x2a")
+
+        value, index = netius.common.hpack.decode_integer(bytearray(b"\x1f\x9a\x0a"), 0, 5)
+        self.assertEqual(value, 1337)
+        self.assertEqual(index, 3)
+
+        self.assertRaises(
+            netius.ParserError,
+            lambda: netius.common.hpack.decode_integer(bytearray(b"\x1f\x9a"), 0, 5)
+        )
+
+    def test_huffman(self):
+        encoded = netius.common.hpack.huffman_encode(b"www.example.com")
+        self.assertEqual(encoded, b"\xf1\xe3\xc2\xe5\xf2\x3a\x6b\xa0\xab\x90\xf4\xff")
+        self.assertEqual(netius.common.hpack.huffman_size(b"www.example.com"), 12)
+        self.assertEqual(netius.common.hpack.huffman_decode(encoded), b"www.example.com")
+
+        data = bytes(bytearray(range(256)))
+        encoded = netius.common.hpack.huffman_encode(data)
+        self.assertEqual(netius.common.hpack.huffman_decode(encoded), data)
+        self.assertEqual(netius.common.hpack.huffman_encode(b""), b"")
+
+        self.assertRaises(
+            netius.ParserError,
+            lambda: netius.common.hpack.huffman_decode(b"\xf1\xe3\xff")
+        )
+        self.assertRaises(
+            netius.ParserError,
+            lambda: netius.common.hpack.huffman_decode(b"\xff\xff\xff\xff")
+        )
+
+    def test_decode(self):
+        decoder = netius.common.HPACKDecoder()
+
+        headers = decoder.decode(
+            b"\x82\x86\x84\x41\x8c\xf1\xe3\xc2\xe5\xf2\x3a\x6b\xa0\xab\x90\xf4\xff"
+        )
+        self.assertEqual(headers, [
+            (":method", "GET"),
+            (":scheme", "http"),
+            (":path", "/"),
+            (":authority", "www.example.com")
+        ])
+        self.assertEqual(decoder.table.size, 57)
+
+        headers = decoder.decode(b"\x82\x86\x84\xbe\x58\x86\xa8\xeb\x10\x64\x9c\xbf")
+        self.assertEqual(headers[3], (":authority", "www.example.com"))
+        self.assertEqual(headers[4], ("cache-control", "no-cache"))
+        self.assertEqual(decoder.table.size, 110)
+
+        headers = decoder.decode(b"\x82\x86\x84\xbe\x58\x86\xa8\xeb\x10\x64\x9c\xbf", raw = True)
+        self.assertEqual(headers[4], (b"cache-control", b"no-cache"))
+
+    def test_truncated(self):
+        for block in (b"\x40", b"\x00", b"\x0f\x01", b"\x40\x01a", b"\x1f"):
+            decoder = netius.common.HPACKDecoder()
+            self.assertRaises(netius.ParserError, lambda: decoder.decode(block))
+
+    def test_list_size(self):
+        literal = b"\x40\x01x" + netius.common.hpack.encode_integer(4000, 7)
+        block = literal + b"x" * 4000
+
+        decoder = netius.common.HPACKDecoder()
+        headers = decoder.decode(block + b"\xbe" * 2)
+        self.assertEqual(len(headers), 3)
+        self.assertEqual(headers[2], ("x", "x" * 4000))
+
+        decoder = netius.common.HPACKDecoder()
+        self.assertRaises(netius.ParserError, lambda: decoder.decode(block + b"\xbe" * 16000))
+
+        decoder = netius.common.HPACKDecoder(max_list = 4096)
+        self.assertRaises(netius.ParserError, lambda: decoder.decode(block + b"\xbe"))
+
+    def test_encode(self):
+        encoder = netius.common.HPACKEncoder()
+        decoder = netius.common.HPACKDecoder()
+
+        headers = [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("server", "netius"),
+            ("content-length", 13)
+        ]
+
+        first = encoder.encode(headers)
+        self.assertEqual(first[0:1], b"\x88")
+        self.assertEqual(len(encoder.table), 3)
+        self.assertEqual(decoder.decode(first), [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("server", "netius"),
+            ("content-length", "13")
+        ])
+
+        second = encoder.encode(headers)
+        self.assertEqual(second, b"\x88\xc0\xbf\xbe")
+        self.assertEqual(decoder.decode(second)[1], ("content-type", "application/json"))
+
+        third = encoder.encode([(b"set-cookie", b"secret=value")])
+        self.assertEqual(third[0:1], b"\x1f")
+        self.assertEqual(len(encoder.table), 3)
+        self.assertEqual(decoder.decode(third), [("set-cookie", "secret=value")])
+
+    def test_resize(self):
+        encoder = netius.common.HPACKEncoder()
+        decoder = netius.common.HPACKDecoder()
+
+        decoder.decode(encoder.encode([("server", "netius")]))
+        self.assertEqual(len(decoder.table), 1)
+
+        encoder.resize(0)
+        encoder.resize(256)
+        block = encoder.encode([("server", "netius")])
+        self.assertEqual(block[0:3], b"\x20\x3f\xe1")
+        self.assertEqual(decoder.decode(block), [("server", "netius")])
+        self.assertEqual(len(decoder.table), 1)
+        self.assertEqual(decoder.table.max_size, 256)
+
+        self.assertRaises(
+            netius.ParserError,
+            lambda: decoder.decode(b"\x3f\xe1\x3f")
+        )
+        self.assertRaises(
+            netius.ParserError,
+            lambda: decoder.decode(b"\x88\x3f\xe1\x01")
+        )
@@ -58,10 +58,22 @@ Hello World\r\n\
 0\r\n\
 \r\n"
 
+UPGRADE_REQUEST = b"GET /socket HTTP/1.1\r\n\
+Host: localhost\r\n\
+Upgrade: websocket\r\n\
+Connection: Upgrade\r\n\
+\r\n"
+
+CONNECT_REQUEST = b"CONNECT localhost:443 HTTP/1.1\r\n\
+Host: localhost:443\r\n\
+\r\n"
+
 class HTTPParserTest(unittest.TestCase):
 
+    parser_c = netius.common.PyHTTPParser
+
     def test_simple(self):
-        parser = netius.common.HTTPParser(
+        parser = self.parser_c(
             self,
             type = netius.common.REQUEST,
             store = True
@@ -79,7 +91,7 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(headers["Content-Length"], "11")
 
     def test_chunked(self):
-        parser = netius.common.HTTPParser(
+        parser = self.parser_c(
             self,
             type = netius.common.REQUEST,
             store = True
@@ -96,8 +108,68 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(headers["Server"], "Test Service/1.0.0")
         self.assertEqual(headers["Transfer-Encoding"], "chunked")
 
+    def test_partial(self):
+        for request in (SIMPLE_REQUEST, CHUNKED_REQUEST):
+            for size in (1, 2, 3, 5, 7):
+                parser = self.parser_c(
+                    self,
+                    type = netius.common.REQUEST,
+                    store = True
+                )
+                for index in range(0, len(request), size):
+                    parser.parse(request[index:index + size])
+                message = parser.get_message()
+                headers = parser.get_headers()
+                self.assertEqual(parser.state, netius.common.http.FINISH_STATE)
+                self.assertEqual(parser.path_s, "http://localhost")
+                self.assertEqual(message, b"Hello World")
+                self.assertEqual(headers["Server"], "Test Service/1.0.0")
+
+    def test_zero_copy(self):
+        partials = []
+        parser = self.parser_c(
+            self,
+            type = netius.common.REQUEST,
+            store = True
+        )
+        parser.bind("on_partial", partials.append)
+        parser.parse(SIMPLE_REQUEST)
+        self.assertEqual(parser.get_message(), b"Hello World")
+        self.assertEqual(len(partials), 1)
+        self.assertEqual(netius.legacy.bytes(partials[0]), b"Hello World")
+        if not self.parser_c == netius.common.PyHTTPParser: return
+        if not netius.legacy.PYTHON_3: return
+        self.assertEqual(type(partials[0]), memoryview)
+
+    def test_pipelining(self):
+        messages = []
+        parser = self.parser_c(
+            self,
+            type = netius.common.REQUEST,
+            store = True
+        )
+        parser.bind("on_data", lambda: messages.append(parser.get_message()))
+        count = parser.parse(SIMPLE_REQUEST + CHUNKED_REQUEST + SIMPLE_REQUEST)
+        self.assertEqual(count, len(SIMPLE_REQUEST + CHUNKED_REQUEST + SIMPLE_REQUEST))
+        self.assertEqual(messages, [b"Hello World", b"Hello World", b"Hello World"])
+
+    def test_upgrade(self):
+        for request, method in ((UPGRADE_REQUEST, "get"), (CONNECT_REQUEST, "connect")):
+            methods = []
+            parser = self.parser_c(
+                self,
+                type = netius.common.REQUEST,
+                store = True
+            )
+            parser.bind("on_data", lambda: methods.append(parser.method))
+            count = parser.parse(request + b"\x81\x85\x16\x03\x01\x00\x00")
+            self.assertEqual(count, len(request))
+            self.assertEqual(methods, [method])
+            self.assertEqual(parser.parse(b"\x16\x03\x01\x00\x00"), 0)
+            self.assertEqual(methods, [method])
+
     def test_file(self):
-        parser = netius.common.HTTPParser(
+        parser = self.parser_c(
             self,
             type = netius.common.REQUEST,
             store = True,
@@ -115,7 +187,7 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(parser.message, [])
 
     def test_no_store(self):
-        parser = netius.common.HTTPParser(
+        parser = self.parser_c(
             self,
             type = netius.common.REQUEST,
             store = False,
@@ -126,7 +198,7 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(message, b"")
 
     def test_clear(self):
-        parser = netius.common.HTTPParser(
+        parser = self.parser_c(
             self,
             type = netius.common.REQUEST,
             store = True
@@ -136,7 +208,7 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(parser.type, netius.common.REQUEST)
         self.assertEqual(parser.store, True)
         self.assertEqual(parser.state, netius.common.http.LINE_STATE)
-        self.assertEqual(parser.buffer, [])
+        self.assertEqual(parser.buffer, bytearray())
         self.assertEqual(parser.headers, {})
         self.assertEqual(parser.message, [])
         self.assertEqual(parser.method, None)
@@ -162,3 +234,11 @@ class HTTPParserTest(unittest.TestCase):
         self.assertEqual(parser.chunk_l, 0)
         self.assertEqual(parser.chunk_s, 0)
         self.assertEqual(parser.chunk_e, 0)
+
+class NativeHTTPParserTest(HTTPParserTest):
+
+    parser_c = netius.common.NativeHTTPParser
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        if not self.parser_c.test(): self.skipTest("No native parser available")
@@ -0,0 +1,317 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import struct
+import unittest
+
+import netius.common
+import netius.clients
+
+class HTTP2ParserTest(unittest.TestCase):
+
+    class Owner(object):
+
+        settings = netius.common.HTTP2_SETTINGS_OPTIMAL
+        settings_r = netius.common.HTTP2_SETTINGS
+        window = netius.common.HTTP2_WINDOW
+        window_o = netius.common.HTTP2_WINDOW
+
+        def __init__(self):
+            self.owner = self
+
+        def on_stream_c(self, stream):
+            pass
+
+        def on_stream_d(self, stream):
+            pass
+
+    def frame(self, type, flags, stream, payload = b""):
+        length = len(payload)
+        header = struct.pack("!BHBBI", length >> 16, length & 0xffff, type, flags, stream)
+        return header + payload
+
+    def build(self):
+        block = netius.common.HPACKEncoder().encode([
+            (":method", "POST"),
+            (":scheme", "http"),
+            (":path", "/upload"),
+            (":authority", "localhost")
+        ])
+        return self.frame(netius.common.SETTINGS, 0x00, 0, struct.pack("!HI", 0x03, 100)) +\
+            self.frame(netius.common.PING, 0x00, 0, b"12345678") +\
+            self.frame(netius.common.HEADERS, 0x04, 1, block) +\
+            self.frame(netius.common.DATA, 0x08, 1, b"\x02hello\x00\x00") +\
+            self.frame(netius.common.DATA, 0x01, 1, b"world")
+
+    def parse(self, data, chunk_size):
+        events = []
+        owner = self.Owner()
+        parser = netius.common.HTTP2Parser(owner, store = True)
+        parser.bind("on_settings", lambda settings, ack: events.append(("settings", settings)))
+        parser.bind("on_ping", lambda opaque, ack: events.append(("ping", opaque)))
+        parser.bind("on_partial", lambda data: events.append(("partial", data)))
+        for index in range(0, len(data), chunk_size):
+            parser.parse(data[index:index + chunk_size])
+        return parser, events
+
+    def test_parse(self):
+        data = self.build()
+
+        for chunk_size in (len(data), 1, 7):
+            parser, events = self.parse(data, chunk_size)
+            self.assertEqual(len(events), 4)
+            self.assertEqual(events[0], ("settings", [(0x03, 100)]))
+            self.assertEqual(events[1], ("ping", b"12345678"))
+            self.assertEqual(events[2][1].tobytes(), b"hello")
+            self.assertEqual(events[3][1].tobytes(), b"world")
+            self.assertEqual(parser.buffer, [])
+
+            stream = parser.streams[1]
+            self.assertEqual(stream.path_s, "/upload")
+            self.assertEqual(stream.is_ready, True)
+            self.assertEqual(stream.get_message_b().read(), b"helloworld")
+
+    def test_zero_copy(self):
+        data = self.build()
+        parser, events = self.parse(data, len(data))
+        self.assertEqual(type(events[2][1]), memoryview)
+        self.assertEqual(type(events[3][1]), memoryview)
+        self.assertEqual(type(parser.payload), memoryview)
+
+    def test_push(self):
+        data = self.build()
+        parser, events = self.parse(data, len(data))
+        parser.bind("on_rst_stream", lambda stream, error_code: events.append(("rst", stream)))
+
+        pushed = netius.common.HTTP2Stream(
+            owner = parser,
+            identifier = 2,
+            dependency = 1,
+            end_headers = True,
+            end_stream = True
+        )
+        pushed.headers_l = [
+            (":method", "GET"),
+            (":scheme", "http"),
+            (":path", "/style.css")
+        ]
+        pushed.open()
+        parser._set_push(pushed)
+        self.assertEqual(parser._max_stream, 1)
+        self.assertEqual(parser._max_push, 2)
+        self.assertEqual(parser._pushing, 1)
+
+        parser.parse(self.frame(netius.common.RST_STREAM, 0x00, 2, struct.pack("!I", 0x08)))
+        self.assertEqual(events[-1], ("rst", pushed))
+
+        parser._del_stream(2)
+        self.assertEqual(parser._pushing, 0)
+
+        parser.parse(self.frame(netius.common.WINDOW_UPDATE, 0x00, 2, struct.pack("!I", 1024)))
+        self.assertRaises(
+            netius.ParserError,
+            lambda: parser.parse(self.frame(netius.common.RST_STREAM, 0x00, 4, struct.pack("!I", 0x08)))
+        )
+
+    def test_priority(self):
+        data = self.build()
+        parser, events = self.parse(data, len(data))
+        self.assertEqual(parser.streams[1].priority, False)
+
+        block = netius.common.HPACKEncoder().encode([
+            (":method", "GET"),
+            (":scheme", "http"),
+            (":path", "/"),
+            (":authority", "localhost")
+        ])
+        parser.parse(self.frame(netius.common.HEADERS, 0x25, 3, struct.pack("!IB", 0, 0) + block))
+        stream = parser.streams[3]
+        self.assertEqual(stream.priority, True)
+        self.assertEqual(stream.weight, 0)
+        self.assertEqual(stream.dependency, 0)
+        self.assertEqual(parser.streams[1].dependency, 0)
+
+        parser.parse(self.frame(netius.common.PRIORITY, 0x00, 3, struct.pack("!IB", 0x80000000, 31)))
+        self.assertEqual(stream.weight, 31)
+        self.assertEqual(stream.exclusive, True)
+        self.assertEqual(stream.dependency, 0)
+        self.assertEqual(parser.streams[1].dependency, 3)
+
+    def test_compression(self):
+        data = self.build()
+        parser, events = self.parse(data, len(data))
+
+        try:
+            parser.parse(self.frame(netius.common.HEADERS, 0x05, 3, b"\x40\x01a"))
+        except netius.ParserError as exception:
+            error_code = exception.get_kwarg("error_code")
+        self.assertEqual(error_code, netius.common.http2.COMPRESSION_ERROR)
+
+    def request(self, parser, identifier):
+        request = netius.clients.HTTP2Request(
+            owner = parser,
+            identifier = identifier,
+            end_stream_l = True
+        )
+        request.open()
+        parser._set_stream(request)
+        return request
+
+    def respond(self, events):
+        owner = self.Owner()
+        owner.discard_frames = lambda stream: None
+        owner.on_headers_http = lambda stream, response: events.append(("headers", response.code))
+        owner.on_partial_http = lambda stream, response, data: events.append(("partial", data))
+        owner.on_data_http = lambda stream, response: events.append(("data", response.code))
+        parser = netius.common.HTTP2Parser(owner, client = True)
+        parser.bind("on_headers", lambda: parser.stream_o.on_headers())
+        parser.bind("on_partial", lambda data: parser.stream_o.on_partial(data.tobytes()))
+        parser.bind("on_data", lambda: parser.stream_o.on_data())
+        return parser
+
+    def test_response(self):
+        for chunk_size in (1, 7, 1024):
+            events = []
+            parser = self.respond(events)
+            request = self.request(parser, 1)
+
+            encoder = netius.common.HPACKEncoder()
+            data = self.frame(netius.common.HEADERS, 0x04, 1, encoder.encode([(":status", "100")])) +\
+                self.frame(netius.common.HEADERS, 0x04, 1, encoder.encode([
+                    (":status", "200"),
+                    ("content-type", "text/plain"),
+                    ("x-custom", "a"),
+                    ("x-custom", "b")
+                ])) +\
+                self.frame(netius.common.DATA, 0x00, 1, b"hello") +\
+                self.frame(netius.common.DATA, 0x01, 1)
+
+            for index in range(0, len(data), chunk_size):
+                parser.parse(data[index:index + chunk_size])
+            self.assertEqual(events, [("headers", 200), ("partial", b"hello"), ("data", 200)])
+            self.assertEqual(request.response.status, "OK")
+            self.assertEqual(request.response.get_headers(), {
+                "Content-Type" : "text/plain",
+                "X-Custom" : ["a", "b"]
+            })
+            self.assertEqual(parser.streams, {})
+
+        parser.parse(self.frame(netius.common.DATA, 0x01, 1, b"late"))
+        parser.parse(self.frame(netius.common.HEADERS, 0x05, 1, encoder.encode([("x-late", "c")])))
+        self.assertEqual(len(events), 3)
+
+        request = self.request(parser, 3)
+        parser.parse(self.frame(netius.common.HEADERS, 0x04, 3, encoder.encode([
+            (":status", "404"),
+            ("x-late", "c")
+        ])))
+        self.assertEqual(events[-1], ("headers", 404))
+        self.assertEqual(request.response.headers, {"x-late" : "c"})
+
+        request = self.request(parser, 5)
+        self.assertRaises(
+            netius.ParserError,
+            lambda: parser.parse(self.frame(netius.common.HEADERS, 0x05, 5, encoder.encode([(":status", "103")])))
+        )
+
+class HTTP2SchedulerTest(unittest.TestCase):
+
+    def drain(self, scheduler, size = 100):
+        order = []
+        while True:
+            stream = scheduler.next()
+            if stream == None: break
+            order.append(scheduler.pop(stream, size = size))
+        return order
+
+    def test_fair(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        for index in range(3):
+            scheduler.push(1, "a%d" % index)
+            scheduler.push(3, "b%d" % index)
+        self.assertEqual(len(scheduler), 6)
+        self.assertEqual(
+            self.drain(scheduler),
+            ["a0", "b0", "a1", "b1", "a2", "b2"]
+        )
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(scheduler.queues, {})
+
+    def test_weight(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        for index in range(4):
+            scheduler.push(1, "a%d" % index, weight = 3)
+            scheduler.push(3, "b%d" % index, weight = 1)
+        self.assertEqual(
+            self.drain(scheduler),
+            ["a0", "b0", "a1", "a2", "b1", "a3", "b2", "b3"]
+        )
+
+    def test_dependency(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        scheduler.push(3, "child", dependency = 1)
+        scheduler.push(1, "parent0")
+        scheduler.push(1, "parent1")
+        self.assertEqual(self.drain(scheduler), ["parent0", "parent1", "child"])
+
+    def test_cycle(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        scheduler.push(1, "a", dependency = 3)
+        scheduler.push(3, "b", dependency = 1)
+        self.assertEqual(sorted(self.drain(scheduler)), ["a", "b"])
+
+    def test_block(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        scheduler.push(1, "parent")
+        scheduler.push(3, "child", dependency = 1)
+        self.assertEqual(scheduler.next(), 1)
+        scheduler.block(1)
+        self.assertEqual(self.drain(scheduler), ["child"])
+        self.assertEqual(scheduler.next(), None)
+        scheduler.unblock(1)
+        self.assertEqual(self.drain(scheduler), ["parent"])
+
+    def test_discard(self):
+        scheduler = netius.common.HTTP2Scheduler()
+        scheduler.push(1, "a0")
+        scheduler.push(1, "a1")
+        scheduler.push(3, "b0")
+        self.assertEqual(scheduler.discard(1), 2)
+        self.assertEqual(scheduler.discard(1), 0)
+        self.assertEqual(self.drain(scheduler), ["b0"])
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import socket
+import threading
+import unittest
+
+import netius.extra
+import netius.servers
+
+class ReverseProxyServerTest(unittest.TestCase):
+
+    def app(self, environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["SERVER_PROTOCOL"].encode("utf-8")]
+
+    def serve(self, server, loop = None):
+        loop = loop or server
+        thread = threading.Thread(target = lambda: server.serve(port = 0))
+        thread.daemon = True
+        thread.start()
+        for _index in range(100):
+            if server.port and loop._running: break
+            time.sleep(0.05)
+        return thread
+
+    def request(self, legacy):
+        backend = netius.servers.WSGIServer(app = self.app, legacy = legacy)
+        backend_t = self.serve(backend)
+        proxy = netius.extra.ReverseProxyServer(
+            hosts = {"localhost" : "http://127.0.0.1:%d" % backend.port},
+            upstream_h2 = True
+        )
+        proxy_t = self.serve(proxy, loop = proxy.container)
+
+        try:
+            client = socket.create_connection(("127.0.0.1", proxy.port))
+            client.settimeout(5.0)
+            client.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            data = b""
+            while True:
+                chunk = client.recv(4096)
+                if not chunk: break
+                data += chunk
+            client.close()
+            return data
+        finally:
+            proxy.stop()
+            proxy_t.join(5.0)
+            backend.stop()
+            backend_t.join(5.0)
+
+    def test_upstream_h2(self):
+        data = self.request(False)
+        self.assertEqual(data.startswith(b"HTTP/1.1 200 OK\r\n"), True)
+        self.assertEqual(data.endswith(b"\r\n\r\nHTTP/2.0"), True)
+
+    def test_upstream_h1(self):
+        data = self.request(True)
+        self.assertEqual(data.startswith(b"HTTP/1.1 502 Bad Gateway\r\n"), True)
+        self.assertEqual(data.endswith(b"\r\n\r\nBad Gateway"), True)
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import struct
+import socket
+import threading
+import unittest
+
+import netius.common
+import netius.servers
+
+class HTTP2ServerTest(unittest.TestCase):
+
+    def app(self, environ, start_response):
+        if environ["PATH_INFO"] == "/":
+            environ["netius.preload"](["/style.css", "/script.js"])
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["PATH_INFO"].encode("utf-8")]
+
+    def serve(self, **kwargs):
+        server = netius.servers.WSGIServer(app = self.app, **kwargs)
+        thread = threading.Thread(target = lambda: server.serve(port = 0))
+        thread.daemon = True
+        thread.start()
+        for _index in range(100):
+            if server.port and server._running: break
+            time.sleep(0.05)
+        return server, thread
+
+    def frame(self, type, flags, stream, payload = b""):
+        length = len(payload)
+        header = struct.pack("!BHBBI", length >> 16, length & 0xffff, type, flags, stream)
+        return header + payload
+
+    def request(self, server, version):
+        client = socket.create_connection(("127.0.0.1", server.port))
+        client.settimeout(5.0)
+        client.sendall(
+            b"GET / HTTP/" + version + b"\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+        )
+        data = b""
+        while True:
+            chunk = client.recv(4096)
+            if not chunk: break
+            data += chunk
+        client.close()
+        return data
+
+    def request_h2(self, server, push):
+        client = socket.create_connection(("127.0.0.1", server.port))
+        client.settimeout(5.0)
+        block = netius.common.HPACKEncoder().encode([
+            (":method", "GET"),
+            (":scheme", "http"),
+            (":path", "/"),
+            (":authority", "localhost")
+        ])
+        client.sendall(
+            netius.common.HTTP2_PREFACE +\
+            self.frame(
+                netius.common.SETTINGS,
+                0x00,
+                0,
+                struct.pack("!HI", netius.common.http2.SETTINGS_ENABLE_PUSH, push)
+            ) +\
+            self.frame(netius.common.HEADERS, 0x05, 1, block)
+        )
+
+        # reads the frames sent by the server until all of the streams
+        # (requested and promised) have been ended, the header blocks are
+        # decoded in order as they share the same (dynamic) table
+        frames = []
+        decoder = netius.common.HPACKDecoder()
+        pending = set([1])
+        buffer = b""
+        while pending:
+            buffer = self.receive(client, buffer, 9)
+            length, = struct.unpack("!I", b"\x00" + buffer[:3])
+            buffer = self.receive(client, buffer, 9 + length)
+            type, flags, stream = struct.unpack("!BBI", buffer[3:9])
+            payload = buffer[9:9 + length]
+            buffer = buffer[9 + length:]
+            if type == netius.common.PUSH_PROMISE:
+                promised, = struct.unpack("!I", payload[:4])
+                pending.add(promised)
+                frames.append((type, stream, promised, decoder.decode(payload[4:])))
+            elif type == netius.common.HEADERS:
+                frames.append((type, stream, None, decoder.decode(payload)))
+            elif type == netius.common.DATA:
+                frames.append((type, stream, None, payload))
+            if type in (netius.common.HEADERS, netius.common.DATA) and flags & 0x01:
+                pending.discard(stream)
+        client.close()
+        return frames
+
+    def receive(self, client, buffer, size):
+        while len(buffer) < size:
+            chunk = client.recv(4096)
+            if not chunk: raise IOError("Connection closed")
+            buffer += chunk
+        return buffer
+
+    def test_push(self):
+        server, thread = self.serve(legacy = False)
+
+        try:
+            frames = self.request_h2(server, 1)
+            promises = [frame for frame in frames if frame[0] == netius.common.PUSH_PROMISE]
+            self.assertEqual([frame[1] for frame in promises], [1, 1])
+            self.assertEqual([frame[2] for frame in promises], [2, 4])
+            self.assertEqual(dict(promises[0][3])[":path"], "/style.css")
+            self.assertEqual(dict(promises[1][3])[":path"], "/script.js")
+            self.assertEqual(dict(promises[0][3])[":authority"], "localhost")
+
+            bodies = dict(
+                (frame[1], frame[3]) for frame in frames if frame[0] == netius.common.DATA and frame[3]
+            )
+            self.assertEqual(bodies, {1 : b"/", 2 : b"/style.css", 4 : b"/script.js"})
+
+            statuses = [dict(frame[3])[":status"] for frame in frames if frame[0] == netius.common.HEADERS]
+            self.assertEqual("103" in statuses, False)
+        finally:
+            server.stop()
+            thread.join(5.0)
+
+    def test_push_disabled(self):
+        server, thread = self.serve(legacy = False)
+
+        try:
+            frames = self.request_h2(server, 0)
+            types = [frame[0] for frame in frames]
+            self.assertEqual(netius.common.PUSH_PROMISE in types, False)
+
+            headers = [frame[3] for frame in frames if frame[0] == netius.common.HEADERS]
+            self.assertEqual(headers[0], [
+                (":status", "103"),
+                ("link", "</style.css>; rel=preload; as=style"),
+                ("link", "</script.js>; rel=preload; as=script")
+            ])
+            self.assertEqual(dict(headers[1])[":status"], "200")
+        finally:
+            server.stop()
+            thread.join(5.0)
+
+    def test_hints(self):
+        server, thread = self.serve()
+
+        try:
+            data = self.request(server, b"1.1")
+            self.assertEqual(data.startswith(b"HTTP/1.1 103 Early Hints\r\n"), True)
+            self.assertEqual(b"</style.css>; rel=preload; as=style" in data, True)
+            self.assertEqual(b"\r\n\r\nHTTP/1.1 200 OK\r\n" in data, True)
+            self.assertEqual(data.endswith(b"\r\n\r\n/"), True)
+
+            data = self.request(server, b"1.0")
+            self.assertEqual(data.startswith(b"HTTP/1.0 200 OK\r\n"), True)
+            self.assertEqual(b"103" in data, False)
+            self.assertEqual(b"Link" in data, False)
+        finally:
+            server.stop()
+            thread.join(5.0)
@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Netius System
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Netius System.
+#
+# Hive Netius System is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Netius System is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Netius System. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import socket
+import threading
+import unittest
+
+import netius.servers
+
+class WSGIInputTest(unittest.TestCase):
+
+    def test_read(self):
+        input = netius.servers.WSGIInput()
+        input.push(b"hello ")
+        input.push(b"world\nline")
+        input.finish()
+        self.assertEqual(input.read(3), b"hel")
+        self.assertEqual(input.readline(), b"lo world\n")
+        self.assertEqual(input.readline(), b"line")
+        self.assertEqual(input.read(), b"")
+
+    def test_iterate(self):
+        input = netius.servers.WSGIInput()
+        input.push(b"a\nb")
+        input.push(b"b\nc")
+        input.finish()
+        self.assertEqual(list(input), [b"a\n", b"bb\n", b"c"])
+
+    def test_blocking(self):
+        input = netius.servers.WSGIInput()
+        result = []
+        thread = threading.Thread(target = lambda: result.append(input.read()))
+        thread.start()
+        input.push(b"first")
+        time.sleep(0.05)
+        self.assertEqual(result, [])
+        input.push(b"second")
+        input.finish()
+        thread.join()
+        self.assertEqual(result, [b"firstsecond"])
+
+    def test_pause(self):
+        resumed = []
+        input = netius.servers.WSGIInput(
+            limit = 4,
+            callback = lambda: resumed.append(True)
+        )
+        self.assertEqual(input.push(b"ab"), False)
+        self.assertEqual(input.push(b"cdef"), True)
+        self.assertEqual(input.paused, True)
+        self.assertEqual(input.read(3), b"abc")
+        self.assertEqual(input.paused, True)
+        self.assertEqual(input.read(2), b"de")
+        self.assertEqual(input.paused, False)
+        self.assertEqual(resumed, [True])
+
+    def test_wanted(self):
+        resumed = []
+        input = netius.servers.WSGIInput(
+            limit = 4,
+            callback = lambda: resumed.append(True)
+        )
+        input.push(b"abcd")
+        result = []
+        thread = threading.Thread(target = lambda: result.append(input.read(8)))
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(resumed, [True])
+        self.assertEqual(input.push(b"efgh"), False)
+        thread.join()
+        self.assertEqual(result, [b"abcdefgh"])
+
+    def test_close(self):
+        input = netius.servers.WSGIInput()
+        result = []
+        thread = threading.Thread(target = lambda: result.append(input.read()))
+        thread.start()
+        input.push(b"data")
+        input.close()
+        thread.join()
+        self.assertEqual(result, [b""])
+        self.assertEqual(input.push(b"more"), False)
+        self.assertEqual(input.read(), b"")
+
+class WSGIServerTest(unittest.TestCase):
+
+    def serve(self, app, **kwargs):
+        server = netius.servers.WSGIServer(app = app, **kwargs)
+        thread = threading.Thread(target = lambda: server.serve(port = 0))
+        thread.daemon = True
+        thread.start()
+        for _index in range(100):
+            if server.port and server._running: break
+            time.sleep(0.05)
+        return server, thread
+
+    def request(self, server):
+        client = socket.create_connection(("127.0.0.1", server.port))
+        client.settimeout(5.0)
+        client.sendall(b"GET / HTTP/1.0\r\nHost: localhost\r\n\r\n")
+        return client
+
+    def response(self, client):
+        data = b""
+        while True:
+            chunk = client.recv(4096)
+            if not chunk: break
+            data += chunk
+        client.close()
+        return data
+
+    def test_threaded(self):
+        threads = []
+
+        def app(environ, start_response):
+            threads.append(threading.current_thread().ident)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"hello ", b"world"]
+
+        server, thread = self.serve(app, threaded = True, workers = 2)
+
+        try:
+            for _index in range(3):
+                data = self.response(self.request(server))
+                self.assertEqual(data.startswith(b"HTTP/1.0 200 OK\r\n"), True)
+                self.assertEqual(data.endswith(b"\r\n\r\nhello world"), True)
+
+            self.assertEqual(len(threads), 3)
+            self.assertEqual(server.tid in threads, False)
+            info = server.info_dict()
+            self.assertEqual(info["threaded"], True)
+            self.assertEqual(info["rejected"], 0)
+        finally:
+            server.stop()
+            thread.join(5.0)
+
+    def test_max_pending(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def app(environ, start_response):
+            entered.set()
+            release.wait(5.0)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"done"]
+
+        server, thread = self.serve(
+            app,
+            threaded = True,
+            workers = 1,
+            max_pending = 1
+        )
+
+        try:
+            first = self.request(server)
+            self.assertEqual(entered.wait(5.0), True)
+
+            second = self.request(server)
+            for _index in range(100):
+                if len(server.tpool.queue) == 1: break
+                time.sleep(0.05)
+            self.assertEqual(len(server.tpool.queue), 1)
+
+            third = self.request(server)
+            data = self.response(third)
+            status = data.split(b"\r\n", 1)[0]
+            self.assertEqual(status, b"HTTP/1.1 503 Service Unavailable")
+
+            release.set()
+            for client in (first, second):
+                data = self.response(client)
+                self.assertEqual(data.startswith(b"HTTP/1.0 200 OK\r\n"), True)
+                self.assertEqual(data.endswith(b"done"), True)
+
+            info = server.info_dict()
+            self.assertEqual(info["rejected"], 1)
+        finally:
+            release.set()
+            server.stop()
+            thread.join(5.0)
+
+    def test_not_started(self):
+        responses = []
+        connection = netius.Connection()
+        connection.send_response = lambda **kwargs: responses.append(kwargs["code"])
+        server = netius.servers.WSGIServer(
+            app = lambda environ, start_response: [],
+            threaded = True,
+            max_pending = 0
+        )
+        server.on_environ_t(connection, dict())
+        self.assertEqual(server.tpool, None)
+        self.assertEqual(responses, [503])
+        self.assertEqual(server.info_dict()["queue"], 0)